@@ -0,0 +1,499 @@
+"""Headless bus arbitration engine.
+
+This module holds the arbitration logic that used to live inside the Tk
+simulator, so it can be stepped one cycle at a time by the GUI or driven in a
+tight loop on machines without a display (CI, servers).
+
+Request lines are kept as a bitmask (bit i set when device i requests).
+Every mode then picks its winner with a constant number of integer bit
+operations instead of scanning the devices, which keeps arbitration cheap
+for buses with hundreds of masters.
+
+Further policies (weighted round robin, LRU, TDMA, lottery, ...) come from
+the ``policies`` registry and are selected by name like the built-in modes.
+
+A grant starts a transaction of ``burst_length`` cycles during which the
+winner holds the bus (BUS Busy). Requests raised meanwhile, and those of the
+devices that lost the grant, stay latched until the bus is free again.
+"""
+import random
+from collections import namedtuple
+from functools import partial, reduce
+from itertools import islice
+from operator import or_
+
+from metrics import ArbitrationMetrics
+from policies import POLICIES
+
+FIXED_PRIORITY = "Fixed Priority"
+ROUND_ROBIN = "Round Robin"
+DAISY_CHAIN = "Daisy Chain"
+MODES = (FIXED_PRIORITY, ROUND_ROBIN, DAISY_CHAIN)
+
+MAX_DEVICES = 1024
+
+# Largest device count for which run() precomputes winner lookup tables
+# (one entry per request bitmask, so 2 ** device_count entries per table).
+LUT_MAX_DEVICES = 12
+
+# Request probabilities are quantised to multiples of 2 ** -PROBABILITY_BITS
+PROBABILITY_BITS = 16
+
+# requests is the request bitmask of the cycle (latched requests while the
+# bus is held); holder is the device owning the bus, winner only the device
+# granted in this cycle
+CycleResult = namedtuple(
+    "CycleResult", ["cycle", "requests", "winner", "data", "holder"], defaults=(None,)
+)
+
+
+def available_modes():
+    """Built-in modes followed by the registered policies"""
+    return MODES + tuple(POLICIES)
+
+
+def requests_to_mask(requests):
+    """Bitmask from a sequence of per-device request flags"""
+    mask = 0
+    for i, req in enumerate(requests):
+        if req:
+            mask |= 1 << i
+    return mask
+
+
+def mask_to_requests(mask, device_count):
+    """Per-device request flags from a bitmask"""
+    return [bool(mask >> i & 1) for i in range(device_count)]
+
+
+def random_mask(rng, bits, probability):
+    """Bitmask with each of ``bits`` lines raised independently with ``probability``.
+
+    Combines random words along the binary expansion of the probability
+    (OR for a 1 digit, AND for a 0 digit, least significant digit first), so
+    the cost is a few big-int operations whatever the device count.
+    """
+    k = round(probability * (1 << PROBABILITY_BITS))
+    if k <= 0:
+        return 0
+    if k >= 1 << PROBABILITY_BITS:
+        return (1 << bits) - 1
+    trailing = (k & -k).bit_length() - 1
+    k >>= trailing
+    getrandbits = rng.getrandbits
+    mask = 0
+    for _ in range(PROBABILITY_BITS - trailing):
+        if k & 1:
+            mask |= getrandbits(bits)
+        else:
+            mask &= getrandbits(bits)
+        k >>= 1
+    return mask
+
+
+class ArbiterEngine:
+    """Cycle-stepping bus arbiter with no GUI dependencies.
+
+    Keeps the simulator's semantics: Fixed Priority grants the lowest index,
+    Daisy Chain the highest, and Round Robin starts searching at
+    ``next_index`` which moves past each winner. ``weights`` are handed to
+    registry policies that use them (weighted round robin, TDMA, lottery).
+    """
+
+    def __init__(self, device_count=4, mode=FIXED_PRIORITY, seed=None, track_metrics=False,
+                 burst_length=1, weights=None):
+        if not 1 <= device_count <= MAX_DEVICES:
+            raise ValueError(f"device_count must be between 1 and {MAX_DEVICES}")
+        self.device_count = device_count
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.weights = weights
+        self.mode = FIXED_PRIORITY
+        self.policy = None
+        self.set_mode(mode)
+        self.set_burst_length(burst_length)
+        self._luts = {}
+        self.workload = None
+        self.workload_done = False
+        self._workload_masks = None
+        # Fairness/latency metrics cost a little per cycle, so they are opt-in
+        self.metrics = ArbitrationMetrics(device_count) if track_metrics else None
+        self.reset()
+
+    def reset(self):
+        """Clear cycle counter, grant statistics and round-robin state"""
+        self.cycle = 0
+        self.next_index = 0
+        self.grant_counts = [0] * self.device_count
+        self.idle_cycles = 0
+        self.busy_cycles = 0  # cycles a transaction held the bus after its grant
+        self.holder = None
+        self.hold_remaining = 0
+        self.pending = 0  # requests latched while the bus is held
+        if self.policy is not None:
+            self.policy.reset()
+        if self.metrics is not None:
+            self.metrics.reset()
+
+    def reseed(self, seed):
+        """Restart the engine's RNG (requests, data, bursts, lottery draws) from ``seed``"""
+        self.seed = seed
+        self.rng.seed(seed)
+
+    def set_mode(self, mode):
+        """Select a built-in mode or a registered policy by name"""
+        if mode in MODES:
+            policy = None
+        elif mode in POLICIES:
+            policy = POLICIES[mode](self.device_count, self.rng, self.weights)
+        else:
+            raise ValueError(f"Unknown mode '{mode}'")
+        self.mode = mode
+        self.policy = policy
+
+    def set_weights(self, weights):
+        """Per-device weights (None for equal); restarts the current policy"""
+        self.weights = weights
+        if self.policy is not None:
+            self.set_mode(self.mode)
+
+    def set_burst_length(self, burst_length):
+        """Cycles per transaction: an int, or a (min, max) range drawn per grant"""
+        if isinstance(burst_length, int):
+            low = high = burst_length
+        else:
+            low, high = burst_length
+        if not 1 <= low <= high:
+            raise ValueError("burst length must be at least 1 cycle")
+        self.burst_length = burst_length
+        self._burst_range = (low, high)
+
+    def draw_burst(self):
+        """Length in cycles of the next transaction"""
+        low, high = self._burst_range
+        return low if low == high else self.rng.randint(low, high)
+
+    def set_workload(self, workload):
+        """Draw requests from a workloads.Workload instead of fair coin flips.
+
+        ``None`` restores the default. Once a finite workload (a trace) is
+        used up, step() returns None and ``workload_done`` is true.
+        """
+        if workload is not None and workload.device_count != self.device_count:
+            raise ValueError("workload device count does not match the engine")
+        self.workload = workload
+        self._workload_masks = workload.masks() if workload is not None else None
+        self.workload_done = False
+
+    def generate_requests(self):
+        """Request bitmask for the next cycle (None once the workload is used up)"""
+        if self._workload_masks is not None:
+            mask = next(self._workload_masks, None)
+            if mask is None:
+                self.workload_done = True
+            return mask
+        return self.rng.getrandbits(self.device_count)
+
+    def determine_winner(self, requests):
+        """Winner for a request bitmask or per-device flag sequence, or None"""
+        if not isinstance(requests, int):
+            requests = requests_to_mask(requests)
+        return self.select(requests)
+
+    def select(self, mask):
+        """Winner for a request bitmask, or None when nothing is requested"""
+        if self.policy is not None:
+            # Called even for an empty mask: TDMA slots still advance
+            return self.policy.select(mask)
+        if not mask:
+            return None
+        mode = self.mode
+        if mode == ROUND_ROBIN:
+            # Lowest requester at or above the pointer, else wrap around
+            ptr = self.next_index
+            high = mask >> ptr << ptr
+            if high:
+                mask = high
+            winner = (mask & -mask).bit_length() - 1
+            self.next_index = (winner + 1) % self.device_count
+            return winner
+        if mode == DAISY_CHAIN:
+            return mask.bit_length() - 1
+        return (mask & -mask).bit_length() - 1
+
+    def step(self, requests=None):
+        """Run one arbitration cycle and return its CycleResult.
+
+        ``requests`` is a bitmask or a sequence of per-device booleans; when
+        omitted the next request pattern is generated, and None is returned
+        if the workload has run out.
+        """
+        if requests is None:
+            mask = self.generate_requests()
+            if mask is None:
+                return None
+        elif isinstance(requests, int):
+            mask = requests
+        else:
+            mask = requests_to_mask(requests)
+        data = None
+        if self.hold_remaining:
+            # Bus held by the current transaction: no arbitration this cycle
+            holder = self.holder
+            mask |= self.pending
+            self.pending = mask
+            self.hold_remaining -= 1
+            if not self.hold_remaining:
+                self.holder = None
+            self.busy_cycles += 1
+            if self.metrics is not None:
+                self.metrics.record_hold(mask)
+            result = CycleResult(self.cycle, mask, None, self.rng.randint(1, 255), holder)
+            self.cycle += 1
+            return result
+
+        mask |= self.pending
+        self.pending = 0
+        winner = self.select(mask)
+        if winner is not None:
+            data = self.rng.randint(1, 255)
+            self.grant_counts[winner] += 1
+            burst = self.draw_burst()
+            if burst > 1:
+                self.holder = winner
+                self.hold_remaining = burst - 1
+                self.pending = mask & ~(1 << winner)
+        else:
+            self.idle_cycles += 1
+        if self.metrics is not None:
+            self.metrics.record_mask(mask, winner)
+        result = CycleResult(self.cycle, mask, winner, data, winner)
+        self.cycle += 1
+        return result
+
+    def replay(self, result):
+        """Account a recorded CycleResult as if this engine had produced it"""
+        if result.winner is not None:
+            self.grant_counts[result.winner] += 1
+        elif result.holder is not None:
+            self.busy_cycles += 1
+        else:
+            self.idle_cycles += 1
+        if self.metrics is not None:
+            if result.winner is None and result.holder is not None:
+                self.metrics.record_hold(result.requests)
+            else:
+                self.metrics.record_mask(result.requests, result.winner)
+        self.cycle = result.cycle + 1
+
+    def run(self, cycles, request_probability=0.5):
+        """Run ``cycles`` cycles as fast as possible.
+
+        Requests come from the workload when one is set, otherwise each
+        device requests with ``request_probability`` per cycle. Returns the
+        number of cycles run, which is smaller only when a trace ran out.
+        """
+        if self._workload_masks is not None:
+            done = self.run_masks(islice(self._workload_masks, cycles))
+            if done < cycles:
+                self.workload_done = True
+            return done
+        bits = self.device_count
+        if request_probability == 0.5:
+            draw = partial(self.rng.getrandbits, bits)
+        else:
+            draw = partial(random_mask, self.rng, bits, request_probability)
+        # iter(callable, sentinel) keeps mask generation in C
+        return self.run_masks(islice(iter(draw, None), cycles))
+
+    def run_masks(self, masks):
+        """Arbitrate an iterable of request bitmasks and return how many there were.
+
+        Only the counters, metrics and round-robin state are updated; no
+        per-cycle results are kept. Small device counts use precomputed
+        lookup tables indexed by the request bitmask.
+        """
+        if self._burst_range != (1, 1) or self.hold_remaining or self.pending:
+            return self._run_bursts(iter(masks))
+        counts = self.grant_counts
+        granted_before = sum(counts)
+        record = self.metrics.record_mask if self.metrics is not None else None
+        idle = 0
+        if self.policy is not None or self.device_count > LUT_MAX_DEVICES:
+            select = self.select
+            for mask in masks:
+                w = select(mask)
+                if w is None:
+                    idle += 1
+                else:
+                    counts[w] += 1
+                if record is not None:
+                    record(mask, w)
+        elif record is not None:
+            if self.mode == ROUND_ROBIN:
+                winners, pointers = self._round_robin_lut()
+                ptr = self.next_index
+                for mask in masks:
+                    w = winners[ptr][mask]
+                    if w < 0:
+                        idle += 1
+                        record(mask, None)
+                    else:
+                        counts[w] += 1
+                        ptr = pointers[w]
+                        record(mask, w)
+                self.next_index = ptr
+            else:
+                winners = self._static_lut(self.mode)
+                for mask in masks:
+                    w = winners[mask]
+                    if w < 0:
+                        idle += 1
+                        record(mask, None)
+                    else:
+                        counts[w] += 1
+                        record(mask, w)
+        elif self.mode == ROUND_ROBIN:
+            winners, pointers = self._round_robin_lut()
+            ptr = self.next_index
+            for mask in masks:
+                w = winners[ptr][mask]
+                if w < 0:
+                    idle += 1
+                else:
+                    counts[w] += 1
+                    ptr = pointers[w]
+            self.next_index = ptr
+        else:
+            winners = self._static_lut(self.mode)
+            for mask in masks:
+                w = winners[mask]
+                if w < 0:
+                    idle += 1
+                else:
+                    counts[w] += 1
+        done = idle + sum(counts) - granted_before
+        self.idle_cycles += idle
+        self.cycle += done
+        return done
+
+    def _run_bursts(self, masks):
+        # Event driven: after a grant the held cycles are not stepped one by
+        # one; their requests are OR-ed into the latch in a single C-level
+        # reduce over the next burst - 1 masks (metrics, when tracked, still
+        # see every held cycle)
+        counts = self.grant_counts
+        metrics = self.metrics
+        select = self.select
+        draw_burst = self.draw_burst
+        pending = self.pending
+        hold = self.hold_remaining
+        holder = self.holder
+        done = idle = busy = 0
+        while True:
+            if hold:
+                held = list(islice(masks, hold))
+                if held:
+                    pending = reduce(or_, held, pending)
+                    busy += len(held)
+                    done += len(held)
+                    if metrics is not None:
+                        # Each held request waits from its own cycle, as in step()
+                        for held_mask in held:
+                            metrics.record_hold(held_mask)
+                hold -= len(held)
+                if hold:
+                    break  # ran out of requests while the bus is still held
+                holder = None
+            mask = next(masks, None)
+            if mask is None:
+                break
+            done += 1
+            mask |= pending
+            pending = 0
+            w = select(mask)
+            if metrics is not None:
+                metrics.record_mask(mask, w)
+            if w is None:
+                idle += 1
+                continue
+            counts[w] += 1
+            hold = draw_burst() - 1
+            if hold:
+                holder = w
+                pending = mask & ~(1 << w)
+        self.pending = pending
+        self.hold_remaining = hold
+        self.holder = holder
+        self.idle_cycles += idle
+        self.busy_cycles += busy
+        self.cycle += done
+        return done
+
+    def run_batch(self, requests):
+        """Arbitrate a (cycles x devices) boolean request matrix with NumPy.
+
+        Engine counters and the Round Robin pointer are carried across calls
+        exactly as if each row had been passed to step(). Returns the
+        batch_arbiter.BatchResult (winner vector, -1 for idle cycles).
+        """
+        import numpy as np  # numpy is only needed for batch mode
+        from batch_arbiter import BatchResult, arbitrate_batch, row_masks
+
+        if self._burst_range != (1, 1) or self.hold_remaining:
+            raise ValueError("run_batch() does not model multi-cycle bursts; use run()")
+        requests = np.asarray(requests, dtype=bool)
+        if requests.ndim != 2 or requests.shape[1] != self.device_count:
+            raise ValueError("request matrix must have one column per device")
+        if self.policy is not None:
+            # Registry policies keep their own state, so rows go one by one
+            select = self.policy.select
+            winners = np.array(
+                [-1 if w is None else w for w in map(select, row_masks(requests))],
+                dtype=np.int32,
+            )
+            counts = np.bincount(winners[winners >= 0], minlength=self.device_count)
+            result = BatchResult(winners, counts, self.next_index)
+        else:
+            result = arbitrate_batch(requests, self.mode, self.next_index)
+        self.next_index = result.next_index
+        for i, cnt in enumerate(result.grant_counts.tolist()):
+            self.grant_counts[i] += cnt
+        granted = int(result.grant_counts.sum())
+        self.idle_cycles += len(result.winners) - granted
+        self.cycle += len(result.winners)
+        if self.metrics is not None:
+            record = self.metrics.record_mask
+            for mask, w in zip(row_masks(requests), result.winners.tolist()):
+                record(mask, None if w < 0 else w)
+        return result
+
+    # --- lookup tables for run() ---
+    def _static_lut(self, mode):
+        lut = self._luts.get(mode)
+        if lut is None:
+            saved = self.mode
+            self.mode = mode
+            lut = [-1] + [self.select(mask) for mask in range(1, 1 << self.device_count)]
+            self.mode = saved
+            self._luts[mode] = lut
+        return lut
+
+    def _round_robin_lut(self):
+        lut = self._luts.get(ROUND_ROBIN)
+        if lut is None:
+            n = self.device_count
+            saved_mode, saved_next = self.mode, self.next_index
+            self.mode = ROUND_ROBIN
+            winners = []
+            for ptr in range(n):
+                row = [-1]
+                for mask in range(1, 1 << n):
+                    self.next_index = ptr
+                    row.append(self.select(mask))
+                winners.append(row)
+            self.mode, self.next_index = saved_mode, saved_next
+            pointers = [(w + 1) % n for w in range(n)]
+            lut = (winners, pointers)
+            self._luts[ROUND_ROBIN] = lut
+        return lut
@@ -0,0 +1,185 @@
+"""Vectorized batch arbitration over N cycles x D devices using NumPy.
+
+``arbitrate_batch`` takes a boolean request matrix (one row per cycle, one
+column per device) and returns the same winners ``ArbiterEngine.determine_winner``
+would produce row by row, with -1 marking idle cycles.
+"""
+import math
+from collections import namedtuple
+
+import numpy as np  # requires numpy (pip install numpy)
+
+from arbiter import FIXED_PRIORITY, ROUND_ROBIN, DAISY_CHAIN, MODES
+
+BatchResult = namedtuple("BatchResult", ["winners", "grant_counts", "next_index"])
+
+# Rows handled per pass; keeps the (rows x devices) work tables bounded.
+CHUNK_CELLS = 1 << 22
+# Up to this many devices rows are packed into request bitmasks and looked
+# up in tables covering all 2 ** D masks (2 ** D x D entries for Round Robin).
+LUT_MAX_DEVICES = 16
+
+
+def arbitrate_batch(requests, mode=FIXED_PRIORITY, next_index=0):
+    """Arbitrate every row of ``requests`` and return a BatchResult.
+
+    ``next_index`` is the Round Robin pointer before the first row; the
+    pointer after the last row is returned so consecutive batches can be
+    chained. Other modes return it unchanged.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode '{mode}'")
+    req = np.asarray(requests, dtype=bool)
+    if req.ndim != 2 or req.shape[1] == 0:
+        raise ValueError("requests must be a 2-D (cycles x devices) matrix")
+    n, d = req.shape
+    if not 0 <= next_index < d:
+        raise ValueError("next_index out of range")
+
+    winners = np.empty(n, dtype=np.int32)
+    rows_per_chunk = max(1, CHUNK_CELLS // d)
+    for start in range(0, n, rows_per_chunk):
+        block = req[start:start + rows_per_chunk]
+        out = winners[start:start + len(block)]
+        if mode == ROUND_ROBIN:
+            next_index = _round_robin(block, next_index, out)
+        elif d <= LUT_MAX_DEVICES:
+            out[:] = _mask_luts(d)[mode][_pack_rows(block)]
+        else:
+            out[:] = _static_winners(block, mode)
+
+    grant_counts = np.bincount(winners[winners >= 0], minlength=d)
+    return BatchResult(winners, grant_counts, next_index)
+
+
+def _static_winners(req, mode):
+    """Fixed Priority / Daisy Chain winner of every row, -1 when idle"""
+    d = req.shape[1]
+    if mode == DAISY_CHAIN:
+        win = d - 1 - np.argmax(req[:, ::-1], axis=1)
+    else:
+        win = np.argmax(req, axis=1)
+    win = win.astype(np.int32)
+    win[~req.any(axis=1)] = -1
+    return win
+
+
+def _round_robin(req, next_index, out):
+    """Stateful round robin over ``req`` rows, writing winners into ``out``.
+
+    Up to LUT_MAX_DEVICES devices every row is reduced to its request
+    bitmask, which indexes flat tables of "winner given pointer" and "next
+    pointer given pointer"; the pointer sequence is then resolved
+    block-wise, so only O(sqrt N) Python-level iterations are needed.
+
+    Wider buses would need (rows x devices) tables, whose cost grows with the
+    device count, so their rows are packed into bitmasks and scanned one by
+    one with the engine's bit tricks instead: about 1-3 M cycles/s whatever
+    the width, against tens of millions on the table path.
+    """
+    n, d = req.shape
+    if d > LUT_MAX_DEVICES:
+        return _round_robin_packed(req, next_index, out)
+    win_lut, ptr_lut = _mask_luts(d)[ROUND_ROBIN]
+    return _round_robin_scan(_pack_rows(req), 0, win_lut.ravel(), ptr_lut.ravel(), d,
+                             next_index, out)
+
+
+def _round_robin_packed(req, next_index, out):
+    """Round robin over packed row bitmasks, as ArbiterEngine.select does it"""
+    d = req.shape[1]
+    ptr = next_index
+    winners = []
+    append = winners.append
+    for mask in row_masks(req):
+        if mask:
+            # Lowest requester at or above the pointer, else wrap around
+            high = mask >> ptr << ptr
+            if high:
+                mask = high
+            winner = (mask & -mask).bit_length() - 1
+            ptr = winner + 1 if winner + 1 < d else 0
+            append(winner)
+        else:
+            append(-1)
+    out[:] = winners
+    return ptr
+
+
+def _round_robin_tables(req):
+    """Winner and next pointer for every (row, pointer) pair of ``req``"""
+    n, d = req.shape
+    idx = np.arange(d, dtype=np.int32)
+    # nxt[t, j]: first requesting device >= j in row t, or d when there is none
+    cand = np.where(req, idx, np.int32(d))
+    nxt = np.minimum.accumulate(cand[:, ::-1], axis=1)[:, ::-1]
+    first = nxt[:, :1]
+    has_req = first < d
+    win = np.where(nxt < d, nxt, first)
+    ptr = np.where(has_req, (win + 1) % d, idx).astype(np.int32)
+    win = np.where(has_req, win, -1).astype(np.int32)
+    return win, ptr
+
+
+_lut_cache = {}
+
+
+def _mask_luts(d):
+    """Per-mode tables indexed by request bitmask, built once per device count"""
+    luts = _lut_cache.get(d)
+    if luts is None:
+        masks = np.arange(1 << d)
+        all_requests = ((masks[:, None] >> np.arange(d)) & 1).astype(bool)
+        luts = {
+            FIXED_PRIORITY: _static_winners(all_requests, FIXED_PRIORITY),
+            DAISY_CHAIN: _static_winners(all_requests, DAISY_CHAIN),
+            ROUND_ROBIN: _round_robin_tables(all_requests),
+        }
+        _lut_cache[d] = luts
+    return luts
+
+
+def _pack_rows(req):
+    """Request bitmask per row (bit i set when device i requests)"""
+    codes = req[:, 0].astype(np.intp)
+    for i in range(1, req.shape[1]):
+        codes |= req[:, i].astype(np.intp) << i
+    return codes
+
+
+def row_masks(req):
+    """Request bitmask of every row as a list of Python ints"""
+    if req.shape[1] <= 62:
+        return req.dot(1 << np.arange(req.shape[1], dtype=np.int64)).tolist()
+    packed = np.packbits(req, axis=1, bitorder="little")
+    return [int.from_bytes(row.tobytes(), "little") for row in packed]
+
+
+def _round_robin_scan(codes, empty, win_lut, ptr_lut, d, next_index, out):
+    n = len(codes)
+    block = max(1, int(math.isqrt(n)))
+    nb = -(-n // block)
+    base = np.full(nb * block, empty * d, dtype=np.intp)
+    base[:n] = codes * d
+    # (block, nb): row j holds the j-th cycle of every block, contiguously
+    base = np.ascontiguousarray(base.reshape(nb, block).T)
+
+    # Pointer map of each whole block: comp[b, p] = pointer after block b
+    comp = np.tile(np.arange(d, dtype=np.intp), (nb, 1))
+    for j in range(block):
+        comp = ptr_lut[base[j][:, None] + comp]
+
+    starts = np.empty(nb, dtype=np.intp)
+    ptr = next_index
+    for b, mapping in enumerate(comp.tolist()):
+        starts[b] = ptr
+        ptr = mapping[ptr]
+
+    result = np.empty((block, nb), dtype=np.int32)
+    cur = starts
+    for j in range(block):
+        k = base[j] + cur
+        result[j] = win_lut[k]
+        cur = ptr_lut[k]
+    out[:] = result.T.reshape(-1)[:n]
+    return int(ptr)
@@ -0,0 +1,116 @@
+"""Cold-start benchmark for the simulator.
+
+Each run uses a fresh interpreter, so nothing is cached in sys.modules:
+
+* ``import``: time to ``import ddco3``
+* ``window``: time from interpreter start of the GUI code to the first drawn
+  frame (Tk root, BusArbitrationSimulator, ``update()``); skipped without a
+  display
+* the slowest modules of the import chain, from ``python -X importtime``
+
+Usage::
+
+    python bench_startup.py [--runs 5] [--top 10] [--max-ms 1000] [--json]
+
+With ``--max-ms`` the exit status is 1 when the median window time (or the
+import time, without a display) exceeds the limit.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_SNIPPET = """
+import time
+t = time.perf_counter()
+import ddco3
+print(time.perf_counter() - t)
+"""
+
+WINDOW_SNIPPET = """
+import time
+t = time.perf_counter()
+import tkinter as tk
+try:
+    root = tk.Tk()
+except tk.TclError:
+    print("none")
+    raise SystemExit
+import ddco3
+app = ddco3.BusArbitrationSimulator(root)
+root.update()
+print(time.perf_counter() - t)
+app.cleanup()
+root.destroy()
+"""
+
+
+def _run(snippet):
+    out = subprocess.run([sys.executable, "-c", snippet], cwd=HERE, capture_output=True,
+                         text=True, check=True)
+    value = out.stdout.strip().splitlines()[-1]
+    return None if value == "none" else float(value) * 1000.0
+
+
+def import_profile(top=10):
+    """[(module, cumulative ms)] of the slowest imports under ``import ddco3``"""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import ddco3"], cwd=HERE,
+                         capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(cumulative) / 1000.0))
+    rows.sort(key=lambda row: row[1], reverse=True)
+    return rows[:top]
+
+
+def benchmark(runs=5, top=10):
+    imports = [_run(IMPORT_SNIPPET) for _ in range(runs)]
+    windows = [_run(WINDOW_SNIPPET) for _ in range(runs)]
+    return {
+        "runs": runs,
+        "import_ms": statistics.median(imports),
+        "import_ms_min": min(imports),
+        "window_ms": None if None in windows else statistics.median(windows),
+        "window_ms_min": None if None in windows else min(windows),
+        "slowest_imports": import_profile(top),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure simulator import and window start-up time")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per measurement")
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list")
+    parser.add_argument("--max-ms", type=float, help="fail when start-up takes longer")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    result = benchmark(args.runs, args.top)
+    if args.json:
+        json.dump(result, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        print(f"import ddco3: {result['import_ms']:.1f} ms (median of {args.runs}, "
+              f"min {result['import_ms_min']:.1f})")
+        if result["window_ms"] is None:
+            print("window: skipped (no display)")
+        else:
+            print(f"first frame:  {result['window_ms']:.1f} ms (median, min {result['window_ms_min']:.1f})")
+        print("slowest imports (cumulative ms):")
+        for name, ms in result["slowest_imports"]:
+            print(f"  {ms:8.1f}  {name}")
+
+    startup = result["window_ms"] if result["window_ms"] is not None else result["import_ms"]
+    if args.max_ms is not None and startup > args.max_ms:
+        print(f"start-up {startup:.1f} ms exceeds {args.max_ms:.1f} ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
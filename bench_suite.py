@@ -0,0 +1,312 @@
+"""Headless benchmark suite for the simulator's hot paths.
+
+Benchmarks (all rates are operations per second, higher is better):
+
+* ``determine_winner/<mode>/<devices>``: arbitration decisions on random
+  request masks, for every mode and registered policy
+* ``wire/...``: BUS_EVENT encoding and decoding, text and binary, single
+  events and a coalesced datagram
+* ``log/append/<max_lines>`` and ``log/flush/<max_lines>``: LogBuffer
+  appends with a full history, and the per-frame take_pending of a frame's
+  worth of messages, versus the history size
+* ``capture/...``: parsing ``bench_data/bus_events.pcap`` (read_packets
+  alone, then with the StreamDecoder), in packets per second
+
+Each benchmark reports the best of ``--repeat`` runs. Results can be written
+as JSON and compared with a stored baseline; with ``--check`` the exit
+status is 1 when any rate fell by more than ``--tolerance``. Baselines are
+machine-specific: record one with ``--save-baseline`` on the machine that
+runs the comparison.
+
+Usage::
+
+    python bench_suite.py [--only wire log] [--quick] [--json out.json]
+        [--baseline bench_data/baseline.json] [--check] [--save-baseline]
+    python bench_suite.py --make-pcap   # regenerate the bundled capture
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+import wire
+from arbiter import ArbiterEngine, available_modes
+from capture_decoder import StreamDecoder
+from log_buffer import LogBuffer
+from pcap import read_packets, write_pcap
+from udp_sender import DEFAULT_MTU
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(HERE, "bench_data")
+PCAP_PATH = os.path.join(DATA_DIR, "bus_events.pcap")
+BASELINE_PATH = os.path.join(DATA_DIR, "baseline.json")
+
+DEVICE_COUNTS = (4, 16, 64, 256)
+LOG_SIZES = (200, 2000, 20000)
+GROUPS = ("arbitration", "wire", "log", "capture")
+TOLERANCE = 0.25
+
+PCAP_CYCLES = 3000
+PCAP_DEVICES = 8
+
+
+def _best_rate(func, ops, repeat):
+    """Best ops/s of ``repeat`` calls of func(), each doing ``ops`` operations"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if elapsed > 0 and (best is None or ops / elapsed > best):
+            best = ops / elapsed
+    return best
+
+
+def bench_arbitration(scale, repeat):
+    results = {}
+    calls = int(50000 * scale)
+    for n in DEVICE_COUNTS:
+        rng = random.Random(n)
+        masks = [rng.getrandbits(n) for _ in range(calls)]
+        for mode in available_modes():
+            engine = ArbiterEngine(n, mode, seed=1)
+
+            def run():
+                determine = engine.determine_winner
+                for mask in masks:
+                    determine(mask)
+
+            results[f"determine_winner/{mode}/{n}"] = _best_rate(run, calls, repeat)
+    return results
+
+
+def bench_wire(scale, repeat):
+    calls = int(100000 * scale)
+    text = wire.encode_text("DATA", "Device 3", 200)
+    stamped = wire.stamp(text, 12345, time.monotonic_ns())
+    binary = wire.stamp(wire.encode_binary("DATA", 2, 200, 123456), 12345, time.monotonic_ns())
+    per_datagram = DEFAULT_MTU // wire.FRAME_SIZE
+    datagram = b"".join([binary] * per_datagram)
+    datagrams = max(1, calls // per_datagram)
+
+    def encode_text():
+        encode = wire.encode_text
+        for i in range(calls):
+            encode("DATA", "Device 3", i & 0xFF)
+
+    def encode_binary():
+        # Emission times are filled in by the sender thread, as in the GUI
+        encode = wire.encode_binary
+        for i in range(calls):
+            encode("DATA", 2, i & 0xFF, i)
+
+    def decode(payload):
+        def run():
+            dec = wire.decode
+            for _ in range(calls):
+                dec(payload)
+        return run
+
+    def decode_datagram():
+        dec = wire.decode_datagram
+        for _ in range(datagrams):
+            dec(datagram)
+
+    return {
+        "wire/encode_text": _best_rate(encode_text, calls, repeat),
+        "wire/encode_binary": _best_rate(encode_binary, calls, repeat),
+        "wire/decode_text": _best_rate(decode(stamped), calls, repeat),
+        "wire/decode_binary": _best_rate(decode(binary), calls, repeat),
+        "wire/decode_datagram_events": _best_rate(decode_datagram, datagrams * per_datagram, repeat),
+    }
+
+
+def bench_log(scale, repeat):
+    results = {}
+    calls = int(100000 * scale)
+    msg = "Bus granted to Device 3.\n"
+    for size in LOG_SIZES:
+        buf = LogBuffer(max_lines=size)
+        for _ in range(size):
+            buf.append(msg)
+        buf.take_pending()
+
+        def append():
+            add = buf.append
+            for _ in range(calls):
+                add(msg)
+
+        results[f"log/append/{size}"] = _best_rate(append, calls, repeat)
+
+        # A frame's worth of messages (a fast run logs about 1 per cycle)
+        frames = max(1, calls // 100)
+
+        def flush():
+            add, take = buf.append, buf.take_pending
+            for _ in range(frames):
+                for _ in range(100):
+                    add(msg)
+                take()
+
+        results[f"log/flush/{size}"] = _best_rate(flush, frames, repeat)
+    return results
+
+
+def bench_capture(scale, repeat):
+    if not os.path.exists(PCAP_PATH):
+        raise FileNotFoundError(f"{PCAP_PATH} is missing; run with --make-pcap")
+    packets = sum(1 for _ in read_packets(PCAP_PATH, 5555))
+    passes = max(1, int(5 * scale))
+
+    def parse():
+        for _ in range(passes):
+            for _ in read_packets(PCAP_PATH, 5555):
+                pass
+
+    def decode():
+        for _ in range(passes):
+            decoder = StreamDecoder()
+            for pkt in read_packets(PCAP_PATH, 5555):
+                decoder.feed_packet(pkt)
+
+    return {
+        "capture/read_packets": _best_rate(parse, packets * passes, repeat),
+        "capture/decode": _best_rate(decode, packets * passes, repeat),
+    }
+
+
+BENCHMARKS = {
+    "arbitration": bench_arbitration,
+    "wire": bench_wire,
+    "log": bench_log,
+    "capture": bench_capture,
+}
+
+
+def make_pcap(path=PCAP_PATH, cycles=PCAP_CYCLES):
+    """Write the benchmark capture: a seeded run sent in MTU-sized datagrams"""
+    engine = ArbiterEngine(PCAP_DEVICES, "Round Robin", seed=2024, burst_length=(1, 4))
+    per_datagram = DEFAULT_MTU // wire.FRAME_SIZE
+    when = 1700000000.0
+    pending, datagrams, seq = [], [], 0
+    for _ in range(cycles):
+        result = engine.step()
+        if result.winner is not None:
+            events = [("GRANT", result.winner, None), ("DATA", result.winner, result.data)]
+        elif result.holder is not None:
+            events = [("DATA", result.holder, result.data)]
+        else:
+            events = [("IDLE", None, None)]
+        for kind, device, data in events:
+            pending.append(wire.encode_binary(kind, device, data, result.cycle, int(when * 1e6)))
+        when += 0.0005
+        # Every fourth cycle flush, like a sender thread waking up
+        if len(pending) >= per_datagram or result.cycle % 4 == 3:
+            while pending:
+                batch, pending = pending[:per_datagram], pending[per_datagram:]
+                sent = int(when * 1e9)
+                datagrams.append((when + 0.0001, b"".join(
+                    wire.stamp(p, seq + i + 1, sent) for i, p in enumerate(batch))))
+                seq += len(batch)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    write_pcap(path, datagrams)
+    return len(datagrams)
+
+
+def run(groups, scale=1.0, repeat=3):
+    results = {}
+    for group in groups:
+        results.update(BENCHMARKS[group](scale, repeat))
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "scale": scale,
+        "results": results,
+    }
+
+
+def compare(report, baseline, tolerance=TOLERANCE):
+    """{name: (baseline, current, ratio, regressed)} for benchmarks in both"""
+    rows = {}
+    for name, current in report["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None or current is None:
+            continue
+        ratio = current / base
+        rows[name] = (base, current, ratio, ratio < 1.0 - tolerance)
+    return rows
+
+
+def format_report(report, comparison=None):
+    width = max(len(name) for name in report["results"]) if report["results"] else 10
+    lines = []
+    for name, rate in report["results"].items():
+        line = f"{name.ljust(width)}  {rate:14,.0f} /s"
+        if comparison and name in comparison:
+            base, _, ratio, regressed = comparison[name]
+            line += f"  baseline {base:14,.0f}  {ratio:6.2f}x"
+            if regressed:
+                line += "  REGRESSION"
+        lines.append(line)
+    return "\n".join(lines) + "\n"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark arbitration, wire encoding, logging and capture parsing")
+    parser.add_argument("--only", nargs="+", choices=GROUPS, default=list(GROUPS), help="benchmark groups")
+    parser.add_argument("--quick", action="store_true", help="a tenth of the work (noisier)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark; the best one counts")
+    parser.add_argument("--json", metavar="PATH", help="write the report as JSON ('-' for stdout)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON to compare with")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="allowed slowdown before a result counts as a regression (0.25 = 25%%)")
+    parser.add_argument("--check", action="store_true", help="exit with status 1 on any regression")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--make-pcap", action="store_true", help="regenerate the bundled capture and exit")
+    args = parser.parse_args(argv)
+
+    if args.make_pcap:
+        count = make_pcap()
+        print(f"{count} datagrams written to {PCAP_PATH}")
+        return
+
+    report = run(args.only, 0.1 if args.quick else 1.0, args.repeat)
+    comparison = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            comparison = compare(report, json.load(f), args.tolerance)
+        report["baseline"] = {
+            name: {"baseline": base, "ratio": ratio, "regressed": regressed}
+            for name, (base, _, ratio, regressed) in comparison.items()
+        }
+
+    if args.json == "-":
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        sys.stdout.write(format_report(report, comparison))
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+                f.write("\n")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"baseline saved to {args.baseline}", file=sys.stderr)
+    regressions = [name for name, row in (comparison or {}).items() if row[3]]
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed by more than {args.tolerance:.0%}: "
+              + ", ".join(regressions), file=sys.stderr)
+        if args.check:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
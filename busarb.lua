@@ -0,0 +1,98 @@
+-- Wireshark dissector for the simulator's binary BUS_EVENT frames.
+--
+-- Install by copying this file into the Wireshark personal Lua plugins
+-- folder (Help > About Wireshark > Folders), then restart Wireshark or use
+-- Analyze > Reload Lua Plugins. Frames on UDP port 5555 that start with the
+-- "BA" magic are decoded; text BUS_EVENT payloads are left to the default
+-- data dissector. Example filters: busarb.device == 2, busarb.event == 1
+--
+-- The frame layout is documented in wire.py.
+
+local busarb = Proto("busarb", "Bus Arbitration Event")
+
+-- Frame length by version; version 2 appends the sequence number and send time
+local FRAME_LENS = { [1] = 24, [2] = 36 }
+local NO_DATA = 0xFFFF
+
+local event_names = { [1] = "GRANT", [2] = "DATA", [3] = "IDLE" }
+
+local f_magic = ProtoField.string("busarb.magic", "Magic")
+local f_version = ProtoField.uint8("busarb.version", "Version")
+local f_event = ProtoField.uint8("busarb.event", "Event", base.DEC, event_names)
+local f_device = ProtoField.uint16("busarb.device", "Device", base.DEC, { [0] = "NONE" })
+local f_data = ProtoField.uint16("busarb.data", "Data", base.DEC, { [NO_DATA] = "-" })
+local f_cycle = ProtoField.uint64("busarb.cycle", "Cycle")
+local f_timestamp = ProtoField.uint64("busarb.timestamp_us", "Timestamp (us since epoch)")
+local f_seq = ProtoField.uint32("busarb.seq", "Sequence number")
+local f_sent = ProtoField.uint64("busarb.sent_ns", "Send time (sender monotonic ns)")
+
+busarb.fields = { f_magic, f_version, f_event, f_device, f_data, f_cycle, f_timestamp, f_seq, f_sent }
+
+-- Length of the frame at offset, or nil if there is no complete frame
+local function frame_len(buf, offset)
+    if offset + 3 > buf:len() or buf(offset, 2):string() ~= "BA" then
+        return nil
+    end
+    local len = FRAME_LENS[buf(offset + 2, 1):uint()]
+    if len == nil or offset + len > buf:len() then
+        return nil
+    end
+    return len
+end
+
+local function add_frame(buf, offset, len, tree)
+    local frame = buf(offset, len)
+    local subtree = tree:add(busarb, frame)
+    subtree:add(f_magic, buf(offset, 2))
+    subtree:add(f_version, buf(offset + 2, 1))
+    subtree:add(f_event, buf(offset + 3, 1))
+    subtree:add(f_device, buf(offset + 4, 2))
+    subtree:add(f_data, buf(offset + 6, 2))
+    subtree:add(f_cycle, buf(offset + 8, 8))
+    subtree:add(f_timestamp, buf(offset + 16, 8))
+    if len >= 36 then
+        subtree:add(f_seq, buf(offset + 24, 4))
+        subtree:add(f_sent, buf(offset + 28, 8))
+    end
+
+    local event = event_names[buf(offset + 3, 1):uint()] or "?"
+    local info = event .. " cycle=" .. tostring(buf(offset + 8, 8):uint64())
+    local device = buf(offset + 4, 2):uint()
+    if device ~= 0 then
+        info = info .. " device=" .. device
+    end
+    local data = buf(offset + 6, 2):uint()
+    if data ~= NO_DATA then
+        info = info .. " data=" .. data
+    end
+    subtree:append_text(": " .. info)
+    return info
+end
+
+-- One datagram may carry several concatenated frames (batched sender)
+function busarb.dissector(buf, pinfo, tree)
+    if frame_len(buf, 0) == nil then
+        return 0
+    end
+    pinfo.cols.protocol = "BUSARB"
+
+    local offset = 0
+    local first_info = nil
+    local count = 0
+    local len = frame_len(buf, offset)
+    while len ~= nil do
+        local info = add_frame(buf, offset, len, tree)
+        first_info = first_info or info
+        count = count + 1
+        offset = offset + len
+        len = frame_len(buf, offset)
+    end
+    if count == 1 then
+        pinfo.cols.info = "BUS_EVENT " .. first_info
+    else
+        pinfo.cols.info = "BUS_EVENT x" .. count .. " (" .. first_info .. ", ...)"
+    end
+    return offset
+end
+
+DissectorTable.get("udp.port"):add(5555, busarb)
@@ -0,0 +1,188 @@
+"""Offline analysis of captured BUS_EVENT traffic.
+
+Reads a saved pcap/pcapng file (with the built-in reader, or tshark when a
+path to it is given), decodes every datagram with ``wire.decode_datagram``
+and accumulates grant counts, the idle ratio and per-device latencies.
+
+Usage::
+
+    python capture_analysis.py run.pcapng [--port 5555] [--tshark PATH] [--json]
+"""
+import argparse
+import json
+import sys
+
+import wire
+from pcap import read_packets
+from tshark_reader import TsharkFieldsReader
+
+
+class CaptureAnalyzer:
+    """Accumulates arbitration statistics from decoded BUS_EVENTs.
+
+    Each arbitration cycle emits exactly one GRANT or IDLE event, and each
+    further cycle of a burst one DATA beat from the device holding the bus,
+    so cycles are counted from those; text payloads carry no cycle number,
+    so one is derived from that count. Per device it tracks the delay from
+    emission to capture of its events (binary frames only, which carry
+    their emission time) and the number of cycles between consecutive
+    grants.
+    """
+
+    def __init__(self):
+        self._clear()
+
+    def _clear(self):
+        """Forget everything fed so far"""
+        self.packets = 0
+        self.events = 0
+        self.undecodable = 0
+        self.cycles = 0
+        self.idle = 0
+        self.busy = 0
+        self.grant_counts = {}
+        self.first_time = None
+        self.last_time = None
+        self._granted = set()  # devices whose grant's DATA beat is still due
+        self._last_grant_cycle = {}
+        self._holder = None
+        self._latency = {}  # device -> [count, total, max] emission to capture, seconds
+        self._gaps = {}  # device -> [count, total cycles]
+
+    def feed_packet(self, pkt):
+        self.packets += 1
+        if pkt.time is not None:
+            if self.first_time is None:
+                self.first_time = pkt.time
+            self.last_time = pkt.time
+        try:
+            events = wire.decode_datagram(pkt.payload)
+        except ValueError:
+            self.undecodable += 1
+            return
+        for event in events:
+            self.feed_event(event, pkt.time)
+
+    def feed_event(self, event, when=None):
+        self.events += 1
+        kind = event.event
+        device = event.device
+        if device is not None and event.timestamp is not None and when is not None:
+            delay = when - event.timestamp / 1e6
+            lat = self._latency.get(device)
+            if lat is None:
+                self._latency[device] = [1, delay, delay]
+            else:
+                lat[0] += 1
+                lat[1] += delay
+                if delay > lat[2]:
+                    lat[2] = delay
+        if kind == "GRANT" or kind == "IDLE":
+            cycle = event.cycle if event.cycle is not None else self.cycles
+            self.cycles += 1
+            if kind == "IDLE":
+                self.idle += 1
+                self._holder = None
+                return
+            self._holder = device
+            self.grant_counts[device] = self.grant_counts.get(device, 0) + 1
+            self._granted.add(device)
+            last = self._last_grant_cycle.get(device)
+            if last is not None:
+                gap = self._gaps.setdefault(device, [0, 0])
+                gap[0] += 1
+                gap[1] += cycle - last
+            self._last_grant_cycle[device] = cycle
+        elif kind == "DATA":
+            if device in self._granted:
+                self._granted.discard(device)
+            elif device == self._holder:
+                # Data beat of a cycle in which a burst holds the bus
+                self.cycles += 1
+                self.busy += 1
+
+    @property
+    def idle_ratio(self):
+        return self.idle / self.cycles if self.cycles else 0.0
+
+    def summary(self):
+        devices = {}
+        granted = sum(self.grant_counts.values())
+        for device in sorted(d for d in self.grant_counts if d is not None):
+            count = self.grant_counts[device]
+            lat = self._latency.get(device)
+            gap = self._gaps.get(device)
+            devices[f"Device {device + 1}"] = {
+                "grants": count,
+                "share": count / granted if granted else 0.0,
+                "emit_to_capture_avg_s": lat[1] / lat[0] if lat else None,
+                "emit_to_capture_max_s": lat[2] if lat else None,
+                "mean_cycles_between_grants": gap[1] / gap[0] if gap else None,
+            }
+        duration = None
+        if self.first_time is not None and self.last_time is not None:
+            duration = self.last_time - self.first_time
+        return {
+            "packets": self.packets,
+            "events": self.events,
+            "undecodable": self.undecodable,
+            "cycles": self.cycles,
+            "idle_cycles": self.idle,
+            "busy_cycles": self.busy,
+            "idle_ratio": self.idle_ratio,
+            "duration_s": duration,
+            "devices": devices,
+        }
+
+
+def analyze_file(path, udp_port=5555, tshark_path=None):
+    """Analyze a capture file; returns the filled CaptureAnalyzer"""
+    analyzer = CaptureAnalyzer()
+    if tshark_path:
+        reader = TsharkFieldsReader(tshark_path, read_file=path, udp_port=udp_port)
+        packets = reader.packets()
+    else:
+        packets = read_packets(path, udp_port)
+    for pkt in packets:
+        analyzer.feed_packet(pkt)
+    if tshark_path and reader.returncode:
+        raise RuntimeError(reader.error_text() or f"tshark exited with code {reader.returncode}")
+    return analyzer
+
+
+def format_summary(summary):
+    lines = [
+        f"Packets: {summary['packets']}  events: {summary['events']}  "
+        f"undecodable: {summary['undecodable']}",
+        f"Cycles: {summary['cycles']}  idle: {summary['idle_cycles']}  "
+        f"held by bursts: {summary['busy_cycles']}  idle ratio: {summary['idle_ratio']:.3f}",
+    ]
+    for name, dev in summary["devices"].items():
+        line = f"{name}: grants={dev['grants']} ({dev['share'] * 100:.1f}%)"
+        if dev["emit_to_capture_avg_s"] is not None:
+            line += (f" emit->capture avg={dev['emit_to_capture_avg_s'] * 1000:.3f}ms"
+                     f" max={dev['emit_to_capture_max_s'] * 1000:.3f}ms")
+        if dev["mean_cycles_between_grants"] is not None:
+            line += f" every {dev['mean_cycles_between_grants']:.2f} cycles"
+        lines.append(line)
+    return "\n".join(lines) + "\n"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze a saved BUS_EVENT capture")
+    parser.add_argument("capture", help="pcap or pcapng file")
+    parser.add_argument("--port", type=int, default=5555, help="UDP port of the BUS_EVENT traffic")
+    parser.add_argument("--tshark", help="decode with this tshark instead of the built-in reader")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args(argv)
+
+    summary = analyze_file(args.capture, args.port, args.tshark).summary()
+    if args.json:
+        json.dump(summary, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        sys.stdout.write(format_summary(summary))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""Live decoding of captured BUS_EVENT traffic.
+
+``StreamDecoder`` extends the offline ``CaptureAnalyzer`` for use on a
+capture thread: every datagram is turned into GRANT/DATA/IDLE records as it
+arrives, grant counts and per-device bus tenures are kept up to date, and
+the cycle numbers carried by binary frames are checked for gaps (lost
+datagrams), cycles arriving late (reordered) or twice (duplicated). Text
+payloads carry no cycle number, so for them only ``cross_check`` against
+the simulator's own counters can reveal losses.
+"""
+from collections import deque, namedtuple
+
+import wire
+from capture_analysis import CaptureAnalyzer
+
+# Cycles remembered as missing so that a late arrival counts as reordered
+MISSING_WINDOW = 4096
+TIMELINE_LENGTH = 256
+
+# One decoded BUS_EVENT; time is the capture timestamp (None if unknown)
+CaptureRecord = namedtuple("CaptureRecord", ["cycle", "event", "device", "data", "time"])
+
+# One bus tenure of a device: grant cycle, data beats seen, capture time of the grant
+Tenure = namedtuple("Tenure", ["cycle", "beats", "time"])
+
+
+class StreamDecoder(CaptureAnalyzer):
+    """Incremental decoder and consistency checker for a live capture.
+
+    ``feed_payload`` returns the records of one datagram. Anomalies are
+    counted (``lost_cycles``, ``reordered``, ``duplicates``,
+    ``missing_data``, ``anomaly_count``) and the latest 100 described in
+    ``anomalies``. Call ``reset`` from any thread when the simulator starts
+    a new session; the capture thread applies it before the next datagram.
+    """
+
+    def __init__(self, timeline_length=TIMELINE_LENGTH, latency=None):
+        self.timeline_length = timeline_length
+        # latency.LatencyTracker receiving arrival/total samples, optional
+        self.latency = latency
+        super().__init__()
+
+    def _clear(self):
+        super()._clear()
+        self.lost_cycles = 0
+        self.reordered = 0
+        self.duplicates = 0
+        self.missing_data = 0
+        self.last_cycle = None
+        self.anomaly_count = 0
+        self.anomalies = deque(maxlen=100)
+        self.timelines = {}  # device -> deque of Tenures
+        self._missing = {}  # cycle -> None, oldest first
+        self._pending = set()  # (device, cycle) of grants still waiting for their DATA
+        self._reset_requested = False
+
+    def reset(self):
+        self._reset_requested = True
+
+    def feed_payload(self, payload, when=None):
+        """Decode one datagram; returns its CaptureRecords"""
+        if self._reset_requested:
+            self._clear()
+        self.packets += 1
+        if when is not None:
+            if self.first_time is None:
+                self.first_time = when
+            self.last_time = when
+        try:
+            events = wire.decode_datagram(payload)
+        except ValueError:
+            self.undecodable += 1
+            return []
+        records = []
+        sent_ns = None
+        for event in events:
+            if self.latency is not None and when is not None:
+                # One arrival sample per datagram, one total per (binary) event
+                self.latency.record_capture(event.sent_ns if event.sent_ns != sent_ns else None,
+                                            event.timestamp, when)
+                sent_ns = event.sent_ns
+            if not self._check_order(event):
+                continue
+            self.feed_event(event, when)
+            records.append(CaptureRecord(
+                self.cycles - 1 if event.cycle is None else event.cycle,
+                event.event, event.device, event.data, when,
+            ))
+            self._track_tenure(event, when)
+        return records
+
+    def feed_packet(self, pkt):
+        self.feed_payload(pkt.payload, pkt.time)
+
+    def _check_order(self, event):
+        """Check the cycle number of a binary frame; False for a duplicate"""
+        cycle = event.cycle
+        if cycle is None:
+            return True
+        key = (event.device, cycle)
+        if event.event == "DATA" and key in self._pending:
+            self._pending.discard(key)  # the DATA beat of a GRANT already seen
+            return True
+        last = self.last_cycle
+        if last is None or cycle > last:
+            # A new cycle: earlier grants should have had their DATA by now
+            for device, granted in sorted(self._pending, key=lambda k: k[1]):
+                self.missing_data += 1
+                self._anomaly(f"cycle {granted}: GRANT to Device {device + 1} without DATA")
+            self._pending.clear()
+            if last is not None and cycle > last + 1:
+                self.lost_cycles += cycle - last - 1
+                self._anomaly(f"cycles {last + 1}..{cycle - 1} missing")
+                for missed in range(max(last + 1, cycle - MISSING_WINDOW), cycle):
+                    self._missing[missed] = None
+                while len(self._missing) > MISSING_WINDOW:
+                    del self._missing[next(iter(self._missing))]
+            self.last_cycle = cycle
+        elif cycle in self._missing:
+            del self._missing[cycle]
+            self.lost_cycles -= 1
+            self.reordered += 1
+            self._anomaly(f"cycle {cycle} arrived after cycle {last}")
+        else:
+            self.duplicates += 1
+            self._anomaly(f"cycle {cycle} {event.event} seen twice")
+            return False
+        if event.event == "GRANT":
+            self._pending.add(key)
+        return True
+
+    def _track_tenure(self, event, when):
+        device = event.device
+        if device is None:
+            return
+        if event.event == "GRANT":
+            timeline = self.timelines.get(device)
+            if timeline is None:
+                timeline = self.timelines[device] = deque(maxlen=self.timeline_length)
+            timeline.append(Tenure(event.cycle if event.cycle is not None else self.cycles - 1, 0, when))
+        elif event.event == "DATA":
+            timeline = self.timelines.get(device)
+            if timeline:
+                timeline[-1] = timeline[-1]._replace(beats=timeline[-1].beats + 1)
+
+    def _anomaly(self, text):
+        self.anomaly_count += 1
+        self.anomalies.append(text)
+
+    def cross_check(self, grant_counts, idle_cycles=None, busy_cycles=None):
+        """[(name, simulator value, captured value)] for every counter that differs.
+
+        Only meaningful once the capture has caught up with the simulator,
+        e.g. shortly after the simulation stopped.
+        """
+        diffs = []
+        for device, expected in enumerate(grant_counts):
+            seen = self.grant_counts.get(device, 0)
+            if seen != expected:
+                diffs.append((f"Device {device + 1} grants", expected, seen))
+        if idle_cycles is not None and idle_cycles != self.idle:
+            diffs.append(("idle cycles", idle_cycles, self.idle))
+        if busy_cycles is not None and busy_cycles != self.busy:
+            diffs.append(("burst cycles", busy_cycles, self.busy))
+        return diffs
+
+    def summary(self):
+        summary = super().summary()
+        summary.update(
+            last_cycle=self.last_cycle,
+            lost_cycles=self.lost_cycles,
+            reordered=self.reordered,
+            duplicates=self.duplicates,
+            missing_data=self.missing_data,
+        )
+        return summary
@@ -0,0 +1,244 @@
+"""Headless simulator runner for machines without a display.
+
+Runs an ArbiterEngine for a number of cycles, a wall-clock duration, or
+until interrupted (Ctrl-C or SIGTERM), with the GUI's traffic, burst and
+pacing options. Metrics are printed to stdout as JSON lines: a ``metrics``
+line every ``--interval`` seconds and a ``summary`` line at the end. With
+``--udp`` every cycle is also sent as BUS_EVENT frames, like the GUI's
+Wireshark output.
+
+Without ``--udp`` at ``--speed Max`` cycles are arbitrated in blocks
+(``ArbiterEngine.run``), which draws no data bytes, so the grant sequence of
+a seed differs from a stepped run; ``--step`` forces stepping. The fairness
+and wait metrics cost more than the arbitration itself: ``--no-metrics``
+leaves only cycles/s and the grant distribution, and lets block runs reach
+millions of cycles per second.
+
+Usage::
+
+    python cli.py --mode "Round Robin" --devices 16 --cycles 1000000 --seed 7
+    python cli.py --duration 60 --traffic bursty --burst 1 4 \\
+        --udp 127.0.0.1:5555 --format binary --speed 1000x
+"""
+import argparse
+import json
+import os
+import random
+import signal
+import sys
+import time
+
+import wire
+from arbiter import FIXED_PRIORITY, MAX_DEVICES, ArbiterEngine, available_modes
+from clock import MAX_SPEED, SPEEDS, VirtualClock
+from udp_sender import UDPEventSender
+from workloads import MarkovBurstWorkload, TraceWorkload
+
+# Cycles run between two looks at the clock, the interval and the stop flag
+CHECK_CYCLES = 1024
+REPORT_INTERVAL = 1.0
+
+TRAFFIC = ("uniform", "bursty")
+
+
+class HeadlessRunner:
+    """Drives an engine without Tk, optionally sending BUS_EVENTs over UDP.
+
+    ``emit`` receives one dict per metrics report. ``stop`` may be called
+    from a signal handler or another thread.
+    """
+
+    def __init__(self, engine, emit, sender=None, wire_format=wire.TEXT, clock=None,
+                 interval=REPORT_INTERVAL, step=False):
+        self.engine = engine
+        self.emit = emit
+        self.sender = sender
+        self.wire_format = wire_format
+        self.clock = clock  # VirtualClock pacing the cycles, None for full speed
+        self.interval = interval
+        self.step = step or sender is not None or clock is not None
+        self.labels = [f"Device {i + 1}" for i in range(engine.device_count)]
+        self._stopped = False
+
+    def stop(self):
+        self._stopped = True
+        if self.clock is not None:
+            self.clock.stop()
+
+    def run(self, cycles=None, duration=None):
+        """Run until ``cycles`` cycles or ``duration`` seconds have passed"""
+        engine = self.engine
+        first = engine.cycle
+        start = time.monotonic()
+        deadline = None if duration is None else start + duration
+        next_report = start + self.interval
+        last_time, last_cycle = start, first
+        while not self._stopped:
+            block = 1 if self.clock is not None else CHECK_CYCLES
+            if cycles is not None:
+                block = min(block, first + cycles - engine.cycle)
+                if block <= 0:
+                    break
+            done = self._step(block) if self.step else engine.run(block)
+            if done < block:
+                break  # trace finished or clock stopped
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                break
+            if now >= next_report:
+                self.emit(self.report("metrics", now - start, engine.cycle - last_cycle,
+                                      now - last_time))
+                last_time, last_cycle = now, engine.cycle
+                next_report += self.interval
+                if next_report <= now:
+                    next_report = now + self.interval  # fell behind; don't burst reports
+        if self.sender is not None:
+            self.sender.flush()
+        elapsed = time.monotonic() - start
+        summary = self.report("summary", elapsed, engine.cycle - first, elapsed)
+        summary["seed"] = engine.seed
+        self.emit(summary)
+        return summary
+
+    def _step(self, count):
+        """Step ``count`` cycles, sending their events; returns how many ran"""
+        engine, clock, send = self.engine, self.clock, self._send
+        for done in range(count):
+            result = engine.step()
+            if result is None:
+                return done
+            if self.sender is not None:
+                if result.winner is not None:
+                    send("GRANT", result.winner, None, result.cycle)
+                    send("DATA", result.winner, result.data, result.cycle)
+                elif result.holder is not None:
+                    send("DATA", result.holder, result.data, result.cycle)
+                else:
+                    send("IDLE", None, None, result.cycle)
+            if clock is not None and not clock.wait_next_cycle():
+                return done + 1
+        return count
+
+    def _send(self, event_type, device_index, data, cycle):
+        if self.wire_format == wire.BINARY:
+            payload = wire.encode_binary(event_type, device_index, data, cycle)
+        else:
+            name = "NONE" if device_index is None else self.labels[device_index]
+            payload = wire.encode_text(event_type, name, data)
+        self.sender.submit(payload)
+
+    def report(self, kind, elapsed, cycles, seconds):
+        """One metrics line: ``cycles`` run in the last ``seconds``"""
+        engine = self.engine
+        counts = engine.grant_counts
+        granted = sum(counts)
+        line = {
+            "type": kind,
+            "elapsed_s": round(elapsed, 3),
+            "cycle": engine.cycle,
+            "cycles_per_s": cycles / seconds if seconds > 0 else None,
+            "grants": list(counts),
+            "grant_share": [c / granted if granted else 0.0 for c in counts],
+            "idle_cycles": engine.idle_cycles,
+            "busy_cycles": engine.busy_cycles,
+        }
+        m = engine.metrics
+        if m is not None:
+            line.update(
+                utilisation=m.utilisation,
+                jain_index=m.jain_index,
+                wait_p50=m.waits.percentile(0.5),
+                wait_p99=m.waits.percentile(0.99),
+                max_starvation=max(m.current_starvation(), default=0),
+            )
+        if self.sender is not None:
+            line["udp"] = self.sender.stats()
+        return line
+
+
+def parse_address(text):
+    host, sep, port = text.rpartition(":")
+    if not sep or not port.isdigit() or not 0 < int(port) < 65536:
+        raise argparse.ArgumentTypeError(f"expected HOST:PORT, got '{text}'")
+    return host or "127.0.0.1", int(port)
+
+
+def json_lines(stream):
+    """emit() callback writing one JSON object per line, flushed at once"""
+    def emit(line):
+        stream.write(json.dumps(line) + "\n")
+        stream.flush()
+    return emit
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the bus arbitration simulator without a GUI")
+    parser.add_argument("--mode", choices=available_modes(), default=FIXED_PRIORITY)
+    parser.add_argument("--devices", type=int, default=4, help=f"device count (1-{MAX_DEVICES})")
+    limit = parser.add_mutually_exclusive_group()
+    limit.add_argument("--cycles", type=int, help="stop after this many cycles")
+    limit.add_argument("--duration", type=float, help="stop after this many seconds")
+    parser.add_argument("--seed", type=int, help="seed for requests, data and bursts (default: random)")
+    parser.add_argument("--traffic", choices=TRAFFIC, default="uniform",
+                        help="uniform: every device requests half the time; bursty: on/off bursts")
+    parser.add_argument("--trace", metavar="PATH", help="replay requests from a trace file")
+    parser.add_argument("--burst", nargs="+", type=int, default=[1], metavar="CYCLES",
+                        help="transaction length, or MIN MAX for a random length")
+    parser.add_argument("--speed", choices=list(SPEEDS), default=MAX_SPEED,
+                        help="cycle pacing as in the GUI (default: as fast as possible)")
+    parser.add_argument("--step", action="store_true", help="step every cycle even when not needed")
+    parser.add_argument("--no-metrics", action="store_true",
+                        help="skip fairness and wait tracking (much faster block runs)")
+    parser.add_argument("--udp", type=parse_address, metavar="HOST:PORT",
+                        help="send BUS_EVENT frames to this address")
+    parser.add_argument("--format", type=str.capitalize, choices=wire.FORMATS, default=wire.TEXT,
+                        help="BUS_EVENT wire format")
+    parser.add_argument("--no-coalesce", action="store_true", help="one datagram per event")
+    parser.add_argument("--interval", type=float, default=REPORT_INTERVAL,
+                        help="seconds between metrics lines")
+    args = parser.parse_args(argv)
+
+    if len(args.burst) > 2:
+        parser.error("--burst takes one or two values")
+    if args.interval <= 0:
+        parser.error("--interval must be positive")
+    if args.cycles is not None and args.cycles < 0:
+        parser.error("--cycles must not be negative")
+    burst = args.burst[0] if len(args.burst) == 1 else tuple(args.burst)
+    # Like a blank seed in the GUI; the summary reports it for a rerun
+    seed = args.seed if args.seed is not None else random.SystemRandom().randrange(1 << 32)
+    try:
+        engine = ArbiterEngine(args.devices, args.mode, seed=seed,
+                               track_metrics=not args.no_metrics,
+                               burst_length=burst)
+        if args.trace:
+            engine.set_workload(TraceWorkload(args.devices, args.trace))
+        elif args.traffic == "bursty":
+            engine.set_workload(MarkovBurstWorkload(args.devices, seed=f"{seed}/workload"))
+    except (ValueError, OSError) as exc:
+        parser.error(str(exc))
+
+    sender = None
+    if args.udp is not None:
+        sender = UDPEventSender(args.udp, coalesce=not args.no_coalesce)
+        sender.start()
+    clock = None if args.speed == MAX_SPEED else VirtualClock(args.speed)
+    runner = HeadlessRunner(engine, json_lines(sys.stdout), sender, args.format, clock,
+                            args.interval, args.step)
+    # Ctrl-C, and SIGTERM from a container runtime, end the run with a summary
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda signum, frame: runner.stop())
+    try:
+        runner.run(args.cycles, args.duration)
+    except BrokenPipeError:
+        # The reader went away (e.g. piped into head); exit without a traceback
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    finally:
+        if sender is not None:
+            sender.stop()
+        if isinstance(engine.workload, TraceWorkload):
+            engine.workload.close()
+
+
+if __name__ == "__main__":
+    main()
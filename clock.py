@@ -0,0 +1,101 @@
+"""Virtual-clock pacing for the simulation loop.
+
+Each arbitration cycle advances a virtual clock by ``CYCLE_PERIOD`` seconds.
+The clock maps virtual time onto wall time at a chosen speed: real time
+(the original one cycle every two seconds), a scaled rate such as 1000x, or
+as fast as possible with no sleeping at all.
+"""
+import threading
+import time
+
+CYCLE_PERIOD = 2.0  # virtual seconds per arbitration cycle
+
+REAL_TIME = "Real-time"
+MAX_SPEED = "Max"
+# Speed name -> virtual seconds per wall second (None: don't sleep)
+SPEEDS = {
+    REAL_TIME: 1.0,
+    "10x": 10.0,
+    "100x": 100.0,
+    "1000x": 1000.0,
+    "10000x": 10000.0,
+    MAX_SPEED: None,
+}
+
+# Sleeps shorter than this are skipped; the next wait catches up instead
+MIN_SLEEP = 0.001
+# If the loop falls further behind schedule than this, forget the backlog
+MAX_LAG = 0.5
+
+UI_FPS = 30
+
+
+class VirtualClock:
+    """Deadline-based scheduler for simulation cycles.
+
+    Deadlines are computed from an anchor rather than sleeping a fixed
+    amount after each cycle, so the time spent simulating does not make the
+    rate drift. stop() wakes a pending wait immediately.
+    """
+
+    def __init__(self, speed=REAL_TIME, cycle_period=CYCLE_PERIOD):
+        self.cycle_period = cycle_period
+        self.virtual_time = 0.0
+        self._stop = threading.Event()
+        self.scale = 1.0
+        self.set_speed(speed)
+
+    def set_speed(self, speed):
+        if speed not in SPEEDS:
+            raise ValueError(f"Unknown speed '{speed}'")
+        self.speed = speed
+        self.scale = SPEEDS[speed]
+        self._anchor()
+
+    @property
+    def throttled(self):
+        """True when cycles run faster than the UI should be redrawn"""
+        return self.scale != 1.0
+
+    @property
+    def stopped(self):
+        return self._stop.is_set()
+
+    def stop(self):
+        self._stop.set()
+
+    def wait_next_cycle(self):
+        """Advance one cycle, sleeping until its deadline.
+
+        Returns False once the clock has been stopped.
+        """
+        self.virtual_time += self.cycle_period
+        scale = self.scale
+        if scale is None:
+            return not self._stop.is_set()
+        target = self._wall_anchor + (self.virtual_time - self._virtual_anchor) / scale
+        delay = target - time.monotonic()
+        if delay < -MAX_LAG:
+            self._anchor()
+        elif delay > MIN_SLEEP:
+            return not self._stop.wait(delay)
+        return not self._stop.is_set()
+
+    def _anchor(self):
+        self._wall_anchor = time.monotonic()
+        self._virtual_anchor = self.virtual_time
+
+
+class FrameThrottle:
+    """Lets at most ``fps`` UI refreshes through per wall-clock second"""
+
+    def __init__(self, fps=UI_FPS):
+        self.interval = 1.0 / fps
+        self._next = 0.0
+
+    def due(self):
+        now = time.monotonic()
+        if now >= self._next:
+            self._next = now + self.interval
+            return True
+        return False
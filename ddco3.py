@@ -2,17 +2,72 @@ import tkinter as tk
 from tkinter import ttk
 from tkinter import filedialog
 import threading
-import time
 import random
+import time
 import socket
 import traceback
-import asyncio
 import os
 
-import pyshark  # requires tshark/Wireshark and tshark in PATH
+
+from arbiter import ArbiterEngine, MAX_DEVICES, available_modes
+from clock import VirtualClock, FrameThrottle, SPEEDS, REAL_TIME, UI_FPS
+from ui_queue import UIUpdateQueue
+from log_buffer import LogBuffer
+from udp_sender import UDPEventSender
+import wire
+from tshark_reader import InterfaceLister, TsharkFieldsReader, interface_name
+from capture_analysis import analyze_file, format_summary
+from capture_decoder import StreamDecoder
+from latency import BUCKETS, STAGES, LatencyTracker, format_summary as format_latency
+from instrument import Instrumentation, format_table as format_timers
+from workloads import MarkovBurstWorkload, TraceWorkload
+from renderer import PacketRenderer
+from recording import Recording, RecordingWriter
+from export import CycleExporter
 
 running = False
 
+# Above this many devices the stats lines summarise instead of listing all
+STATS_DEVICES_LISTED = 8
+
+MAX_BURST_LENGTH = 256
+
+CAPTURE_PYSHARK = "PyShark"
+CAPTURE_TSHARK_FIELDS = "tshark fields"
+CAPTURE_BACKENDS = (CAPTURE_PYSHARK, CAPTURE_TSHARK_FIELDS)
+
+TRAFFIC_UNIFORM = "Uniform 50%"
+TRAFFIC_BURSTY = "Bursty"
+TRAFFIC_TRACE = "Trace file..."
+TRAFFIC_KINDS = (TRAFFIC_UNIFORM, TRAFFIC_BURSTY, TRAFFIC_TRACE)
+
+# Time the capture gets to catch up before it is checked against the engine
+CAPTURE_CHECK_DELAY_MS = 1000
+# Capture anomalies (lost/reordered datagrams, ...) logged one by one per capture
+CAPTURE_ANOMALIES_LOGGED = 20
+
+# Live latency histograms: refresh period and cell width of one bucket
+LATENCY_REFRESH_S = 0.5
+LATENCY_CELL = 8
+LATENCY_ROW = 10
+
+PROFILE_REFRESH_MS = 1000
+
+# pyshark (with asyncio and lxml under it) used to be most of the start-up
+# time, so it is imported by the first capture that needs it
+pyshark = None
+_pyshark_lock = threading.Lock()
+
+
+def load_pyshark():
+    """Import pyshark on first use (requires tshark/Wireshark); thread-safe"""
+    global pyshark
+    with _pyshark_lock:
+        if pyshark is None:
+            import pyshark as module
+            pyshark = module
+    return pyshark
+
 
 class BusArbitrationSimulator:
     def __init__(self, root):
@@ -57,7 +112,12 @@ class BusArbitrationSimulator:
         canvas_frame.pack(fill="both", expand=True, padx=0, pady=0)
         self.canvas = tk.Canvas(canvas_frame, width=1200, height=380, bg="#ffffff", highlightthickness=1,
                                 highlightbackground="#e5e7eb")
-        self.canvas.pack(padx=16, pady=(8, 4))
+        self.canvas.pack(padx=16, pady=(8, 0))
+        # Horizontal scrolling for device counts that don't fit the window
+        self.canvas_xscroll = tk.Scrollbar(canvas_frame, orient="horizontal", command=self.canvas.xview)
+        self.canvas_xscroll.pack(fill="x", padx=16, pady=(0, 4))
+        self.canvas.configure(xscrollcommand=self._on_canvas_xscroll)
+        self.canvas.bind("<Configure>", lambda e: self._sync_visible_devices())
 
         # Bottom control panel - scrollable container
         control_container = tk.Frame(root, bg="#f3f4f6")
@@ -97,27 +157,25 @@ class BusArbitrationSimulator:
             self.control_frame.columnconfigure(col, weight=1)
 
         # Devices & Arbiter
-        self.device_labels = ["Device 1", "Device 2", "Device 3", "Device 4"]
-        self.device_count = len(self.device_labels)
+        self.device_count = 4
+        self.device_labels = [f"Device {i + 1}" for i in range(self.device_count)]
         self.arbiter_x, self.arbiter_y = 150, 250
         self.device_start_x, self.device_y = 650, 250
         self.device_spacing = 150
         self.bus_y = 100
 
+        # Headless arbitration engine; the GUI only renders its results
+        self.engine = ArbiterEngine(self.device_count, track_metrics=True)
+
         self.arbiter_box = None
-        self.device_boxes = []
+        # Canvas items (box, name, status text) exist only for devices in view;
+        # their colours come from the last request mask / winner shown
+        self.device_items = {}
+        self._shown_requests = 0
+        self._shown_winner = None
         self.draw_static_components()
-
-        # Per-device status labels (under each device) - create a frame below canvas
-        status_frame = tk.Frame(canvas_frame, bg="#f3f4f6", height=30)
-        status_frame.pack(fill="x", padx=16, pady=(0, 4))
-        status_frame.pack_propagate(False)
-        self.device_status_labels = []
-        for i in range(self.device_count):
-            x = self.device_start_x + i * self.device_spacing
-            status = tk.Label(status_frame, text="Idle", font=("Segoe UI", 9), fg="#6b7280", bg="#f3f4f6")
-            status.place(x=x - 30, y=5)
-            self.device_status_labels.append(status)
+        # Data packets in flight, moved once per UI frame from a reusable pool
+        self.renderer = PacketRenderer(self.canvas)
 
         # -------- Controls layout (bottom panel) --------
 
@@ -143,13 +201,40 @@ class BusArbitrationSimulator:
         )
         self.log.grid(row=0, column=0, sticky="nsew")
         self.scrollbar.config(command=self.log.yview)
+        # Messages collect here and are written to the widget once per frame
+        self.log_buffer = LogBuffer()
 
         info_frame = tk.Frame(self.control_frame, bg="#f3f4f6")
         info_frame.grid(row=1, column=0, columnspan=3, sticky="ew", padx=12)
-        # Stats: grants per device
-        self.grant_counts = [0] * self.device_count
+        # Fairness / latency metrics (second stats line)
+        self.metrics_label = tk.Label(self.control_frame, text="", font=("Segoe UI", 9), fg="#4b5563",
+                                      bg="#f3f4f6", anchor="w")
+        self.metrics_label.grid(row=2, column=0, columnspan=3, sticky="ew", padx=12)
+        # Stats: grants per device (counts live in self.engine.grant_counts)
         self.stats_label = tk.Label(info_frame, text="Stats: ", font=("Segoe UI", 9), fg="#4b5563", bg="#f3f4f6")
         self.stats_label.pack(side="left")
+        # Events the UI queue had to drop because the main thread fell behind
+        self.dropped_label = tk.Label(info_frame, text="", font=("Segoe UI", 9), fg="#b45309", bg="#f3f4f6")
+        self.dropped_label.pack(side="left", padx=(12, 0))
+        # UDP sender counters (sent / dropped / queued events)
+        self.udp_label = tk.Label(info_frame, text="", font=("Segoe UI", 9), fg="#4b5563", bg="#f3f4f6")
+        self.udp_label.pack(side="left", padx=(12, 0))
+        # Cycle export counters of the current (or last) run
+        self.export_label = tk.Label(info_frame, text="", font=("Segoe UI", 9), fg="#4b5563", bg="#f3f4f6")
+        self.export_label.pack(side="left", padx=(12, 0))
+        # Optional spill of the full log to disk (the widget keeps only the tail)
+        self.log_spill_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            info_frame,
+            text="Log to file",
+            variable=self.log_spill_var,
+            command=self.toggle_log_spill,
+            font=("Segoe UI", 9),
+            fg="#111827",
+            bg="#f3f4f6",
+            activebackground="#f3f4f6",
+            selectcolor="#f3f4f6",
+        ).pack(side="right", padx=(12, 0))
         # Error/info bar
         self.error_label = tk.Label(info_frame, text="", font=("Segoe UI", 9), fg="#b91c1c", bg="#f3f4f6")
         self.error_label.pack(side="right")
@@ -163,18 +248,66 @@ class BusArbitrationSimulator:
             font=("Segoe UI", 9, "bold"),
             labelanchor="n"
         )
-        mode_frame.grid(row=2, column=0, sticky="w", padx=12, pady=8)
+        mode_frame.grid(row=3, column=0, sticky="w", padx=12, pady=8)
         self.mode_label = tk.Label(mode_frame, text="Mode", font=("Segoe UI", 9), fg="#111827", bg="#f3f4f6")
         self.mode_label.grid(row=0, column=0, padx=(8, 4), pady=6, sticky="w")
         self.mode_var = tk.StringVar(value="Fixed Priority")
         self.mode_menu = ttk.Combobox(
             mode_frame,
             textvariable=self.mode_var,
-            values=["Fixed Priority", "Round Robin", "Daisy Chain"],
+            values=list(available_modes()),
             state="readonly",
-            width=15
+            width=20
         )
         self.mode_menu.grid(row=0, column=1, padx=(0, 8), pady=6)
+        self.mode_var.trace_add("write", self._on_mode_change)
+
+        # Number of bus masters (applied while the simulation is stopped)
+        tk.Label(mode_frame, text="Devices", font=("Segoe UI", 9), fg="#111827", bg="#f3f4f6").grid(
+            row=1, column=0, padx=(8, 4), pady=(0, 6), sticky="w"
+        )
+        self.device_count_var = tk.StringVar(value=str(self.device_count))
+        self.device_count_spin = tk.Spinbox(
+            mode_frame,
+            from_=1,
+            to=MAX_DEVICES,
+            textvariable=self.device_count_var,
+            command=self._on_device_count_change,
+            width=6,
+            font=("Segoe UI", 9),
+        )
+        self.device_count_spin.grid(row=1, column=1, padx=(0, 8), pady=(0, 6), sticky="w")
+        self.device_count_spin.bind("<Return>", lambda e: self._on_device_count_change())
+        self.device_count_spin.bind("<FocusOut>", lambda e: self._on_device_count_change())
+
+        # Cycles each transaction holds the bus (applies from the next grant)
+        tk.Label(mode_frame, text="Burst", font=("Segoe UI", 9), fg="#111827", bg="#f3f4f6").grid(
+            row=2, column=0, padx=(8, 4), pady=(0, 6), sticky="w"
+        )
+        self.burst_var = tk.StringVar(value="1")
+        self.burst_spin = tk.Spinbox(
+            mode_frame,
+            from_=1,
+            to=MAX_BURST_LENGTH,
+            textvariable=self.burst_var,
+            command=self._on_burst_change,
+            width=6,
+            font=("Segoe UI", 9),
+        )
+        self.burst_spin.grid(row=2, column=1, padx=(0, 8), pady=(0, 6), sticky="w")
+        self.burst_spin.bind("<Return>", lambda e: self._on_burst_change())
+        self.burst_spin.bind("<FocusOut>", lambda e: self._on_burst_change())
+
+        # Per-device weights for weighted round robin, TDMA and lottery;
+        # a short list repeats across the devices ("4,1" alternates)
+        tk.Label(mode_frame, text="Weights", font=("Segoe UI", 9), fg="#111827", bg="#f3f4f6").grid(
+            row=3, column=0, padx=(8, 4), pady=(0, 6), sticky="w"
+        )
+        self.weights_var = tk.StringVar(value="")
+        self.weights_entry = tk.Entry(mode_frame, textvariable=self.weights_var, width=14, font=("Segoe UI", 9))
+        self.weights_entry.grid(row=3, column=1, padx=(0, 8), pady=(0, 6), sticky="w")
+        self.weights_entry.bind("<Return>", lambda e: self._on_weights_change())
+        self.weights_entry.bind("<FocusOut>", lambda e: self._on_weights_change())
 
         # Center: Simulation controls
         sim_frame = tk.LabelFrame(
@@ -185,7 +318,7 @@ class BusArbitrationSimulator:
             font=("Segoe UI", 9, "bold"),
             labelanchor="n"
         )
-        sim_frame.grid(row=2, column=1, pady=8)
+        sim_frame.grid(row=3, column=1, pady=8)
         self.start_btn = tk.Button(
             sim_frame,
             text="Start",
@@ -217,15 +350,107 @@ class BusArbitrationSimulator:
         )
         self.stop_btn.grid(row=0, column=1, padx=(6, 18), pady=8)
 
+        # Simulation speed: Real-time keeps the original one cycle per 2 s
+        tk.Label(sim_frame, text="Speed", font=("Segoe UI", 9), fg="#111827", bg="#f3f4f6").grid(
+            row=1, column=0, padx=(18, 4), pady=(0, 8), sticky="e"
+        )
+        self.speed_var = tk.StringVar(value=REAL_TIME)
+        self.speed_menu = ttk.Combobox(
+            sim_frame,
+            textvariable=self.speed_var,
+            values=list(SPEEDS),
+            state="readonly",
+            width=10
+        )
+        self.speed_menu.grid(row=1, column=1, padx=(0, 18), pady=(0, 8), sticky="w")
+        self.speed_var.trace_add("write", self._on_speed_change)
+
+        # Request traffic, applied when the simulation starts
+        tk.Label(sim_frame, text="Traffic", font=("Segoe UI", 9), fg="#111827", bg="#f3f4f6").grid(
+            row=2, column=0, padx=(18, 4), pady=(0, 8), sticky="e"
+        )
+        self.traffic_var = tk.StringVar(value=TRAFFIC_UNIFORM)
+        ttk.Combobox(
+            sim_frame,
+            textvariable=self.traffic_var,
+            values=list(TRAFFIC_KINDS),
+            state="readonly",
+            width=10
+        ).grid(row=2, column=1, padx=(0, 18), pady=(0, 8), sticky="w")
+        self.traffic_var.trace_add("write", self._on_traffic_change)
+        self.trace_path = None
+
+        # Session seed (blank: a fresh one per run, logged so it can be reused)
+        # and optional recording of every cycle
+        tk.Label(sim_frame, text="Seed", font=("Segoe UI", 9), fg="#111827", bg="#f3f4f6").grid(
+            row=3, column=0, padx=(18, 4), pady=(0, 8), sticky="e"
+        )
+        seed_row = tk.Frame(sim_frame, bg="#f3f4f6")
+        seed_row.grid(row=3, column=1, padx=(0, 18), pady=(0, 8), sticky="w")
+        self.seed_var = tk.StringVar(value="")
+        tk.Entry(seed_row, textvariable=self.seed_var, width=10, font=("Segoe UI", 9)).pack(side="left")
+        self.record_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            seed_row,
+            text="Record",
+            variable=self.record_var,
+            command=self._on_record_toggle,
+            bg="#f3f4f6",
+            font=("Segoe UI", 9),
+        ).pack(side="left", padx=(6, 0))
+        self.record_path = None
+        self.export_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            seed_row,
+            text="Export",
+            variable=self.export_var,
+            command=self._on_export_toggle,
+            bg="#f3f4f6",
+            font=("Segoe UI", 9),
+        ).pack(side="left", padx=(6, 0))
+        self.export_path = None
+        self.exporter = None  # CycleExporter of the current run, shown in the status bar
+        self._export_shown = None
+
+        # Replay a recording, optionally from a given cycle
+        tk.Button(
+            sim_frame,
+            text="Replay...",
+            font=("Segoe UI", 9),
+            command=self.replay_recording,
+            relief="flat",
+            cursor="hand2",
+        ).grid(row=4, column=0, padx=(18, 4), pady=(0, 8), sticky="e")
+        replay_row = tk.Frame(sim_frame, bg="#f3f4f6")
+        replay_row.grid(row=4, column=1, padx=(0, 18), pady=(0, 8), sticky="w")
+        tk.Label(replay_row, text="from cycle", font=("Segoe UI", 9), fg="#111827", bg="#f3f4f6").pack(
+            side="left"
+        )
+        self.replay_from_var = tk.StringVar(value="0")
+        tk.Entry(replay_row, textvariable=self.replay_from_var, width=9, font=("Segoe UI", 9)).pack(
+            side="left", padx=(4, 0)
+        )
+        self.replay = None  # (Recording, first cycle) for the next start()
+        self.clock = None
+        self.frame_ms = 1000 // UI_FPS
+
         # Networking for Wireshark integration (UDP on localhost)
         self.udp_ip = "127.0.0.1"
         self.udp_port = 5555  # choose any unused port
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        # Events are encoded on the simulation thread and sent from this one
+        self.udp_sender = UDPEventSender((self.udp_ip, self.udp_port), sock=self.sock)
+        # Queue, sendto, arrival and end-to-end latency of the events
+        self.latency = LatencyTracker()
+        self.udp_sender.latency = self.latency
+        self.udp_sender.start()
+        self._udp_shown = None
+        self._udp_errors_shown = 0
 
-        # Find TShark path automatically
-        self.tshark_path = self.find_tshark()
-        if not self.tshark_path:
-            self.log_message("[Warning] TShark not found. Please configure the path manually.\n")
+        # Found by a background search once the window is up (_discover_tshark)
+        self.tshark_path = None
+        # `tshark -D` results, reused until the TTL expires or the path changes
+        self.interface_lister = InterfaceLister()
 
         # Wireshark / PyShark integration controls
         net_frame = tk.LabelFrame(
@@ -236,9 +461,11 @@ class BusArbitrationSimulator:
             font=("Segoe UI", 9, "bold"),
             labelanchor="n"
         )
-        net_frame.grid(row=2, column=2, sticky="e", padx=12, pady=8)
+        net_frame.grid(row=3, column=2, sticky="e", padx=12, pady=8)
 
         self.wireshark_enabled = tk.BooleanVar(value=True)
+        self.send_events = True
+        self.wireshark_enabled.trace_add("write", self._on_send_events_change)
         self.wireshark_check = tk.Checkbutton(
             net_frame,
             text="Send events (UDP 127.0.0.1:5555)",
@@ -257,10 +484,6 @@ class BusArbitrationSimulator:
         )
         self.tshark_path_entry = tk.Entry(net_frame, width=18, font=("Segoe UI", 8), bg="#ffffff", fg="#111827",
                                           insertbackground="#111827", relief="solid", borderwidth=1)
-        if self.tshark_path:
-            self.tshark_path_entry.insert(0, self.tshark_path)
-        else:
-            self.tshark_path_entry.insert(0, "C:\\Program Files\\Wireshark\\tshark.exe")
         self.tshark_path_entry.grid(row=1, column=1, padx=(0, 2), pady=4, sticky="ew")
         net_frame.columnconfigure(1, weight=1)
         
@@ -317,8 +540,25 @@ class BusArbitrationSimulator:
         )
         refresh_iface_btn.grid(row=2, column=2, padx=(2, 8), pady=4, sticky="e")
 
+        # Capture backend: PyShark objects, or tshark's field stream (much faster)
+        tk.Label(net_frame, text="Backend:", font=("Segoe UI", 9), fg="#111827", bg="#f3f4f6").grid(
+            row=4, column=0, padx=(8, 4), pady=4, sticky="w"
+        )
+        self.capture_backend_var = tk.StringVar(value=CAPTURE_PYSHARK)
+        ttk.Combobox(
+            net_frame,
+            textvariable=self.capture_backend_var,
+            values=list(CAPTURE_BACKENDS),
+            state="readonly",
+            width=14
+        ).grid(row=4, column=1, columnspan=2, padx=(0, 8), pady=4, sticky="w")
+
         self.capture_running = False
         self.capture_thread = None
+        self.capture_reader = None
+        # Decodes captured BUS_EVENTs and checks them against the engine
+        self.capture_decoder = None
+        self._anomalies_logged = 0
         self.capture_btn = tk.Button(
             net_frame,
             text="Start Capture",
@@ -333,10 +573,88 @@ class BusArbitrationSimulator:
             pady=3,
             cursor="hand2",
         )
-        self.capture_btn.grid(row=3, column=0, columnspan=3, padx=8, pady=(2, 8), sticky="e")
+        self.capture_btn.grid(row=5, column=0, columnspan=3, padx=8, pady=(2, 8), sticky="e")
+
+        # Offline mode: analyze a saved pcap/pcapng instead of a live interface
+        tk.Button(
+            net_frame,
+            text="Analyze pcap...",
+            font=("Segoe UI", 8),
+            command=self.analyze_capture_file,
+            bg="#e5e7eb",
+            fg="#111827",
+            relief="flat",
+            padx=6,
+            pady=2,
+            cursor="hand2",
+        ).grid(row=5, column=0, columnspan=2, padx=8, pady=(2, 8), sticky="w")
+
+        # Live latency histograms, one row per stage, one cell per power of two us
+        self.latency_canvas = tk.Canvas(
+            net_frame,
+            width=20 + BUCKETS * LATENCY_CELL,
+            height=len(STAGES) * LATENCY_ROW + 2,
+            bg="#ffffff",
+            highlightthickness=0,
+        )
+        self.latency_canvas.grid(row=6, column=0, columnspan=3, padx=8, pady=(0, 2), sticky="w")
+        self.latency_cells = {}
+        for r, stage in enumerate(STAGES):
+            y = 1 + r * LATENCY_ROW
+            self.latency_canvas.create_text(2, y + LATENCY_ROW // 2, text=stage[0].upper(), anchor="w",
+                                            font=("Segoe UI", 7), fill="#4b5563")
+            self.latency_cells[stage] = [
+                self.latency_canvas.create_rectangle(
+                    16 + k * LATENCY_CELL, y, 16 + (k + 1) * LATENCY_CELL - 1, y + LATENCY_ROW - 1,
+                    fill="#f3f4f6", outline="",
+                )
+                for k in range(BUCKETS)
+            ]
+        self.latency_label = tk.Label(net_frame, text="Latency: -", font=("Segoe UI", 8), fg="#4b5563",
+                                      bg="#f3f4f6", anchor="w", justify="left")
+        self.latency_label.grid(row=7, column=0, columnspan=3, padx=8, pady=(0, 6), sticky="w")
+        self._latency_drawn = (0.0, None)
+
+        # Payload format of the UDP events (binary frames decode with busarb.lua)
+        tk.Label(net_frame, text="Wire format:", font=("Segoe UI", 9), fg="#111827", bg="#f3f4f6").grid(
+            row=3, column=0, padx=(8, 4), pady=4, sticky="w"
+        )
+        self.wire_format_var = tk.StringVar(value=wire.TEXT)
+        self.wire_format_menu = ttk.Combobox(
+            net_frame,
+            textvariable=self.wire_format_var,
+            values=list(wire.FORMATS),
+            state="readonly",
+            width=8
+        )
+        self.wire_format_menu.grid(row=3, column=1, padx=(0, 2), pady=4, sticky="w")
+        # Pack several events into one datagram (up to the MTU) when they queue up
+        self.coalesce_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(
+            net_frame,
+            text="Batch",
+            variable=self.coalesce_var,
+            command=self._on_coalesce_change,
+            font=("Segoe UI", 8),
+            fg="#111827",
+            bg="#f3f4f6",
+            activebackground="#f3f4f6",
+            selectcolor="#f3f4f6",
+        ).grid(row=3, column=2, padx=(2, 8), pady=4, sticky="e")
+        # Plain attribute so the simulation thread never reads the Tk variable
+        self.wire_format = wire.TEXT
+        self.wire_format_var.trace_add("write", self._on_wire_format_change)
 
-        # For round-robin
-        self.next_index = 0
+        # Worker threads post UI work here; drained once per frame
+        self.ui_queue = UIUpdateQueue()
+        self._ui_dropped_shown = 0
+        self.root.after(self.frame_ms, self._drain_ui_queue)
+
+        self.build_profiling_panel()
+
+        # Probing install paths can take a while (network drives, slow disks),
+        # so look for tshark off the UI thread
+        threading.Thread(target=self._discover_tshark, daemon=True).start()
 
         # Bind mouse wheel to log scrolling - Windows uses MouseWheel, Linux/Mac use Button-4/5
         self.log.bind("<MouseWheel>", self._on_mousewheel)
@@ -366,6 +684,20 @@ class BusArbitrationSimulator:
             return tshark_in_path
         return None
 
+    def _discover_tshark(self):
+        self.ui_queue.post(self._on_tshark_found, self.find_tshark())
+
+    def _on_tshark_found(self, path):
+        # Leave a path the user typed or browsed to in the meantime alone
+        if self.tshark_path_entry.get().strip():
+            return
+        if path:
+            self.tshark_path = path
+            self.tshark_path_entry.insert(0, path)
+        else:
+            self.tshark_path_entry.insert(0, "C:\\Program Files\\Wireshark\\tshark.exe")
+            self.log_message("[Warning] TShark not found. Please configure the path manually.\n")
+
     def browse_tshark(self):
         """Open file dialog to browse for tshark.exe"""
         filename = filedialog.askopenfilename(
@@ -377,6 +709,7 @@ class BusArbitrationSimulator:
             self.tshark_path_entry.delete(0, tk.END)
             self.tshark_path_entry.insert(0, filename)
             self.tshark_path = filename
+            self.interface_lister.invalidate()
             self.log_message(f"TShark path set to: {filename}\n")
 
     def list_interfaces(self):
@@ -387,47 +720,62 @@ class BusArbitrationSimulator:
             self.log_message("[Error] Please set TShark path first.\n")
             return
 
-        try:
-            import subprocess
-            # Run: tshark -D to list interfaces
-            result = subprocess.run(
-                [tshark_path, "-D"],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            if result.returncode == 0:
-                interfaces = result.stdout.strip().split('\n')
-                self.log_message("\n=== Available Interfaces ===\n")
-                interface_list = []
-                for iface in interfaces:
-                    if iface.strip():
-                        self.log_message(f"{iface}\n")
-                        # Extract interface name (format: "1. \Device\NPF_...")
-                        parts = iface.split('.', 1)
-                        if len(parts) > 1:
-                            iface_name = parts[1].strip()
-                            interface_list.append(iface_name)
-                
-                # Update combobox with found interfaces
-                if interface_list:
-                    current_values = list(self.capture_iface['values'])
-                    # Add new interfaces that aren't already in the list
-                    for iface in interface_list:
-                        if iface not in current_values:
-                            current_values.append(iface)
-                    self.capture_iface['values'] = tuple(current_values)
-                    self.log_message("\nInterfaces added to dropdown list.\n")
-            else:
-                self.log_message(f"[Error] Failed to list interfaces: {result.stderr}\n")
-        except Exception as e:
-            self.log_message(f"[Error] Could not list interfaces: {e}\n")
+        if self.capture_backend_var.get() == CAPTURE_PYSHARK:
+            # A capture usually follows; have pyshark imported by then
+            threading.Thread(target=self._preload_pyshark, daemon=True).start()
+
+        cached = self.interface_lister.cached(tshark_path)
+        if cached is not None:
+            self.log_message("\n=== Available Interfaces (cached) ===\n")
+            for line in cached:
+                self._add_interface(line)
+            return
+        ui = self.ui_queue
+        started = self.interface_lister.start(
+            tshark_path,
+            on_line=lambda line: ui.post(self._add_interface, line),
+            on_done=lambda lines, error: ui.post(self._interfaces_listed, lines, error),
+        )
+        if started:
+            self.log_message("\n=== Available Interfaces ===\n")
+        else:
+            self.log_message("[Info] Interfaces are still being listed.\n")
+
+    def _add_interface(self, line):
+        """Log one ``tshark -D`` line and add its interface to the dropdown"""
+        self.log_message(f"{line}\n")
+        name = interface_name(line)
+        values = tuple(self.capture_iface["values"])
+        if name and name not in values:
+            self.capture_iface["values"] = values + (name,)
+
+    def _interfaces_listed(self, lines, error):
+        if error is not None:
+            self.log_message(f"[Error] Failed to list interfaces: {error}\n")
             self.set_error("Failed to list interfaces - see log")
+        elif lines:
+            self.log_message("\nInterfaces added to dropdown list.\n")
+        else:
+            self.log_message("[Info] tshark found no capture interfaces.\n")
+
+    def _preload_pyshark(self):
+        try:
+            load_pyshark()
+        except ImportError:
+            pass  # reported when a capture is started
+
+    def device_x(self, index):
+        return self.device_start_x + index * self.device_spacing
 
     def draw_static_components(self):
+        width = max(1200, self.device_x(self.device_count - 1) + 100)
+        self.canvas.configure(scrollregion=(0, 0, width, int(self.canvas["height"])))
+
         # Horizontal bus
-        self.canvas.create_line(50, self.bus_y, 1150, self.bus_y, width=4, fill="black")
-        self.canvas.create_text(100, self.bus_y - 20, text="BUS Busy", font=("Arial", 12, "bold"))
+        self.canvas.create_line(50, self.bus_y, width - 50, self.bus_y, width=4, fill="black")
+        # Turns red while a transaction holds the bus
+        self.bus_busy_item = self.canvas.create_text(100, self.bus_y - 20, text="BUS Busy",
+                                                     font=("Arial", 12, "bold"))
         self.canvas.create_text(400, self.bus_y - 20, text="BUS Request", font=("Arial", 12, "bold"))
         self.canvas.create_text(700, self.bus_y - 20, text="BUS Grant", font=("Arial", 12, "bold"))
         self.canvas.create_text(1050, self.bus_y - 20, text="Address/Data", font=("Arial", 12, "bold"))
@@ -445,10 +793,28 @@ class BusArbitrationSimulator:
         self.canvas.create_text(self.arbiter_x, self.arbiter_y,
                                 text="ARBITER", font=("Arial", 14, "bold"))
 
-        # Devices
-        self.device_boxes = []
-        for i in range(self.device_count):
-            x = self.device_start_x + i * self.device_spacing
+        # Devices are drawn lazily as they scroll into view
+        self.device_items = {}
+        self._sync_visible_devices()
+
+    def _on_canvas_xscroll(self, first, last):
+        self.canvas_xscroll.set(first, last)
+        self._sync_visible_devices()
+
+    def _sync_visible_devices(self):
+        """Create canvas items for the devices in view and delete the rest"""
+        left = self.canvas.canvasx(0)
+        right = left + max(self.canvas.winfo_width(), int(self.canvas["width"]))
+        first = max(0, int((left - self.device_start_x - 50) // self.device_spacing))
+        last = min(self.device_count - 1, int((right - self.device_start_x + 50) // self.device_spacing))
+        for i in list(self.device_items):
+            if not first <= i <= last:
+                for item in self.device_items.pop(i):
+                    self.canvas.delete(item)
+        for i in range(first, last + 1):
+            if i in self.device_items:
+                continue
+            x = self.device_x(i)
             box = self.canvas.create_rectangle(
                 x - 50,
                 self.device_y - 40,
@@ -458,175 +824,623 @@ class BusArbitrationSimulator:
                 outline="black",
                 width=3
             )
-            self.canvas.create_text(
+            name = self.canvas.create_text(
                 x,
                 self.device_y,
                 text=self.device_labels[i],
                 font=("Arial", 12, "bold")
             )
-            self.device_boxes.append(box)
+            status = self.canvas.create_text(x, self.device_y + 60, text="Idle", font=("Segoe UI", 9),
+                                             fill="gray")
+            self.device_items[i] = (box, name, status)
+            self._paint_device(i)
+
+    def _paint_device(self, i):
+        box, _, status = self.device_items[i]
+        if self._shown_winner == i:
+            self.canvas.itemconfig(box, fill="#74c476")
+            self.canvas.itemconfig(status, text="Granted", fill="green")
+        elif self._shown_requests >> i & 1:
+            self.canvas.itemconfig(box, fill="#fdae6b")
+            self.canvas.itemconfig(status, text="Requesting", fill="orange")
+        else:
+            self.canvas.itemconfig(box, fill="#d9d9d9")
+            self.canvas.itemconfig(status, text="Idle", fill="gray")
+
+    def _on_device_count_change(self):
+        try:
+            count = int(self.device_count_var.get())
+        except ValueError:
+            count = 0
+        if not 1 <= count <= MAX_DEVICES:
+            self.set_error(f"Device count must be between 1 and {MAX_DEVICES}")
+            self.device_count_var.set(str(self.device_count))
+            return
+        if count == self.device_count:
+            return
+        if running:
+            self.log_message("[Info] Stop the simulation before changing the device count.\n")
+            self.device_count_var.set(str(self.device_count))
+            return
+        self.set_device_count(count)
+
+    def _on_burst_change(self):
+        try:
+            burst = int(self.burst_var.get())
+        except ValueError:
+            burst = 0
+        if not 1 <= burst <= MAX_BURST_LENGTH:
+            self.set_error(f"Burst length must be between 1 and {MAX_BURST_LENGTH} cycles")
+            self.burst_var.set(str(self.engine.burst_length))
+            return
+        if burst != self.engine.burst_length:
+            self.engine.set_burst_length(burst)
+            self.clear_error()
+
+    def parse_weights(self):
+        """Weights from the entry, repeated to the device count (None if blank)"""
+        text = self.weights_var.get().replace(",", " ").split()
+        if not text:
+            return None
+        values = [int(v) for v in text]
+        if any(v < 1 for v in values):
+            raise ValueError("weights must be positive integers")
+        return [values[i % len(values)] for i in range(self.device_count)]
+
+    def _on_weights_change(self):
+        try:
+            weights = self.parse_weights()
+        except ValueError:
+            self.set_error("Weights must be positive integers, e.g. 4,2,1,1")
+            return
+        if weights != self.engine.weights:
+            self.engine.set_weights(weights)
+            self.clear_error()
+
+    def set_device_count(self, count):
+        self.device_count = count
+        self.device_labels = [f"Device {i + 1}" for i in range(count)]
+        try:
+            weights = self.parse_weights()
+        except ValueError:
+            weights = None
+        self.engine = ArbiterEngine(count, mode=self.engine.mode, track_metrics=True,
+                                    burst_length=self.engine.burst_length, weights=weights)
+        self._shown_requests = 0
+        self._shown_winner = None
+        self.canvas.delete("all")
+        self.canvas.xview_moveto(0)
+        self.draw_static_components()
+        self.renderer.rebuild()
+        # The new engine's methods need timing wrappers too
+        self.instrumentation.refresh()
+        self.clear_error()
+        self.update_stats()
+        self.log_message(f"Device count set to {count}.\n")
 
     def start(self):
         global running
         if not running:
-            running = True
             self.clear_error()
-            threading.Thread(target=self.simulation_loop, daemon=True).start()
-            self.log_message("Simulation started.\n")
+            # Every run is a session: statistics restart and all randomness
+            # comes from the session seed, so a run can be reproduced
+            self.engine.reset()
+            if self.capture_decoder is not None:
+                self.capture_decoder.reset()
+            self.latency.reset()
+            replay, recorder = self.replay, None
+            if replay is not None:
+                rec, first = replay
+                self.replay = None
+                self.engine.set_workload(None)
+                started = f"Replaying {rec.path} from cycle {first} of {len(rec)}.\n"
+            else:
+                try:
+                    seed = self.session_seed()
+                except ValueError:
+                    self.set_error("Seed must be an integer")
+                    return
+                self.engine.reseed(seed)
+                try:
+                    self.apply_workload(seed)
+                except (OSError, ValueError) as e:
+                    self.set_error(f"Traffic: {e}")
+                    return
+                if self.record_var.get() and self.record_path:
+                    try:
+                        recorder = RecordingWriter(self.record_path, self.device_count, {
+                            "mode": self.engine.mode,
+                            "seed": seed,
+                            "burst_length": self.engine.burst_length,
+                            "weights": self.engine.weights,
+                            "traffic": self.traffic_var.get(),
+                        })
+                    except OSError as e:
+                        self.set_error(f"Record: {e}")
+                        return
+                started = f"Simulation started (seed {seed}).\n"
+                if recorder is not None:
+                    started += f"Recording to {self.record_path}.\n"
+            exporter = None
+            if self.export_var.get() and self.export_path:
+                try:
+                    exporter = CycleExporter(self.export_path, self.device_count)
+                except OSError as e:
+                    if recorder is not None:
+                        recorder.close()
+                    self.set_error(f"Export: {e}")
+                    return
+                started += f"Exporting cycles to {exporter.path} ({exporter.format}).\n"
+            self.exporter = exporter
+            running = True
+            # A fresh clock per run, so a loop from a previous run that is
+            # still waiting exits on its own (stopped) clock
+            self.clock = VirtualClock(self.speed_var.get())
+            threading.Thread(
+                target=self.simulation_loop, args=(self.clock, replay, recorder, exporter), daemon=True
+            ).start()
+            self.log_message(started)
+
+    def session_seed(self):
+        """Seed from the entry, or a new random one when it is blank"""
+        text = self.seed_var.get().strip()
+        if text:
+            return int(text)
+        return random.SystemRandom().randrange(1 << 32)
+
+    def _on_record_toggle(self):
+        if not self.record_var.get():
+            return
+        filename = filedialog.asksaveasfilename(
+            title="Record session to",
+            defaultextension=".barec",
+            filetypes=[("Arbitration recordings", "*.barec"), ("All files", "*.*")],
+        )
+        if filename:
+            self.record_path = filename
+        else:
+            self.record_var.set(False)
+
+    def _on_export_toggle(self):
+        if not self.export_var.get():
+            return
+        filename = filedialog.asksaveasfilename(
+            title="Export cycle history to",
+            defaultextension=".parquet",
+            filetypes=[
+                ("Parquet", "*.parquet"),
+                ("Arrow IPC", "*.arrow"),
+                ("CSV", "*.csv"),
+                ("All files", "*.*"),
+            ],
+        )
+        if filename:
+            self.export_path = filename
+        else:
+            self.export_var.set(False)
+
+    def replay_recording(self):
+        """Pick a recording and replay it from the 'from cycle' entry"""
+        if running:
+            self.log_message("[Info] Stop the simulation before starting a replay.\n")
+            return
+        filename = filedialog.askopenfilename(
+            title="Replay recording",
+            filetypes=[("Arbitration recordings", "*.barec"), ("All files", "*.*")],
+        )
+        if not filename:
+            return
+        try:
+            first = int(self.replay_from_var.get() or 0)
+            rec = Recording(filename)
+        except (OSError, ValueError) as e:
+            self.set_error(f"Replay: {e}")
+            return
+        if not 0 <= first < len(rec):
+            rec.close()
+            self.set_error(f"Replay: the recording has cycles 0 to {len(rec) - 1}")
+            return
+        if rec.device_count != self.device_count:
+            self.device_count_var.set(str(rec.device_count))
+            self.set_device_count(rec.device_count)
+        self.replay = (rec, first)
+        self.start()
 
     def stop(self):
         global running
         running = False
+        if self.clock is not None:
+            self.clock.stop()
+        self.renderer.clear()
         self.log_message("Simulation stopped.\n")
+        if self.capture_running and self.capture_decoder is not None:
+            self.root.after(CAPTURE_CHECK_DELAY_MS, self.check_capture)
+            self.root.after(CAPTURE_CHECK_DELAY_MS, self.log_latency_summary)
+        else:
+            self.log_latency_summary()
+
+    def _on_traffic_change(self, *args):
+        if self.traffic_var.get() != TRAFFIC_TRACE:
+            return
+        filename = filedialog.askopenfilename(
+            title="Select a request trace",
+            filetypes=[("Request traces", "*.txt *.trace"), ("All files", "*.*")],
+        )
+        if filename:
+            self.trace_path = filename
+            self.log_message(f"Request trace: {filename}\n")
+        elif self.trace_path is None:
+            self.traffic_var.set(TRAFFIC_UNIFORM)
+
+    def apply_workload(self, seed=None):
+        """Give the engine a fresh workload for the selected traffic"""
+        old = self.engine.workload
+        if isinstance(old, TraceWorkload):
+            old.close()
+        kind = self.traffic_var.get()
+        if kind == TRAFFIC_BURSTY:
+            workload = MarkovBurstWorkload(self.device_count, seed=None if seed is None else f"{seed}/workload")
+        elif kind == TRAFFIC_TRACE and self.trace_path:
+            workload = TraceWorkload(self.device_count, self.trace_path)
+        else:
+            workload = None
+        self.engine.set_workload(workload)
 
-    def simulation_loop(self):
+    def _on_send_events_change(self, *args):
+        self.send_events = self.wireshark_enabled.get()
+
+    def _on_coalesce_change(self):
+        self.udp_sender.coalesce = self.coalesce_var.get()
+
+    def _on_wire_format_change(self, *args):
+        self.wire_format = self.wire_format_var.get()
+
+    def _on_speed_change(self, *args):
+        if self.clock is not None:
+            self.clock.set_speed(self.speed_var.get())
+
+    def simulation_loop(self, clock, replay=None, recorder=None, exporter=None):
+        # replay: (Recording, first cycle) to play back instead of arbitrating;
+        # recorder: RecordingWriter and exporter: CycleExporter receiving every cycle
         global running
-        while running:
+        results = None if replay is None else replay[0].results(replay[1])
+        throttle = FrameThrottle()
+        ui = self.ui_queue
+        while running and not clock.stopped:
             try:
-                # Generate requests
-                requests = [random.choice([True, False]) for _ in range(self.device_count)]
-                requesting_devices = [
-                    self.device_labels[i] for i, req in enumerate(requests) if req
-                ]
+                # Generate requests and determine winner
+                if results is not None:
+                    result = next(results, None)
+                    if result is not None:
+                        self.engine.replay(result)
+                else:
+                    result = self.engine.step()
+                if result is None:
+                    done = "Replay finished.\n" if results is not None else "Request trace finished.\n"
+                    ui.post(self.log_message, done)
+                    ui.post(self.stop)
+                    break
+                if recorder is not None:
+                    recorder.append(result)
+                if exporter is not None:
+                    exporter.append(result, time.time(), clock.virtual_time)
+                requests = result.requests
+                winner_index = result.winner
+                holder = result.holder
 
-                # Determine winner
-                winner_index = self.determine_winner(requests)
+                # Faster than real time, only one cycle per display frame is
+                # logged and animated; colours and stats always coalesce
+                show = not clock.throttled or throttle.due()
 
-                # Update UI (must be done in main thread)
-                self.root.after(0, self.update_colors, requests, winner_index)
+                # Update UI (drained on the main thread once per frame)
+                ui.post_latest("colors", self.update_colors, requests, holder)
+                ui.post_latest("stats", self.update_stats)
 
-                if requesting_devices and winner_index is not None:
-                    msg = f"Bus granted to {self.device_labels[winner_index]}.\n"
-                    self.root.after(0, self.log_message, msg)
-                    data = random.randint(1, 255)
+                if winner_index is not None:
+                    data = result.data
+                    if show:
+                        msg = f"Bus granted to {self.device_labels[winner_index]}.\n"
+                        ui.post(self.log_message, msg)
 
                     # Send UDP events
-                    self.root.after(0, self.send_wireshark_frame, "GRANT", winner_index, None)
-                    self.root.after(0, self.send_wireshark_frame, "DATA", winner_index, data)
+                    self.send_wireshark_frame("GRANT", winner_index, None, result.cycle)
+                    self.send_wireshark_frame("DATA", winner_index, data, result.cycle)
 
-                    # Stats and animation
-                    self.root.after(0, self.update_stats, winner_index)
-                    self.root.after(0, self.animate_data_packet, winner_index, data)
+                    # Animation
+                    if show:
+                        ui.post(self.animate_data_packet, winner_index, data)
+                elif holder is not None:
+                    # Later cycle of a burst: one more data beat, no arbitration
+                    if show:
+                        msg = f"{self.device_labels[holder]} holds the bus (burst data).\n"
+                        ui.post(self.log_message, msg)
+                    self.send_wireshark_frame("DATA", holder, result.data, result.cycle)
+                    if show:
+                        ui.post(self.animate_data_packet, holder, result.data)
                 else:
-                    self.root.after(0, self.log_message, "No requests. Bus idle.\n")
-                    self.root.after(0, self.send_wireshark_frame, "IDLE", None, None)
+                    if show:
+                        ui.post(self.log_message, "No requests. Bus idle.\n")
+                    self.send_wireshark_frame("IDLE", None, None, result.cycle)
 
-                time.sleep(2)
+                if not clock.wait_next_cycle():
+                    break
             except Exception as e:
                 err_text = f"[Simulation error] {e}\n"
                 tb = traceback.format_exc()
-                self.root.after(0, self.log_message, err_text)
-                self.root.after(0, self.set_error, "Simulation error – see log.")
-                self.root.after(0, self.log_message, tb)
+                ui.post(self.log_message, err_text)
+                ui.post(self.set_error, "Simulation error – see log.")
+                ui.post(self.log_message, tb)
 
-        self.root.after(0, self.reset_colors)
+        if replay is not None:
+            results.close()
+            replay[0].close()
+        if recorder is not None:
+            recorder.close()
+            ui.post(self.log_message, f"Recorded {recorder.cycles} cycles to {recorder.path}.\n")
+        if exporter is not None:
+            try:
+                exporter.close()
+                msg = f"Exported {exporter.rows} cycles to {exporter.path}.\n"
+                if exporter.spilled_rows:
+                    msg += (f"[Export] {exporter.spilled_rows} cycles went through a temporary spill "
+                            "file because the disk could not keep up.\n")
+                if exporter.dropped_rows:
+                    msg += (f"[Export] {exporter.dropped_rows} cycles in {exporter.dropped_chunks} chunks "
+                            "were dropped because the disk could not keep up.\n")
+                ui.post(self.log_message, msg)
+            except OSError as e:
+                ui.post(self.set_error, f"Export: {e}")
+        ui.post_latest("stats", self.update_stats)
+        ui.post_latest("colors", self.reset_colors)
 
-    def determine_winner(self, requests):
-        try:
-            mode = self.mode_var.get()
-        except Exception:
-            mode = "Fixed Priority"
-
-        if mode == "Fixed Priority":
-            for i, req in enumerate(requests):
-                if req:
-                    return i
-        elif mode == "Round Robin":
-            for i in range(self.device_count):
-                idx = (self.next_index + i) % self.device_count
-                if requests[idx]:
-                    self.next_index = (idx + 1) % self.device_count
-                    return idx
-        elif mode == "Daisy Chain":
-            for i in reversed(range(self.device_count)):
-                if requests[i]:
-                    return i
+    def _drain_ui_queue(self):
+        """Run the UI work posted by worker threads since the last frame"""
+        for callback, args in self.ui_queue.drain():
+            try:
+                callback(*args)
+            except Exception as e:
+                self.log_message(f"[UI update error] {e}\n")
+        self.renderer.tick()
+        self.flush_log()
+        dropped = self.ui_queue.dropped
+        if dropped != self._ui_dropped_shown:
+            self._ui_dropped_shown = dropped
+            self.dropped_label.config(text=f"UI events dropped: {dropped}")
+        self.update_udp_status()
+        self.update_export_status()
+        self.update_latency()
+        self.root.after(self.frame_ms, self._drain_ui_queue)
+
+    def update_udp_status(self):
+        sender = self.udp_sender
+        shown = (sender.sent_events, sender.dropped, sender.queued)
+        if shown != self._udp_shown:
+            self._udp_shown = shown
+            self.udp_label.config(text="UDP sent=%d dropped=%d queued=%d" % shown)
+        if sender.errors != self._udp_errors_shown:
+            self._udp_errors_shown = sender.errors
+            self.log_message(f"[Wireshark error] {sender.last_error} ({sender.errors} send errors so far)\n")
+            self.set_error("Wireshark UDP send failed – see log.")
+
+    def update_export_status(self):
+        exporter = self.exporter
+        if exporter is None:
+            return
+        shown = (exporter.rows, exporter.spilled_rows, exporter.dropped_rows)
+        if shown != self._export_shown:
+            self._export_shown = shown
+            text = "Export rows=%d spilled=%d dropped=%d" % shown
+            self.export_label.config(text=text, fg="#b45309" if exporter.dropped_rows else "#4b5563")
+
+    def build_profiling_panel(self):
+        """Collapsible panel with hot-path timers, queue depths and cProfile"""
+        self.instrumentation = instr = Instrumentation()
+        instr.watch("ArbiterEngine.step", lambda: self.engine, "step")
+        instr.watch("ArbiterEngine.select (determine_winner)", lambda: self.engine, "select")
+        instr.watch("update_colors", lambda: self, "update_colors")
+        instr.watch("update_stats", lambda: self, "update_stats")
+        instr.watch("animate_data_packet", lambda: self, "animate_data_packet")
+        instr.watch("log_message", lambda: self, "log_message")
+        instr.watch("send_wireshark_frame", lambda: self, "send_wireshark_frame")
+        instr.watch("decode_captured (per packet)", lambda: self, "decode_captured")
+        instr.watch("_drain_ui_queue (per frame)", lambda: self, "_drain_ui_queue")
+        instr.watch("PacketRenderer.tick", lambda: self.renderer, "tick")
+        instr.gauge("Tk after queue", lambda: len(self.root.tk.splitlist(self.root.tk.call("after", "info"))))
+        instr.gauge("UI queue", lambda: len(self.ui_queue))
+        instr.gauge("UDP send queue", lambda: self.udp_sender.queued)
+        instr.gauge("packets in flight", lambda: self.renderer.in_flight)
+        instr.gauge("last renderer tick ms", lambda: round(self.renderer.last_tick_ms, 3))
+
+        self.profile_toggle = tk.Button(
+            self.control_frame,
+            text="\u25b8 Profiling",
+            font=("Segoe UI", 8),
+            command=self.toggle_profiling_panel,
+            bg="#f3f4f6",
+            fg="#4b5563",
+            relief="flat",
+            cursor="hand2",
+        )
+        self.profile_toggle.grid(row=4, column=0, padx=12, pady=(0, 4), sticky="w")
+        self.profile_frame = tk.Frame(self.control_frame, bg="#f3f4f6")
+        self.profile_frame.grid(row=5, column=0, columnspan=3, padx=12, pady=(0, 8), sticky="ew")
+        self.profile_frame.grid_remove()
+        self._profile_open = False
+
+        bar = tk.Frame(self.profile_frame, bg="#f3f4f6")
+        bar.pack(side="top", fill="x")
+        self.timers_var = tk.BooleanVar(value=False)
+        self.cprofile_var = tk.BooleanVar(value=False)
+        for text, var, command in (
+            ("Timers", self.timers_var, self._on_timers_toggle),
+            ("cProfile (UI thread)", self.cprofile_var, self._on_cprofile_toggle),
+        ):
+            tk.Checkbutton(bar, text=text, variable=var, command=command, font=("Segoe UI", 9),
+                           bg="#f3f4f6", activebackground="#f3f4f6").pack(side="left")
+        for text, command in (
+            ("Reset", self._reset_timers),
+            ("Export JSON...", self.export_profile_json),
+            ("Dump pstats...", self.dump_pstats),
+        ):
+            tk.Button(bar, text=text, font=("Segoe UI", 8), command=command, bg="#e5e7eb",
+                      relief="flat", padx=6, cursor="hand2").pack(side="left", padx=(6, 0))
+        self.profile_text = tk.Text(self.profile_frame, height=16, font=("Consolas", 9), bg="#ffffff",
+                                    fg="#111827", relief="solid", borderwidth=1, state="disabled")
+        self.profile_text.pack(side="top", fill="x", pady=(4, 0))
+
+    def toggle_profiling_panel(self):
+        self._profile_open = not self._profile_open
+        if not self._profile_open:
+            self.profile_frame.grid_remove()
+            self.profile_toggle.config(text="\u25b8 Profiling")
         else:
+            self.profile_frame.grid()
+            self.profile_toggle.config(text="\u25be Profiling")
+            self.refresh_profiling_panel()
+
+    def refresh_profiling_panel(self):
+        """Redraw the timer table; reschedules itself while the panel is open"""
+        if not self._profile_open:
+            return
+        text = format_timers(self.instrumentation.snapshot())
+        if not self.instrumentation.enabled:
+            text = "Timers are off; tick 'Timers' to start counting.\n\n" + text
+        self.profile_text.config(state="normal")
+        self.profile_text.delete("1.0", tk.END)
+        self.profile_text.insert("1.0", text)
+        self.profile_text.config(state="disabled")
+        self.root.after(PROFILE_REFRESH_MS, self.refresh_profiling_panel)
+
+    def _on_timers_toggle(self):
+        if self.timers_var.get():
+            self.instrumentation.enable()
+        else:
+            self.instrumentation.disable()
+
+    def _on_cprofile_toggle(self):
+        if self.cprofile_var.get():
+            self.instrumentation.start_profile()
+            self.log_message("cProfile started (UI thread).\n")
+        else:
+            self.instrumentation.stop_profile()
+            self.log_message("cProfile stopped; use 'Dump pstats...' to save it.\n")
+
+    def _reset_timers(self):
+        self.instrumentation.reset()
+
+    def export_profile_json(self):
+        filename = filedialog.asksaveasfilename(
+            title="Export timers", defaultextension=".json", filetypes=[("JSON", "*.json")]
+        )
+        if not filename:
+            return
+        try:
+            self.instrumentation.export_json(filename)
+        except OSError as e:
+            self.set_error(f"Export failed: {e}")
+            return
+        self.log_message(f"Timers exported to {filename}.\n")
+
+    def dump_pstats(self):
+        filename = filedialog.asksaveasfilename(
+            title="Save cProfile stats", defaultextension=".pstats",
+            filetypes=[("pstats", "*.pstats *.prof"), ("All files", "*.*")],
+        )
+        if not filename:
+            return
+        try:
+            self.instrumentation.dump_profile(filename)
+        except (OSError, ValueError) as e:
+            self.set_error(f"pstats dump failed: {e}")
+            return
+        self.log_message(f"cProfile stats written to {filename} (python -m pstats {filename}).\n")
+
+    def update_latency(self):
+        """Redraw the latency histograms (at most every LATENCY_REFRESH_S)"""
+        now = time.monotonic()
+        last, shown = self._latency_drawn
+        if now - last < LATENCY_REFRESH_S:
+            return
+        stages = self.latency.stages
+        counts = tuple(stages[stage].count for stage in STAGES)
+        self._latency_drawn = (now, counts)
+        if counts == shown:
+            return
+        canvas = self.latency_canvas
+        parts = []
+        for stage in STAGES:
+            h = stages[stage]
+            buckets = list(h.counts)
+            peak = max(buckets) or 1
+            for item, n in zip(self.latency_cells[stage], buckets):
+                # White (empty) to blue (the stage's most common bucket)
+                level = n / peak
+                shade = "#%02x%02x%02x" % (int(255 - 206 * level), int(255 - 125 * level), int(255 - 66 * level))
+                canvas.itemconfig(item, fill=shade if n else "#f3f4f6")
+            if h.count:
+                parts.append(f"{stage} p50 {h.percentile(0.5) / 1000:.2f} / p99 {h.percentile(0.99) / 1000:.2f} ms")
+        self.latency_label.config(text="Latency: " + (" | ".join(parts) or "-"))
+
+    def log_latency_summary(self):
+        if not any(h.count for h in self.latency.stages.values()):
+            return
+        self.log_message("\n=== Event latency ===\n" + format_latency(self.latency.summary()))
+
+    def _on_mode_change(self, *args):
+        mode = self.mode_var.get()
+        try:
+            self.engine.set_mode(mode)
+        except ValueError:
             self.log_message(f"[Error] Unknown mode '{mode}', using Fixed Priority.\n")
-            for i, req in enumerate(requests):
-                if req:
-                    return i
-        return None
+            self.engine.set_mode("Fixed Priority")
 
     def update_colors(self, requests, winner_index):
+        # requests is the cycle's request bitmask and winner_index the device
+        # holding the bus; only visible devices are repainted
+        self._shown_requests = requests
+        self._shown_winner = winner_index
         self.canvas.itemconfig(
             self.arbiter_box,
             fill="#a1d99b" if winner_index is not None else "#d9d9d9"
         )
-        for i, box in enumerate(self.device_boxes):
-            if winner_index == i:
-                self.canvas.itemconfig(box, fill="#74c476")
-                self.device_status_labels[i].config(text="Granted", fg="green")
-            elif requests[i]:
-                self.canvas.itemconfig(box, fill="#fdae6b")
-                self.device_status_labels[i].config(text="Requesting", fg="orange")
-            else:
-                self.canvas.itemconfig(box, fill="#d9d9d9")
-                self.device_status_labels[i].config(text="Idle", fg="gray")
+        self.canvas.itemconfig(self.bus_busy_item, fill="#dc2626" if winner_index is not None else "black")
+        for i in self.device_items:
+            self._paint_device(i)
 
     def reset_colors(self):
-        self.canvas.itemconfig(self.arbiter_box, fill="#d9d9d9")
-        for box in self.device_boxes:
-            self.canvas.itemconfig(box, fill="#d9d9d9")
-        for lbl in self.device_status_labels:
-            lbl.config(text="Idle", fg="gray")
+        self.update_colors(0, None)
 
     def animate_data_packet(self, winner_index, data):
-        x1, y1, x2, y2 = self.canvas.coords(self.device_boxes[winner_index])
-        start_x = (x1 + x2) / 2
-        start_y = y1
-        packet = self.canvas.create_rectangle(
-            start_x - 10, start_y - 20, start_x + 10, start_y, fill="#3182bd"
-        )
-        text = self.canvas.create_text(
-            start_x, start_y - 10, text=str(data), fill="white",
-            font=("Arial", 10, "bold")
-        )
-
-        steps = 50
-        dy = (start_y - self.bus_y) / steps
+        if winner_index not in self.device_items:
+            return  # scrolled out of view
+        x1, y1, x2, y2 = self.canvas.coords(self.device_items[winner_index][0])
+        # Moved by the renderer's per-frame tick from _drain_ui_queue
+        self.renderer.launch((x1 + x2) / 2, y1, self.bus_y, str(data))
 
-        def step(i):
-            global running
-            if not running:
-                self.canvas.delete(packet)
-                self.canvas.delete(text)
-                return
-            if i >= steps:
-                self.canvas.delete(packet)
-                self.canvas.delete(text)
-                return
-            self.canvas.move(packet, 0, -dy)
-            self.canvas.move(text, 0, -dy)
-            self.root.after(20, step, i + 1)
-
-        step(0)
-
-    def send_wireshark_frame(self, event_type, device_index, data=None):
-        if not self.wireshark_enabled.get():
+    def send_wireshark_frame(self, event_type, device_index, data=None, cycle=None):
+        # Runs on the simulation thread: encode and hand off, never block
+        if not self.send_events:
             return
 
-        try:
-            device_name = (
-                self.device_labels[device_index]
-                if device_index is not None and 0 <= device_index < self.device_count
-                else "NONE"
-            )
-        except Exception:
-            device_name = "INVALID"
-
-        payload = f"BUS_EVENT {event_type} DEVICE={device_name} DATA={data if data is not None else '-'}"
-        try:
-            self.sock.sendto(payload.encode("utf-8"), (self.udp_ip, self.udp_port))
-        except OSError as e:
-            self.log_message(f"[Wireshark error] {e}\n")
-            self.set_error("Wireshark UDP send failed – see log.")
+        valid = device_index is not None and 0 <= device_index < self.device_count
+        if self.wire_format == wire.BINARY:
+            payload = wire.encode_binary(event_type, device_index if valid else None, data, cycle)
+        else:
+            try:
+                device_name = self.device_labels[device_index] if valid else "NONE"
+            except Exception:
+                device_name = "INVALID"
+            payload = wire.encode_text(event_type, device_name, data)
+        self.udp_sender.submit(payload)
 
     def toggle_capture(self):
         if self.capture_running:
             self.capture_running = False
             self.capture_btn.config(text="Start Capture")
-            self.log_message("PyShark capture stopping...\n")
+            self.log_message("Capture stopping...\n")
+            if self.capture_reader is not None:
+                # Ends the tshark stream so the reader thread exits promptly
+                self.capture_reader.close()
         else:
             iface = self.capture_iface_var.get().strip()
             if not iface:
@@ -649,15 +1463,22 @@ class BusArbitrationSimulator:
             self.clear_error()
             self.capture_running = True
             self.capture_btn.config(text="Stop Capture")
-            self.log_message(f"Starting PyShark capture on '{iface}' (udp.port == {self.udp_port})...\n")
+            backend = self.capture_backend_var.get()
+            self.log_message(f"Starting {backend} capture on '{iface}' (udp.port == {self.udp_port})...\n")
             self.log_message(f"Using TShark: {tshark_path}\n")
-            self.capture_thread = threading.Thread(
-                target=self.pyshark_capture_loop, args=(iface, tshark_path), daemon=True
-            )
+            self.capture_decoder = StreamDecoder(latency=self.latency)
+            self._anomalies_logged = 0
+            if backend == CAPTURE_TSHARK_FIELDS:
+                self.capture_reader = TsharkFieldsReader(tshark_path, interface=iface, udp_port=self.udp_port)
+                target = self.tshark_capture_loop
+            else:
+                target = self.pyshark_capture_loop
+            self.capture_thread = threading.Thread(target=target, args=(iface, tshark_path), daemon=True)
             self.capture_thread.start()
 
     def pyshark_capture_loop(self, iface_name: str, tshark_path: str):
         # Ensure this background thread has its own asyncio event loop
+        import asyncio
         try:
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
@@ -666,6 +1487,7 @@ class BusArbitrationSimulator:
             pass
 
         try:
+            pyshark = load_pyshark()
             # Configure pyshark to use the specified tshark path
             # Try to set it in config first (if available)
             try:
@@ -693,8 +1515,8 @@ class BusArbitrationSimulator:
                     f"     - C:\\Program Files\\Wireshark\\tshark.exe\n"
                     f"     - C:\\Program Files (x86)\\Wireshark\\tshark.exe\n"
                 )
-                self.root.after(0, self.log_message, help_msg)
-                self.root.after(0, self.set_error, "TShark not found - see log for instructions")
+                self.log_message(help_msg)
+                self.ui_queue.post(self.set_error, "TShark not found - see log for instructions")
             elif "does not exist" in error_msg.lower() or "interface" in error_msg.lower():
                 # Interface error - extract available interfaces from error message
                 help_msg = f"\n[Interface Error] {error_msg}\n"
@@ -706,13 +1528,13 @@ class BusArbitrationSimulator:
                 help_msg += "  - \\Device\\NPF_Loopback (for localhost/loopback)\n"
                 help_msg += "  - Wi-Fi (for wireless)\n"
                 help_msg += "  - Ethernet (for wired)\n"
-                self.root.after(0, self.log_message, help_msg)
-                self.root.after(0, self.set_error, "Interface not found - click 'List' to see available interfaces")
+                self.log_message(help_msg)
+                self.ui_queue.post(self.set_error, "Interface not found - click 'List' to see available interfaces")
             else:
-                self.root.after(0, self.set_error, f"PyShark init failed: {error_msg}")
-                self.root.after(0, self.log_message, f"[PyShark init error] {error_msg}\n")
+                self.ui_queue.post(self.set_error, f"PyShark init failed: {error_msg}")
+                self.log_message(f"[PyShark init error] {error_msg}\n")
             self.capture_running = False
-            self.root.after(0, self.capture_btn.config, {"text": "Start Capture"})
+            self.ui_queue.post(self.capture_btn.config, {"text": "Start Capture"})
             return
 
         try:
@@ -727,42 +1549,204 @@ class BusArbitrationSimulator:
                     if hasattr(pkt, "udp") and hasattr(pkt.udp, "payload"):
                         payload = str(pkt.udp.payload)
                     msg = (f"[PyShark] {src} -> {dst} len={length} payload={payload}\n")
-                    self.root.after(0, self.log_message, msg)
+                    self.log_message(msg)
+                    if payload:
+                        when = float(pkt.sniff_timestamp) if hasattr(pkt, "sniff_timestamp") else None
+                        self.decode_captured(bytes.fromhex(payload.replace(":", "")), when)
                 except Exception as inner_e:
-                    self.root.after(0, self.log_message,
-                                    f"[PyShark packet error] {inner_e}\n")
+                    self.log_message(f"[PyShark packet error] {inner_e}\n")
         except Exception as e:
             error_msg = str(e)
-            self.root.after(0, self.log_message, f"[PyShark capture error] {error_msg}\n")
+            self.log_message(f"[PyShark capture error] {error_msg}\n")
             if "interface" in error_msg.lower() or "does not exist" in error_msg.lower():
-                self.root.after(0, self.log_message, 
+                self.log_message(
                     "\n[Tip] Click the 'List' button to see available interfaces.\n"
                     "For localhost traffic, use: \\Device\\NPF_Loopback\n")
-            self.root.after(0, self.set_error, "PyShark capture error – see log.")
+            self.ui_queue.post(self.set_error, "PyShark capture error – see log.")
         finally:
             try:
                 capture.close()
             except Exception:
                 pass
             self.capture_running = False
-            self.root.after(0, self.capture_btn.config, {"text": "Start Capture"})
-            self.root.after(0, self.log_message, "PyShark capture stopped.\n")
+            self.ui_queue.post(self.capture_btn.config, {"text": "Start Capture"})
+            self.log_message("PyShark capture stopped.\n")
 
-    def update_stats(self, winner_index):
-        if winner_index is None:
+    def analyze_capture_file(self):
+        """Analyze the BUS_EVENT traffic in a saved pcap/pcapng file"""
+        filename = filedialog.askopenfilename(
+            title="Select capture file",
+            filetypes=[("Capture files", "*.pcap *.pcapng"), ("All files", "*.*")],
+        )
+        if not filename:
             return
-        if 0 <= winner_index < self.device_count:
-            self.grant_counts[winner_index] += 1
+        # The tshark backend decodes the file with tshark; otherwise the
+        # built-in reader is used, which needs no Wireshark install
+        tshark_path = None
+        if self.capture_backend_var.get() == CAPTURE_TSHARK_FIELDS:
+            tshark_path = self.tshark_path_entry.get().strip() or None
+        self.log_message(f"Analyzing {filename}...\n")
+        threading.Thread(
+            target=self._analyze_capture_worker, args=(filename, tshark_path), daemon=True
+        ).start()
+
+    def _analyze_capture_worker(self, filename, tshark_path):
+        try:
+            analyzer = analyze_file(filename, self.udp_port, tshark_path)
+        except Exception as e:
+            self.log_message(f"[Capture analysis error] {e}\n")
+            self.ui_queue.post(self.set_error, "Capture analysis failed - see log")
+            return
+        self.log_message(f"\n=== Capture analysis: {os.path.basename(filename)} ===\n")
+        self.log_message(format_summary(analyzer.summary()))
+
+    def tshark_capture_loop(self, iface_name: str, tshark_path: str):
+        """Capture via tshark -T fields, parsing its stdout as a stream"""
+        reader = self.capture_reader
+        count = 0
+        try:
+            for pkt in reader.packets():
+                if not self.capture_running:
+                    break
+                count += 1
+                # log_message is thread-safe; the widget is updated per frame
+                self.log_message(f"[tshark] {pkt.src} -> {pkt.dst} len={pkt.length} payload={pkt.payload.hex(':')}\n")
+                self.decode_captured(pkt.payload, pkt.time)
+            if self.capture_running and reader.returncode:
+                # tshark exited on its own: bad interface, permissions, ...
+                error_msg = reader.error_text() or f"tshark exited with code {reader.returncode}"
+                self.log_message(f"[tshark capture error] {error_msg}\n")
+                if "interface" in error_msg.lower() or "does not exist" in error_msg.lower():
+                    self.log_message("\n[Tip] Click the 'List' button to see available interfaces.\n"
+                                     "For localhost traffic, use: \\Device\\NPF_Loopback\n")
+                self.ui_queue.post(self.set_error, "tshark capture error – see log.")
+        except OSError as e:
+            self.log_message(f"[tshark capture error] {e}\n")
+            self.ui_queue.post(self.set_error, "Could not start tshark – see log.")
+        finally:
+            reader.close()
+            if self.capture_reader is reader:
+                self.capture_reader = None
+            self.capture_running = False
+            self.ui_queue.post(self.capture_btn.config, {"text": "Start Capture"})
+            self.log_message(f"tshark capture stopped ({count} packets).\n")
+
+    def decode_captured(self, payload, when):
+        """Feed a captured datagram to the decoder (capture thread) and log anomalies"""
+        decoder = self.capture_decoder
+        decoder.feed_payload(payload, when)
+        if self._anomalies_logged >= CAPTURE_ANOMALIES_LOGGED:
+            return
+        new = decoder.anomaly_count - self._anomalies_logged
+        for text in list(decoder.anomalies)[-new:] if new > 0 else ():
+            self.log_message(f"[Capture check] {text}\n")
+            self._anomalies_logged += 1
+            if self._anomalies_logged == CAPTURE_ANOMALIES_LOGGED:
+                self.log_message("[Capture check] Further anomalies are only counted.\n")
+                break
+
+    def check_capture(self):
+        """Compare what the capture decoded with the engine's own counters"""
+        decoder = self.capture_decoder
+        if decoder is None or running:
+            return
+        engine = self.engine
+        s = decoder.summary()
+        self.log_message(
+            f"\n=== Capture check ===\nDecoded {s['cycles']} of {engine.cycle} cycles; "
+            f"lost {s['lost_cycles']}, reordered {s['reordered']}, duplicated {s['duplicates']}, "
+            f"GRANT without DATA {s['missing_data']}, undecodable {s['undecodable']}\n"
+        )
+        diffs = decoder.cross_check(engine.grant_counts, engine.idle_cycles, engine.busy_cycles)
+        if not diffs:
+            self.log_message("Captured grant counts match the simulator.\n")
+            return
+        for name, expected, seen in diffs[:STATS_DEVICES_LISTED]:
+            self.log_message(f"  {name}: simulator {expected}, captured {seen}\n")
+        if len(diffs) > STATS_DEVICES_LISTED:
+            self.log_message(f"  ... {len(diffs) - STATS_DEVICES_LISTED} more counters differ\n")
+        self.set_error("Capture does not match the simulator - see log.")
+
+    def update_stats(self):
+        counts = self.engine.grant_counts
+        if self.device_count <= STATS_DEVICES_LISTED:
             parts = [
                 f"{name}={cnt}"
-                for name, cnt in zip(self.device_labels, self.grant_counts)
+                for name, cnt in zip(self.device_labels, counts)
             ]
-            self.stats_label.config(text="Stats: " + " | ".join(parts))
+        else:
+            top = max(range(self.device_count), key=counts.__getitem__)
+            low = min(range(self.device_count), key=counts.__getitem__)
+            parts = [
+                f"{self.device_count} devices",
+                f"grants={sum(counts)}",
+                f"most {self.device_labels[top]}={counts[top]}",
+                f"least {self.device_labels[low]}={counts[low]}",
+            ]
+        self.stats_label.config(text="Stats: " + " | ".join(parts))
+        self.update_metrics()
+
+    def update_metrics(self):
+        m = self.engine.metrics.snapshot()
+        if not m["cycles"]:
+            self.metrics_label.config(text="")
+            return
+        wait = "-"
+        if m["wait_p50"] is not None:
+            wait = f"p50 {m['wait_p50']:.1f} / p99 {m['wait_p99']:.1f} cycles"
+        streaks = m["max_starvation"]
+        if self.device_count <= STATS_DEVICES_LISTED:
+            starve = ", ".join(f"{name}={streak}" for name, streak in zip(self.device_labels, streaks))
+        else:
+            worst = max(range(self.device_count), key=streaks.__getitem__)
+            starve = f"{self.device_labels[worst]}={streaks[worst]} (worst)"
+        self.metrics_label.config(
+            text=(
+                f"Cycles {m['cycles']} | Utilisation {m['utilisation']:.1%} | Idle {m['idle_ratio']:.1%}"
+                f" | Jain fairness {m['jain_index']:.3f}"
+                f" | Wait {wait}"
+                f" | Max starvation: {starve}"
+            )
+        )
 
     def log_message(self, msg):
-        self.log.insert(tk.END, msg)
+        # Safe from any thread; the widget is updated by flush_log each frame
+        self.log_buffer.append(msg)
+
+    def flush_log(self):
+        text = self.log_buffer.take_pending()
+        if not text:
+            return
+        self.log.insert(tk.END, text)
+        # Trim the oldest lines so the widget stays as small as the buffer
+        excess = int(self.log.index("end-1c").split(".")[0]) - self.log_buffer.max_lines
+        if excess > 0:
+            self.log.delete("1.0", f"{excess + 1}.0")
         self.log.see(tk.END)
 
+    def toggle_log_spill(self):
+        if not self.log_spill_var.get():
+            path = self.log_buffer.spill_path
+            self.log_buffer.set_spill(None)
+            self.log_message(f"Stopped writing log to {path}\n")
+            return
+        filename = filedialog.asksaveasfilename(
+            title="Write full log to",
+            defaultextension=".log",
+            filetypes=[("Log files", "*.log"), ("All files", "*.*")],
+        )
+        if not filename:
+            self.log_spill_var.set(False)
+            return
+        try:
+            self.log_buffer.set_spill(filename)
+        except OSError as e:
+            self.log_spill_var.set(False)
+            self.log_message(f"[Error] Cannot open log file: {e}\n")
+            self.set_error("Log file could not be opened - see log")
+            return
+        self.log_message(f"Writing full log to {filename}\n")
+
     # --- mouse wheel support for log scrolling ---
     def _on_mousewheel(self, event):
         # Windows uses event.delta in steps of 120
@@ -791,11 +1775,15 @@ class BusArbitrationSimulator:
         self.error_label.config(text="")
 
     def cleanup(self):
+        self.udp_sender.stop()
         try:
             self.sock.close()
         except Exception:
             pass
         self.capture_running = False
+        if self.capture_reader is not None:
+            self.capture_reader.close()
+        self.log_buffer.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,268 @@
+"""Columnar export of per-cycle history for offline analysis.
+
+``CycleExporter`` buffers cycles column by column in typed arrays and hands
+every full chunk to a writer thread, so the simulation loop only pays for a
+few array appends per cycle and memory stays bounded by ``chunk_rows`` times
+``max_pending`` chunks, however long the run. If the disk falls that far
+behind, the default ``overflow="spill"`` pickles further chunks to a
+temporary file that the writer reads back in order, so every cycle is still
+written without stalling the simulation. ``overflow="drop"`` discards and
+counts them instead (the cycle column then shows the gap), and
+``overflow="block"`` waits, for offline conversions.
+
+The format follows the file extension: ``.parquet`` and ``.arrow`` (Arrow IPC
+file, also read by ``pandas.read_feather``) need pyarrow; without it, or for
+any other extension, the export falls back to CSV next to the requested path.
+
+Columns: ``cycle``, ``time`` (wall-clock seconds since the epoch, NaN when
+unknown), ``virtual_time`` (simulated seconds), ``requests`` (request bitmask;
+bit i is device i + 1), ``winner``, ``holder`` and ``data`` (0-based device
+indices and data value, -1 for none). Above 64 devices the request mask does
+not fit a uint64 column and is stored as little-endian bytes (hex in CSV).
+
+Usage (convert a recording)::
+
+    python export.py run.barec run.parquet [--chunk-rows N]
+"""
+import argparse
+import csv
+import importlib.util
+import math
+import os
+import pickle
+import queue
+import tempfile
+import threading
+from array import array
+
+from clock import CYCLE_PERIOD
+from recording import Recording
+
+CHUNK_ROWS = 65536
+MAX_PENDING_CHUNKS = 4
+
+COLUMNS = ("cycle", "time", "virtual_time", "requests", "winner", "holder", "data")
+COLUMNAR_FORMATS = {".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow"}
+
+_DONE = object()
+
+# What append() does when max_pending chunks are already waiting in memory
+SPILL = "spill"
+DROP = "drop"
+BLOCK = "block"
+OVERFLOW_POLICIES = (SPILL, DROP, BLOCK)
+
+# pyarrow is optional and slow to import: it is only looked up here and
+# imported by the writer thread of the first columnar export
+HAVE_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+
+def export_format(path):
+    """Format actually used for ``path``: parquet, arrow or csv"""
+    fmt = COLUMNAR_FORMATS.get(os.path.splitext(path)[1].lower(), "csv")
+    return fmt if HAVE_PYARROW else "csv"
+
+
+class CycleExporter:
+    """Streams CycleResults to a Parquet, Arrow or CSV file in chunks"""
+
+    def __init__(self, path, device_count, chunk_rows=CHUNK_ROWS, max_pending=MAX_PENDING_CHUNKS,
+                 overflow=SPILL):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{overflow}'")
+        self.format = export_format(path)
+        if self.format == "csv" and not path.lower().endswith(".csv"):
+            path = os.path.splitext(path)[0] + ".csv"
+        self.path = path
+        self.device_count = device_count
+        self.wide = device_count > 64
+        self.chunk_rows = chunk_rows
+        self.overflow = overflow
+        self.rows = 0  # cycles handed to the writer
+        self.spilled_rows = 0  # of those, cycles that went through the spill file
+        self.spilled_chunks = 0
+        self.dropped_rows = 0  # cycles discarded because the writer fell behind
+        self.dropped_chunks = 0
+        self.error = None
+        self._file = None
+        self._writer = None
+        if self.format == "csv":
+            self._file = open(path, "w", newline="", encoding="utf-8")
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(COLUMNS)
+        self._new_chunk()
+        # Holds chunks, spill file offsets of spilled chunks and _DONE; the
+        # semaphore bounds the chunks held in memory
+        self._queue = queue.Queue()
+        self._slots = threading.Semaphore(max_pending)
+        self._spill_file = None
+        self._spill_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._write_chunks, daemon=True)
+        self._thread.start()
+
+    def _new_chunk(self):
+        self._cycle = array("q")
+        self._time = array("d")
+        self._virtual = array("d")
+        self._requests = [] if self.wide else array("Q")
+        self._winner = array("h")
+        self._holder = array("h")
+        self._data = array("l")
+
+    def append(self, result, timestamp=math.nan, virtual_time=None):
+        """Add one cycle; ``virtual_time`` defaults to the cycle's simulated start"""
+        self._cycle.append(result.cycle)
+        self._time.append(timestamp)
+        self._virtual.append(result.cycle * CYCLE_PERIOD if virtual_time is None else virtual_time)
+        self._requests.append(result.requests)
+        self._winner.append(-1 if result.winner is None else result.winner)
+        self._holder.append(-1 if result.holder is None else result.holder)
+        self._data.append(-1 if result.data is None else result.data)
+        if len(self._cycle) >= self.chunk_rows:
+            self._flush_chunk()
+
+    def _flush_chunk(self, block=False):
+        if not self._cycle:
+            return
+        chunk = (self._cycle, self._time, self._virtual, self._requests,
+                 self._winner, self._holder, self._data)
+        rows = len(self._cycle)
+        self._new_chunk()
+        if self._slots.acquire(block or self.overflow == BLOCK):
+            self._queue.put(chunk)
+        elif self.overflow != SPILL or not self._spill(chunk):
+            # The disk can't keep up; never stall the simulation loop
+            self.dropped_rows += rows
+            self.dropped_chunks += 1
+            return
+        else:
+            self.spilled_rows += rows
+            self.spilled_chunks += 1
+        self.rows += rows
+
+    def _spill(self, chunk):
+        """Queue ``chunk`` through the spill file; False if it can't be written"""
+        try:
+            with self._spill_lock:
+                if self._spill_file is None:
+                    self._spill_file = tempfile.TemporaryFile(prefix="cycles-", suffix=".spill")
+                f = self._spill_file
+                offset = f.seek(0, os.SEEK_END)
+                pickle.dump(chunk, f, pickle.HIGHEST_PROTOCOL)
+        except OSError:
+            return False
+        self._queue.put(offset)
+        return True
+
+    def _unspill(self, offset):
+        with self._spill_lock:
+            self._spill_file.seek(offset)
+            return pickle.load(self._spill_file)
+
+    def stats(self):
+        return {
+            "rows": self.rows,
+            "spilled_rows": self.spilled_rows,
+            "spilled_chunks": self.spilled_chunks,
+            "dropped_rows": self.dropped_rows,
+            "dropped_chunks": self.dropped_chunks,
+            "pending_chunks": self._queue.qsize(),
+        }
+
+    def _write_chunks(self):
+        while True:
+            item = self._queue.get()
+            if item is _DONE:
+                break
+            spilled = isinstance(item, int)
+            if not spilled:
+                self._slots.release()  # the chunk is no longer waiting
+            if self.error is None:  # else keep draining so append() never blocks forever
+                try:
+                    chunk = self._unspill(item) if spilled else item
+                    if self.format == "csv":
+                        self._write_csv(chunk)
+                    else:
+                        self._write_columnar(chunk)
+                except Exception as exc:
+                    self.error = exc
+        try:
+            if self._file is not None:
+                self._file.close()
+            elif self._writer is not None:
+                self._writer.close()
+        except Exception as exc:
+            self.error = self.error or exc
+        if self._spill_file is not None:
+            self._spill_file.close()
+
+    def _write_csv(self, chunk):
+        cycle, timestamp, virtual, requests, winner, holder, data = chunk
+        if self.wide:
+            requests = [hex(mask) for mask in requests]
+        self._writer.writerows(zip(cycle, timestamp, virtual, requests, winner, holder, data))
+
+    def _write_columnar(self, chunk):
+        import pyarrow as pa
+        import pyarrow.ipc
+        import pyarrow.parquet
+
+        cycle, timestamp, virtual, requests, winner, holder, data = chunk
+        if self.wide:
+            width = (self.device_count + 7) // 8
+            requests = pa.array([mask.to_bytes(width, "little") for mask in requests],
+                                pa.binary(width))
+        else:
+            requests = pa.array(requests, pa.uint64())
+        batch = pa.record_batch([
+            pa.array(cycle, pa.int64()),
+            pa.array(timestamp, pa.float64()),
+            pa.array(virtual, pa.float64()),
+            requests,
+            pa.array(winner, pa.int16()),
+            pa.array(holder, pa.int16()),
+            pa.array(data, pa.int64()),
+        ], names=list(COLUMNS))
+        if self._writer is None:
+            if self.format == "parquet":
+                self._writer = pa.parquet.ParquetWriter(self.path, batch.schema)
+            else:
+                self._writer = pa.ipc.new_file(self.path, batch.schema)
+        if self.format == "parquet":
+            self._writer.write_batch(batch)
+        else:
+            self._writer.write(batch)
+
+    def close(self):
+        """Write the last partial chunk and wait for the writer thread"""
+        if self._thread.is_alive():
+            self._flush_chunk(block=True)
+            self._queue.put(_DONE)
+            self._thread.join()
+        if self.error is not None:
+            raise OSError(f"export to {self.path} failed: {self.error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a recording to Parquet, Arrow or CSV")
+    parser.add_argument("recording")
+    parser.add_argument("output", help="*.parquet, *.arrow or *.csv (CSV without pyarrow)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args(argv)
+
+    try:
+        rec = Recording(args.recording)
+    except (OSError, ValueError) as exc:
+        parser.error(str(exc))
+    try:
+        exporter = CycleExporter(args.output, rec.device_count, args.chunk_rows, overflow=BLOCK)
+        for result in rec.results():
+            exporter.append(result)
+        exporter.close()
+    finally:
+        rec.close()
+    print(f"{exporter.rows} cycles written to {exporter.path} ({exporter.format})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""Runtime-toggled call counters and timers for the simulator's hot paths.
+
+``Instrumentation.watch`` registers a method by owner and attribute name.
+While instrumentation is enabled, each watched method is shadowed on its
+owner instance by a timing wrapper. Disabling removes the wrappers, so the
+hot paths cost nothing extra when it is off. Owners that get replaced (e.g.
+the engine after a device count change) are looked up again by ``refresh``.
+
+Timers may be updated from several threads without a lock: a call racing
+another on the same timer can occasionally be lost, which is acceptable for
+profiling. ``start_profile``/``dump_profile`` add a cProfile of the thread
+that calls them (the Tk thread in the GUI) for pstats or snakeviz.
+"""
+import cProfile
+import functools
+import json
+import time
+
+
+class Timer:
+    """Call count, total and maximum duration of one function"""
+
+    __slots__ = ("count", "total_ns", "max_ns")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def snapshot(self):
+        return {
+            "calls": self.count,
+            "total_ms": self.total_ns / 1e6,
+            "mean_us": self.total_ns / self.count / 1e3 if self.count else None,
+            "max_us": self.max_ns / 1e3 if self.count else None,
+        }
+
+
+def _timed(func, timer):
+    perf_ns = time.perf_counter_ns
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = perf_ns()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = perf_ns() - start
+            timer.count += 1
+            timer.total_ns += elapsed
+            if elapsed > timer.max_ns:
+                timer.max_ns = elapsed
+
+    wrapper.__instrumented__ = True
+    return wrapper
+
+
+class Instrumentation:
+    """Named timers for watched methods, switched on and off at runtime"""
+
+    def __init__(self):
+        self.enabled = False
+        self.timers = {}
+        self.gauges = {}  # name -> callable returning a number, sampled by snapshot()
+        self._watched = []  # (name, get_owner, attribute)
+        self._wrapped = []  # (owner, attribute)
+        self._profile = None
+        self._last_profile = None
+
+    def watch(self, name, get_owner, attribute):
+        """Time ``get_owner().<attribute>`` as ``name`` while enabled"""
+        self.timers.setdefault(name, Timer())
+        self._watched.append((name, get_owner, attribute))
+        if self.enabled:
+            self._wrap(name, get_owner(), attribute)
+
+    def gauge(self, name, sample):
+        self.gauges[name] = sample
+
+    def enable(self):
+        if not self.enabled:
+            self.enabled = True
+            for name, get_owner, attribute in self._watched:
+                self._wrap(name, get_owner(), attribute)
+
+    def disable(self):
+        self.enabled = False
+        for owner, attribute in self._wrapped:
+            # The class attribute shows through again
+            if getattr(owner.__dict__.get(attribute), "__instrumented__", False):
+                delattr(owner, attribute)
+        self._wrapped = []
+
+    def refresh(self):
+        """Wrap owners that replaced instrumented ones since enable()"""
+        if self.enabled:
+            self.disable()
+            self.enable()
+
+    def _wrap(self, name, owner, attribute):
+        if getattr(owner.__dict__.get(attribute), "__instrumented__", False):
+            return
+        setattr(owner, attribute, _timed(getattr(owner, attribute), self.timers[name]))
+        self._wrapped.append((owner, attribute))
+
+    def reset(self):
+        for timer in self.timers.values():
+            timer.reset()
+
+    def snapshot(self):
+        gauges = {}
+        for name, sample in self.gauges.items():
+            try:
+                gauges[name] = sample()
+            except Exception:
+                gauges[name] = None
+        return {
+            "enabled": self.enabled,
+            "profiling": self._profile is not None,
+            "timers": {name: timer.snapshot() for name, timer in self.timers.items()},
+            "gauges": gauges,
+        }
+
+    def export_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+            f.write("\n")
+
+    @property
+    def profiling(self):
+        return self._profile is not None
+
+    def start_profile(self):
+        if self._profile is None:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def stop_profile(self):
+        """Stop cProfile; returns the Profile (None if it wasn't running)"""
+        profile, self._profile = self._profile, None
+        if profile is not None:
+            profile.disable()
+            self._last_profile = profile
+        return profile
+
+    def dump_profile(self, path):
+        """Write the current (or last) cProfile run in pstats format"""
+        profile = self._profile or self._last_profile
+        if profile is None:
+            raise ValueError("no profile has been recorded")
+        # dump_stats() disables the profiler; keep a running one going
+        profile.dump_stats(path)
+        if profile is self._profile:
+            profile.enable()
+
+
+def format_table(snapshot):
+    rows = [("function", "calls", "total ms", "mean us", "max us")]
+    timers = sorted(snapshot["timers"].items(), key=lambda kv: kv[1]["total_ms"], reverse=True)
+    for name, t in timers:
+        rows.append((
+            name,
+            str(t["calls"]),
+            f"{t['total_ms']:.1f}",
+            "-" if t["mean_us"] is None else f"{t['mean_us']:.1f}",
+            "-" if t["max_us"] is None else f"{t['max_us']:.1f}",
+        ))
+    widths = [max(len(r[i]) for r in rows) for i in range(5)]
+    lines = [r[0].ljust(widths[0]) + "".join("  " + v.rjust(w) for v, w in zip(r[1:], widths[1:]))
+             for r in rows]
+    for name, value in snapshot["gauges"].items():
+        lines.append(f"{name}: {'-' if value is None else value}")
+    return "\n".join(lines)
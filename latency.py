@@ -0,0 +1,113 @@
+"""Emission-to-capture latency of BUS_EVENTs.
+
+The UDP sender stamps every event with a sequence number and the monotonic
+time of the sendto carrying it (see ``wire.stamp``). Latency is then
+split into stages, each kept in a ``LatencyHistogram`` in microseconds:
+
+* ``queue``: ``UDPEventSender.submit`` on the simulation thread until the
+  sender thread picks the event up
+* ``send``: duration of one sendto call (per datagram)
+* ``arrival``: sendto until the capture timestamp of the datagram
+* ``total``: emission until capture (binary frames, which carry their
+  emission time)
+
+Every histogram has a single writer thread (sender or capture), so adding a
+sample takes no lock; readers may see a sample counted in one field but not
+yet in another, which is fine for display.
+"""
+import time
+
+# Bucket 0 holds samples below 1 us, bucket k samples in [2**(k-1), 2**k) us;
+# the last one also takes everything above ~1 s
+BUCKETS = 22
+STAGES = ("queue", "send", "arrival", "total")
+
+
+class LatencyHistogram:
+    """Power-of-two bucketed histogram of latencies in microseconds"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, us):
+        if us < 0.0:
+            us = 0.0  # capture and send clocks disagree by a hair
+        self.counts[min(BUCKETS - 1, int(us).bit_length())] += 1
+        self.count += 1
+        self.total += us
+        if us > self.max:
+            self.max = us
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def percentile(self, p):
+        """Upper edge of the bucket holding the ``p`` quantile (0 < p <= 1)"""
+        if not self.count:
+            return None
+        rank = p * self.count
+        seen = 0
+        for k, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(float(1 << k), self.max)
+        return self.max
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "mean_us": self.mean,
+            "p50_us": self.percentile(0.5),
+            "p99_us": self.percentile(0.99),
+            "max_us": self.max if self.count else None,
+            "buckets": list(self.counts),
+        }
+
+
+class LatencyTracker:
+    """The stage histograms plus the monotonic-to-wall clock offset"""
+
+    def __init__(self):
+        self.stages = {name: LatencyHistogram() for name in STAGES}
+        # Capture timestamps are wall-clock; send stamps are monotonic
+        self.offset_ns = time.time_ns() - time.monotonic_ns()
+
+    def __getitem__(self, stage):
+        return self.stages[stage]
+
+    def reset(self):
+        for histogram in self.stages.values():
+            histogram.reset()
+
+    def wall_time(self, monotonic_ns):
+        """Epoch seconds of a monotonic_ns() reading taken in this process"""
+        return (monotonic_ns + self.offset_ns) / 1e9
+
+    def record_capture(self, sent_ns, emitted_us, captured):
+        """Stage samples for one captured event (``captured`` in epoch seconds)"""
+        if sent_ns:
+            self.stages["arrival"].add((captured - self.wall_time(sent_ns)) * 1e6)
+        if emitted_us:
+            self.stages["total"].add(captured * 1e6 - emitted_us)
+
+    def summary(self):
+        return {name: h.snapshot() for name, h in self.stages.items()}
+
+
+def _ms(us):
+    return "-" if us is None else f"{us / 1000:.3f}"
+
+
+def format_summary(summary):
+    lines = ["stage     events     mean ms   p50 ms    p99 ms    max ms"]
+    for name, s in summary.items():
+        lines.append(f"{name:<8}{s['count']:>8}  {_ms(s['mean_us']):>9} {_ms(s['p50_us']):>8}"
+                     f"  {_ms(s['p99_us']):>8}  {_ms(s['max_us']):>8}")
+    return "\n".join(lines) + "\n"
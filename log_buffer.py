@@ -0,0 +1,103 @@
+"""Fixed-size log history with batched flushing and optional spill-to-disk.
+
+Messages are appended from any thread into a ring buffer holding at most
+``max_lines`` lines of text; a multi-line message (a traceback, a capture
+summary) counts for every line it spans. The GUI takes the messages added
+since its last flush once per frame and inserts them into the Text widget
+in a single call, trimming the widget to the same number of lines.
+With a spill file every message is also written to disk, so long sessions
+keep their complete log while memory use stays constant.
+"""
+import threading
+from collections import deque
+from itertools import islice
+
+DEFAULT_MAX_LINES = 2000
+
+
+class LogBuffer:
+    def __init__(self, max_lines=DEFAULT_MAX_LINES, spill_path=None):
+        self.max_lines = max_lines
+        self._lock = threading.Lock()
+        # Every message is at least one line, so maxlen evicts single-line
+        # messages in C; _trim handles the extra lines of longer ones
+        self._lines = deque(maxlen=max_lines)
+        self._multi = deque()  # (serial, extra lines) of retained multi-line messages
+        self._extra = 0
+        self._unflushed = 0
+        self.total = 0
+        self._spill = None
+        self.spill_path = None
+        if spill_path:
+            self.set_spill(spill_path)
+
+    def append(self, msg):
+        spill_msg = msg
+        # A last line without a newline still takes a line of the widget
+        count = msg.count("\n") + (not msg.endswith("\n"))
+        if count > self.max_lines:
+            # Keep the tail of a message longer than the whole history
+            tail = self.max_lines + 1 if msg.endswith("\n") else self.max_lines
+            msg = "\n".join(msg.split("\n")[-tail:])
+            count = self.max_lines
+        with self._lock:
+            self._lines.append(msg)
+            self._unflushed += 1
+            self.total += 1
+            if count > 1:
+                self._multi.append((self.total, count - 1))
+                self._extra += count - 1
+            if self._extra:
+                self._trim()
+            if self._spill is not None:
+                self._spill.write(spill_msg)
+
+    def _trim(self):
+        lines, multi = self._lines, self._multi
+        # Serial number (self.total of its append) of the oldest retained message
+        oldest = self.total - len(lines) + 1
+        while multi and multi[0][0] < oldest:
+            self._extra -= multi.popleft()[1]  # already evicted by maxlen
+        while len(lines) + self._extra > self.max_lines:
+            lines.popleft()
+            if multi and multi[0][0] == oldest:
+                self._extra -= multi.popleft()[1]
+            oldest += 1
+
+    def take_pending(self):
+        """Text of all messages added since the previous call.
+
+        If more messages arrived than the buffer holds, only the newest
+        ``max_lines`` lines are returned, preceded by a note on how many
+        messages were skipped.
+        """
+        with self._lock:
+            unflushed = self._unflushed
+            if not unflushed:
+                return ""
+            self._unflushed = 0
+            kept = min(unflushed, len(self._lines))
+            parts = list(islice(self._lines, len(self._lines) - kept, None))
+            if self._spill is not None:
+                self._spill.flush()
+        if unflushed > kept:
+            where = f"; see {self.spill_path}" if self.spill_path else ""
+            parts.insert(0, f"[... {unflushed - kept} log messages not shown{where}]\n")
+        return "".join(parts)
+
+    def lines(self):
+        """Snapshot of the retained history, oldest first"""
+        with self._lock:
+            return list(self._lines)
+
+    def set_spill(self, path):
+        """Start appending every message to ``path``; None stops spilling"""
+        spill = open(path, "a", encoding="utf-8") if path else None
+        with self._lock:
+            if self._spill is not None:
+                self._spill.close()
+            self._spill = spill
+            self.spill_path = path
+
+    def close(self):
+        self.set_spill(None)
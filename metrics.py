@@ -0,0 +1,173 @@
+"""Incremental fairness and latency metrics for the arbiter.
+
+``ArbitrationMetrics`` is fed one cycle at a time (request bitmask plus
+winner) and keeps everything needed for the stats panel and for headless
+comparisons of arbitration modes:
+
+* wait time per grant: cycles since the device first requested after its
+  previous grant (a request counts as outstanding until it is served, even
+  if the line drops in between, as a latched bus request would)
+* starvation: longest such wait, including requests still outstanding
+* Jain's fairness index over the grant counts
+* bus utilisation (grant and held cycles) and idle ratio
+
+Only the granted device is touched per cycle, plus the devices raising a
+new request; a device can only do that once per grant, so the work is O(1)
+per cycle amortised whatever the device count. Starvation of devices still
+waiting is computed when it is read. Wait times go into a histogram that
+is exact for short waits and needs bounded memory.
+"""
+
+
+# Waits shorter than this are counted exactly, longer ones per power of two
+EXACT_WAITS = 1024
+
+
+class WaitHistogram:
+    """Counts of integer wait times in bounded memory.
+
+    Percentiles are exact below EXACT_WAITS and the upper edge of the
+    power-of-two bucket (capped at the longest wait) above.
+    """
+
+    def __init__(self):
+        self.counts = [0] * EXACT_WAITS
+        self.long_counts = [0] * 65  # by bit_length
+        self.count = 0
+        self.max = 0
+
+    def add(self, wait):
+        if wait < EXACT_WAITS:
+            self.counts[wait] += 1
+        else:
+            self.long_counts[wait.bit_length()] += 1
+        self.count += 1
+        if wait > self.max:
+            self.max = wait
+
+    def percentile(self, p):
+        """Smallest wait at or above the ``p`` quantile (0 < p <= 1)"""
+        if not self.count:
+            return None
+        rank = p * self.count
+        seen = 0
+        for wait, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return wait
+        for k, n in enumerate(self.long_counts):
+            seen += n
+            if seen >= rank:
+                return min((1 << k) - 1, self.max)
+        return self.max
+
+
+class ArbitrationMetrics:
+    def __init__(self, device_count):
+        self.device_count = device_count
+        self.reset()
+
+    def reset(self):
+        n = self.device_count
+        self.cycles = 0
+        self.busy_cycles = 0
+        self.grant_counts = [0] * n
+        self.wait_totals = [0] * n
+        self.max_starvation = [0] * n
+        self.waits = WaitHistogram()
+        self._sum_grants = 0
+        self._sum_grants_sq = 0
+        # Devices with an outstanding request and the cycle it was raised
+        self._waiting = 0
+        self._since = [0] * n
+
+    def record(self, requests, winner):
+        """Record one cycle given a per-device sequence of request flags"""
+        mask = 0
+        for i, req in enumerate(requests):
+            if req:
+                mask |= 1 << i
+        self.record_mask(mask, winner)
+
+    def record_mask(self, mask, winner):
+        """Record one cycle given the request bitmask and winner (or None)"""
+        cycle = self.cycles
+        self._track_requests(mask, cycle)
+
+        if winner is not None:
+            wait = cycle - self._since[winner]
+            if wait > self.max_starvation[winner]:
+                self.max_starvation[winner] = wait
+            self.wait_totals[winner] += wait
+            self.waits.add(wait)
+            # A request held after the grant counts as a new one next cycle
+            self._waiting &= ~(1 << winner)
+            count = self.grant_counts[winner]
+            self.grant_counts[winner] = count + 1
+            self._sum_grants += 1
+            self._sum_grants_sq += 2 * count + 1
+            self.busy_cycles += 1
+        self.cycles = cycle + 1
+
+    def record_hold(self, mask):
+        """Record one cycle in which a transaction keeps the bus.
+
+        Requests first seen in ``mask`` wait from this cycle.
+        """
+        self._track_requests(mask, self.cycles)
+        self.busy_cycles += 1
+        self.cycles += 1
+
+    def _track_requests(self, mask, cycle):
+        # Devices raising a request while none of theirs is outstanding
+        new = mask & ~self._waiting
+        if new:
+            self._waiting |= new
+            since = self._since
+            while new:
+                low = new & -new
+                since[low.bit_length() - 1] = cycle
+                new ^= low
+
+    @property
+    def utilisation(self):
+        return self.busy_cycles / self.cycles if self.cycles else 0.0
+
+    @property
+    def idle_ratio(self):
+        return 1.0 - self.utilisation if self.cycles else 0.0
+
+    @property
+    def jain_index(self):
+        """Jain's fairness index of the grant counts (1.0 = perfectly even)"""
+        if not self._sum_grants_sq:
+            return 1.0
+        return self._sum_grants ** 2 / (self.device_count * self._sum_grants_sq)
+
+    def current_starvation(self):
+        """Longest streak so far per device, including requests still pending"""
+        result = list(self.max_starvation)
+        waiting = self._waiting
+        while waiting:
+            low = waiting & -waiting
+            i = low.bit_length() - 1
+            waiting ^= low
+            result[i] = max(result[i], self.cycles - self._since[i])
+        return result
+
+    def snapshot(self):
+        mean_wait = [
+            total / count if count else None
+            for total, count in zip(self.wait_totals, self.grant_counts)
+        ]
+        return {
+            "cycles": self.cycles,
+            "utilisation": self.utilisation,
+            "idle_ratio": self.idle_ratio,
+            "jain_index": self.jain_index,
+            "grant_counts": list(self.grant_counts),
+            "wait_p50": self.waits.percentile(0.5),
+            "wait_p99": self.waits.percentile(0.99),
+            "mean_wait": mean_wait,
+            "max_starvation": self.current_starvation(),
+        }
@@ -0,0 +1,179 @@
+"""Minimal pcap / pcapng reader for BUS_EVENT traffic.
+
+Extracts IPv4 UDP datagrams from a capture file without tshark or special
+privileges, so recorded runs can be analysed on headless CI machines.
+Packets are yielded as ``tshark_reader.Packet`` tuples, the same view the
+live tshark backend produces.
+"""
+import mmap
+import os
+import socket
+import struct
+
+from tshark_reader import Packet
+
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LOOP = 108
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+
+PCAPNG_SHB = 0x0A0D0D0A
+PCAPNG_IDB = 0x00000001
+PCAPNG_SPB = 0x00000003
+PCAPNG_EPB = 0x00000006
+
+_ETHERTYPE_IPV4 = 0x0800
+_ETHERTYPE_VLAN = 0x8100
+_IPPROTO_UDP = 17
+
+
+def read_packets(path, udp_port=None):
+    """Yield a Packet for every IPv4 UDP datagram in a pcap/pcapng file.
+
+    With ``udp_port`` only datagrams to or from that port are returned.
+    Raises ValueError for files that are neither format.
+    """
+    if os.path.getsize(path) == 0:
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        if buf[:4] == struct.pack("<I", PCAPNG_SHB):
+            records = _pcapng_records(buf)
+        else:
+            records = _pcap_records(buf)
+        for linktype, when, frame, orig_len in records:
+            udp = _udp_payload(linktype, frame, udp_port)
+            if udp is not None:
+                src, dst, payload = udp
+                yield Packet(when, src, dst, orig_len, payload)
+
+
+def _pcap_records(buf):
+    magic = buf[:4]
+    if magic in (b"\xd4\xc3\xb2\xa1", b"\x4d\x3c\xb2\xa1"):
+        endian = "<"
+    elif magic in (b"\xa1\xb2\xc3\xd4", b"\xa1\xb2\x3c\x4d"):
+        endian = ">"
+    else:
+        raise ValueError("Not a pcap or pcapng file")
+    scale = 1e-9 if magic in (b"\x4d\x3c\xb2\xa1", b"\xa1\xb2\x3c\x4d") else 1e-6
+    linktype = struct.unpack_from(endian + "I", buf, 20)[0] & 0xFFFF
+    record = struct.Struct(endian + "IIII")
+    offset = 24
+    end = len(buf)
+    while offset + record.size <= end:
+        sec, frac, incl_len, orig_len = record.unpack_from(buf, offset)
+        offset += record.size
+        if offset + incl_len > end:
+            break  # truncated capture
+        yield linktype, sec + frac * scale, buf[offset:offset + incl_len], orig_len
+        offset += incl_len
+
+
+def _pcapng_records(buf):
+    endian = "<"
+    interfaces = []  # (linktype, seconds per timestamp unit)
+    offset = 0
+    end = len(buf)
+    while offset + 12 <= end:
+        block_type = struct.unpack_from(endian + "I", buf, offset)[0]
+        if block_type == PCAPNG_SHB:
+            # Byte order of the section comes from the byte-order magic
+            endian = "<" if buf[offset + 8:offset + 12] == b"\x4d\x3c\x2b\x1a" else ">"
+            interfaces = []
+        block_len = struct.unpack_from(endian + "I", buf, offset + 4)[0]
+        if block_len < 12 or offset + block_len > end:
+            break
+        body = offset + 8
+        if block_type == PCAPNG_IDB:
+            linktype = struct.unpack_from(endian + "H", buf, body)[0]
+            interfaces.append((linktype, _if_tsresol(buf, body + 8, offset + block_len - 4, endian)))
+        elif block_type == PCAPNG_EPB:
+            if_id, ts_high, ts_low, cap_len, orig_len = struct.unpack_from(endian + "IIIII", buf, body)
+            if if_id < len(interfaces):
+                linktype, unit = interfaces[if_id]
+                frame = buf[body + 20:body + 20 + cap_len]
+                yield linktype, ((ts_high << 32) | ts_low) * unit, frame, orig_len
+        elif block_type == PCAPNG_SPB and interfaces:
+            orig_len = struct.unpack_from(endian + "I", buf, body)[0]
+            cap_len = min(orig_len, block_len - 16)
+            yield interfaces[0][0], None, buf[body + 4:body + 4 + cap_len], orig_len
+        offset += block_len
+
+
+def _if_tsresol(buf, offset, end, endian):
+    """Timestamp unit in seconds from an IDB's if_tsresol option (default 1 us)"""
+    while offset + 4 <= end:
+        code, length = struct.unpack_from(endian + "HH", buf, offset)
+        if code == 0:
+            break
+        if code == 9 and length >= 1:
+            value = buf[offset + 4]
+            if value & 0x80:
+                return 2.0 ** -(value & 0x7F)
+            return 10.0 ** -value
+        offset += 4 + ((length + 3) & ~3)
+    return 1e-6
+
+
+def _udp_payload(linktype, frame, udp_port):
+    """(src, dst, payload) of an IPv4 UDP frame, or None"""
+    if linktype == LINKTYPE_ETHERNET:
+        if len(frame) < 14:
+            return None
+        ethertype = struct.unpack_from("!H", frame, 12)[0]
+        ip = 14
+        if ethertype == _ETHERTYPE_VLAN and len(frame) >= 18:
+            ethertype = struct.unpack_from("!H", frame, 16)[0]
+            ip = 18
+        if ethertype != _ETHERTYPE_IPV4:
+            return None
+    elif linktype in (LINKTYPE_NULL, LINKTYPE_LOOP):
+        # 4-byte address family; host byte order for NULL, network for LOOP
+        if len(frame) < 4 or socket.AF_INET not in (frame[0], frame[3]):
+            return None
+        ip = 4
+    elif linktype == LINKTYPE_LINUX_SLL:
+        if len(frame) < 16 or struct.unpack_from("!H", frame, 14)[0] != _ETHERTYPE_IPV4:
+            return None
+        ip = 16
+    elif linktype in (LINKTYPE_RAW, LINKTYPE_IPV4):
+        ip = 0
+    else:
+        return None
+
+    if len(frame) < ip + 20 or frame[ip] >> 4 != 4 or frame[ip + 9] != _IPPROTO_UDP:
+        return None
+    if struct.unpack_from("!H", frame, ip + 6)[0] & 0x3FFF:
+        return None  # fragment
+    ihl = (frame[ip] & 0x0F) * 4
+    total_len = struct.unpack_from("!H", frame, ip + 2)[0]
+    udp = ip + ihl
+    if len(frame) < udp + 8:
+        return None
+    sport, dport, udp_len = struct.unpack_from("!HHH", frame, udp)
+    if udp_port is not None and udp_port not in (sport, dport):
+        return None
+    payload_end = min(len(frame), ip + total_len, udp + udp_len)
+    src = socket.inet_ntoa(frame[ip + 12:ip + 16])
+    dst = socket.inet_ntoa(frame[ip + 16:ip + 20])
+    return src, dst, frame[udp + 8:payload_end]
+
+
+def write_pcap(path, datagrams, src=("127.0.0.1", 40000), dst=("127.0.0.1", 5555)):
+    """Write ``(time, payload)`` pairs as IPv4 UDP packets to a raw-IP pcap file.
+
+    Used to build reproducible captures (e.g. the benchmark fixture) without
+    tshark; checksums are left zero.
+    """
+    src_ip, dst_ip = socket.inet_aton(src[0]), socket.inet_aton(dst[0])
+    with open(path, "wb") as f:
+        f.write(struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, LINKTYPE_RAW))
+        for ident, (when, payload) in enumerate(datagrams):
+            udp = struct.pack("!HHHH", src[1], dst[1], 8 + len(payload), 0) + payload
+            ip = struct.pack("!BBHHHBBH4s4s", 0x45, 0, 20 + len(udp), ident & 0xFFFF, 0x4000, 64,
+                             _IPPROTO_UDP, 0, src_ip, dst_ip)
+            sec, usec = divmod(int(round(when * 1e6)), 1000000)
+            f.write(struct.pack("<IIII", sec, usec, len(ip) + len(udp), len(ip) + len(udp)))
+            f.write(ip + udp)
@@ -0,0 +1,258 @@
+"""Pluggable arbitration policies.
+
+The engine's built-in modes (Fixed Priority, Round Robin, Daisy Chain) are
+implemented directly in ``arbiter``; every other policy is a class
+registered here under its display name, so the GUI mode combobox, the
+sweep runner and the headless paths pick it up automatically.
+
+A policy is created with the device count, the engine's RNG and optional
+per-device ``weights`` and must provide ``select(mask)`` returning the
+winning device index for a request bitmask (or None) plus ``reset()``.
+Like the built-in modes, the policies below work on the whole request
+bitmask with a bounded number of big-int operations per decision (O(1) or
+O(log n) of them), never with a loop over the devices.
+"""
+from abc import ABC, abstractmethod
+
+POLICIES = {}
+
+
+def register_policy(name):
+    """Class decorator adding a policy to the registry under ``name``"""
+    def decorator(cls):
+        cls.name = name
+        POLICIES[name] = cls
+        return cls
+    return decorator
+
+
+def _lowest(mask):
+    return (mask & -mask).bit_length() - 1
+
+
+# int.bit_count needs Python 3.10
+_popcount = getattr(int, "bit_count", None) or (lambda mask: bin(mask).count("1"))
+
+
+def _weights(weights, device_count):
+    if weights is None:
+        return [1] * device_count
+    weights = [int(w) for w in weights]
+    if len(weights) != device_count:
+        raise ValueError("one weight per device is required")
+    if any(w < 1 for w in weights):
+        raise ValueError("weights must be positive integers")
+    return weights
+
+
+class Policy(ABC):
+    def __init__(self, device_count, rng, weights=None):
+        self.device_count = device_count
+        self.rng = rng
+        self.weights = _weights(weights, device_count)
+        self.reset()
+
+    def reset(self):
+        pass
+
+    @abstractmethod
+    def select(self, mask):
+        """Winning device index for a request bitmask, or None"""
+
+
+@register_policy("Weighted Round Robin")
+class WeightedRoundRobin(Policy):
+    """Round robin in which device i may take up to ``weights[i]`` grants per turn.
+
+    A turn ends early when its device stops requesting, so idle devices
+    don't waste bus cycles.
+    """
+
+    def reset(self):
+        self.current = self.device_count - 1
+        self.credit = 0
+
+    def select(self, mask):
+        if not mask:
+            return None
+        current = self.current
+        if self.credit and mask >> current & 1:
+            self.credit -= 1
+            return current
+        start = (current + 1) % self.device_count
+        high = mask >> start << start
+        winner = _lowest(high or mask)
+        self.current = winner
+        self.credit = self.weights[winner] - 1
+        return winner
+
+
+class _BitPlanes:
+    """Small unsigned values for every device, stored bit-sliced.
+
+    ``planes[j]`` is the bitmask of devices whose value has bit j set, so a
+    comparison or decrement over any set of devices is one big-int operation
+    per plane.
+    """
+
+    def __init__(self, values, bits):
+        self.planes = [0] * bits
+        for i, value in enumerate(values):
+            for j in range(bits):
+                if value >> j & 1:
+                    self.planes[j] |= 1 << i
+
+    def value(self, device):
+        return sum(1 << j for j, plane in enumerate(self.planes) if plane >> device & 1)
+
+    def set(self, device, value):
+        bit = 1 << device
+        planes = self.planes
+        for j in range(len(planes)):
+            if value >> j & 1:
+                planes[j] |= bit
+            else:
+                planes[j] &= ~bit
+
+    def minimum(self, mask):
+        """Subset of ``mask`` holding the smallest value"""
+        for plane in reversed(self.planes):
+            low = mask & ~plane
+            if low:
+                mask = low
+        return mask
+
+    def greater(self, mask, value):
+        """Subset of ``mask`` whose value is greater than ``value``"""
+        above = 0
+        equal = mask
+        for j in reversed(range(len(self.planes))):
+            plane = self.planes[j]
+            if value >> j & 1:
+                equal &= plane
+            else:
+                above |= equal & plane
+                equal &= ~plane
+        return above
+
+    def decrement(self, mask):
+        """Subtract one from every device in ``mask`` (values must be > 0)"""
+        borrow = mask
+        planes = self.planes
+        for j in range(len(planes)):
+            if not borrow:
+                break
+            plane = planes[j]
+            planes[j] = plane ^ borrow
+            borrow &= ~plane
+
+    def total(self, mask):
+        """Sum of the values of the devices in ``mask``"""
+        return sum(_popcount(mask & plane) << j for j, plane in enumerate(self.planes))
+
+
+@register_policy("Least Recently Granted")
+class LeastRecentlyGranted(Policy):
+    """Grants the requester whose last grant is the oldest.
+
+    Each device has a recency rank (0 = least recently granted) kept in bit
+    planes: finding the oldest requester and moving the winner to the most
+    recent rank take O(log n) big-int operations.
+    """
+
+    def reset(self):
+        n = self.device_count
+        self._bits = max(1, (n - 1).bit_length())
+        self._full = (1 << n) - 1
+        # Initially lower indices count as less recently granted
+        self.ranks = _BitPlanes(range(n), self._bits)
+
+    def select(self, mask):
+        if not mask:
+            return None
+        ranks = self.ranks
+        winner = _lowest(ranks.minimum(mask))
+        rank = ranks.value(winner)
+        ranks.decrement(ranks.greater(self._full, rank))
+        ranks.set(winner, self.device_count - 1)
+        return winner
+
+
+@register_policy("TDMA")
+class TimeDivision(Policy):
+    """Time-division slot table, advanced by one slot per arbitration.
+
+    The default table gives device i ``weights[i]`` slots, spread evenly
+    over the frame. A slot whose owner is not requesting stays idle unless
+    ``reclaim`` is set, in which case the next requester after the owner
+    (in round-robin order) gets it.
+    """
+
+    def __init__(self, device_count, rng, weights=None, slots=None, reclaim=False):
+        self.reclaim = reclaim
+        super().__init__(device_count, rng, weights)
+        if slots is None:
+            slots = self.slot_table(self.weights)
+        slots = list(slots)
+        if not slots or any(s is not None and not 0 <= s < device_count for s in slots):
+            raise ValueError("slot table entries must be device indices or None")
+        self.slots = slots
+
+    @staticmethod
+    def slot_table(weights):
+        """Frame of sum(weights) slots, interleaved by smooth weighted round robin"""
+        if len(set(weights)) == 1:
+            return list(range(len(weights)))
+        total = sum(weights)
+        current = [0] * len(weights)
+        table = []
+        for _ in range(total):
+            for i, w in enumerate(weights):
+                current[i] += w
+            owner = max(range(len(weights)), key=current.__getitem__)
+            current[owner] -= total
+            table.append(owner)
+        return table
+
+    def reset(self):
+        self.slot = 0
+
+    def select(self, mask):
+        owner = self.slots[self.slot]
+        self.slot = (self.slot + 1) % len(self.slots)
+        if owner is not None and mask >> owner & 1:
+            return owner
+        if not self.reclaim or not mask:
+            return None
+        start = 0 if owner is None else (owner + 1) % self.device_count
+        high = mask >> start << start
+        return _lowest(high or mask)
+
+
+@register_policy("Lottery")
+class Lottery(Policy):
+    """Random grant among the requesters, weighted by tickets (``weights``).
+
+    Ticket counts are bit-sliced, so the requesters' ticket total and the
+    prefix sums of the binary search over device indices are popcounts:
+    O(log n * log max_tickets) big-int operations per draw.
+    """
+
+    def reset(self):
+        bits = max(self.weights).bit_length()
+        self.tickets = _BitPlanes(self.weights, bits)
+
+    def select(self, mask):
+        if not mask:
+            return None
+        tickets = self.tickets
+        draw = self.rng.randrange(tickets.total(mask))
+        # Smallest device index whose requesters' prefix holds more tickets than draw
+        lo, hi = 0, mask.bit_length() - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if tickets.total(mask & ((2 << mid) - 1)) > draw:
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
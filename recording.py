@@ -0,0 +1,196 @@
+"""Compact, append-only recordings of arbitration sessions.
+
+A recording is a small header (magic, version, device count, record size and
+JSON metadata such as mode and seed) followed by one fixed-size record per
+cycle: winner, bus holder and data as little-endian u16 (0xFFFF for none)
+and the request bitmask in ``ceil(device_count / 8)`` bytes. Cycle N lives
+at ``data_offset + N * record_size``, so a memory-mapped ``Recording`` jumps
+to any cycle of a multi-million-cycle run without reading what precedes it.
+A record cut short by a crash is simply not counted.
+
+Usage::
+
+    python recording.py info run.barec
+    python recording.py dump run.barec [--start N] [--count K] [--json]
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+
+from arbiter import CycleResult
+from workloads import Workload
+
+MAGIC = b"BARC"
+VERSION = 1
+NONE = 0xFFFF
+
+HEADER = struct.Struct("<4sHHHH")  # magic, version, device_count, record_size, metadata length
+FIELDS = struct.Struct("<HHH")  # winner, holder, data
+
+
+def _u16(value):
+    return NONE if value is None else value
+
+
+def _value(raw):
+    return None if raw == NONE else raw
+
+
+class RecordingWriter:
+    """Appends CycleResults to a new recording file"""
+
+    def __init__(self, path, device_count, metadata=None):
+        self.path = path
+        self.device_count = device_count
+        self.mask_bytes = (device_count + 7) // 8
+        self.record_size = FIELDS.size + self.mask_bytes
+        meta = json.dumps(dict(metadata or {}, device_count=device_count)).encode("utf-8")
+        # Records start 8-byte aligned
+        meta += b" " * (-(HEADER.size + len(meta)) % 8)
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, VERSION, device_count, self.record_size, len(meta)))
+        self._file.write(meta)
+        self.cycles = 0
+
+    def append(self, result):
+        self._file.write(
+            FIELDS.pack(_u16(result.winner), _u16(result.holder), _u16(result.data))
+            + result.requests.to_bytes(self.mask_bytes, "little")
+        )
+        self.cycles += 1
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+class Recording:
+    """Read-only, memory-mapped view of a recording; index it by cycle"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            size = os.fstat(self._file.fileno()).st_size
+            header = self._file.read(HEADER.size)
+            if len(header) < HEADER.size:
+                raise ValueError(f"{path}: not a bus arbitration recording")
+            magic, version, device_count, record_size, meta_len = HEADER.unpack(header)
+            if magic != MAGIC:
+                raise ValueError(f"{path}: not a bus arbitration recording")
+            if version != VERSION:
+                raise ValueError(f"{path}: unsupported recording version {version}")
+            self.metadata = json.loads(self._file.read(meta_len).decode("utf-8") or "{}")
+            self.device_count = device_count
+            self.record_size = record_size
+            self.data_offset = HEADER.size + meta_len
+            self.cycles = max(0, size - self.data_offset) // record_size
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        except Exception:
+            self._file.close()
+            raise
+
+    def __len__(self):
+        return self.cycles
+
+    def __getitem__(self, cycle):
+        if cycle < 0:
+            cycle += self.cycles
+        if not 0 <= cycle < self.cycles:
+            raise IndexError("cycle out of range")
+        offset = self.data_offset + cycle * self.record_size
+        winner, holder, data = FIELDS.unpack_from(self._map, offset)
+        requests = int.from_bytes(self._map[offset + FIELDS.size:offset + self.record_size], "little")
+        return CycleResult(cycle, requests, _value(winner), _value(data), _value(holder))
+
+    def results(self, start=0):
+        """CycleResults from cycle ``start`` to the end"""
+        for cycle in range(start, self.cycles):
+            yield self[cycle]
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+
+class RecordedRequests(Workload):
+    """Workload replaying the request masks of a recording.
+
+    Feeds recorded traffic through any mode or policy; to reproduce the
+    recorded grants themselves, replay ``Recording.results()`` instead.
+    """
+
+    def __init__(self, recording, start=0):
+        super().__init__(recording.device_count)
+        self.recording = recording
+        self.position = start
+
+    def block(self, cycles):
+        rec = self.recording
+        end = min(rec.cycles, self.position + cycles)
+        size, base, width = rec.record_size, rec.data_offset + FIELDS.size, rec.record_size - FIELDS.size
+        buf = rec._map
+        out = [
+            int.from_bytes(buf[base + c * size:base + c * size + width], "little")
+            for c in range(self.position, end)
+        ]
+        self.position = end
+        return out
+
+
+def _result_dict(result):
+    return {
+        "cycle": result.cycle,
+        "requests": [i + 1 for i in range(result.requests.bit_length()) if result.requests >> i & 1],
+        "winner": None if result.winner is None else result.winner + 1,
+        "holder": None if result.holder is None else result.holder + 1,
+        "data": result.data,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect a bus arbitration recording")
+    sub = parser.add_subparsers(dest="command", required=True)
+    info = sub.add_parser("info", help="print the header and cycle count")
+    info.add_argument("recording")
+    dump = sub.add_parser("dump", help="print cycles (devices are 1-based)")
+    dump.add_argument("recording")
+    dump.add_argument("--start", type=int, default=0, help="first cycle")
+    dump.add_argument("--count", type=int, default=20, help="number of cycles")
+    dump.add_argument("--json", action="store_true", help="one JSON object per line")
+    args = parser.parse_args(argv)
+
+    try:
+        rec = Recording(args.recording)
+    except (OSError, ValueError) as exc:
+        parser.error(str(exc))
+    try:
+        if args.command == "info":
+            json.dump(dict(rec.metadata, cycles=len(rec), record_size=rec.record_size),
+                      sys.stdout, indent=2)
+            sys.stdout.write("\n")
+            return
+        end = min(len(rec), args.start + args.count)
+        for cycle in range(args.start, end):
+            row = _result_dict(rec[cycle])
+            if args.json:
+                sys.stdout.write(json.dumps(row) + "\n")
+            else:
+                grant = f"Device {row['winner']}" if row["winner"] else (
+                    f"held by Device {row['holder']}" if row["holder"] else "idle")
+                requests = ",".join(map(str, row["requests"])) or "-"
+                data = "" if row["data"] is None else f" data={row['data']}"
+                sys.stdout.write(f"{cycle}: requests={requests} {grant}{data}\n")
+    finally:
+        rec.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Frame-driven packet animation for the simulator canvas.
+
+Instead of creating canvas items per grant and scheduling a chain of
+``after`` callbacks per packet, ``PacketRenderer`` owns a fixed pool of
+rectangle/text pairs and moves all packets in flight from a single
+``tick()`` called once per UI frame. Positions are computed from elapsed
+time, so a frame that is skipped or cut short by the budget only makes the
+motion coarser; packets still land on time.
+"""
+import time
+
+
+class PacketRenderer:
+    """Animates data packets from a device up to the bus with pooled items.
+
+    ``budget_ms`` bounds the time one tick may spend moving packets; when a
+    tick overruns it, the following frames are skipped to pay the time back.
+    """
+
+    def __init__(self, canvas, pool_size=32, duration=1.0, budget_ms=8.0):
+        self.canvas = canvas
+        self.pool_size = pool_size
+        self.duration = duration
+        self.budget = budget_ms / 1000.0
+        self.recycled = 0  # packets cut short because the pool was full
+        self.skipped_frames = 0
+        self.last_tick_ms = 0.0
+        self._skip = 0
+        self.rebuild()
+
+    def rebuild(self):
+        """(Re)create the item pool, e.g. after the canvas was cleared"""
+        self._free = []
+        self._active = []  # [rect, text, x, y_start, y_end, start_time], oldest first
+        self._cursor = 0  # where a tick cut short by the budget resumes
+        for _ in range(self.pool_size):
+            rect = self.canvas.create_rectangle(0, 0, 0, 0, fill="#3182bd", state="hidden",
+                                                tags=("packet",))
+            text = self.canvas.create_text(0, 0, fill="white", font=("Arial", 10, "bold"),
+                                           state="hidden", tags=("packet",))
+            self._free.append((rect, text))
+
+    def launch(self, x, y_start, y_end, label):
+        """Start a packet at (x, y_start) travelling to y_end"""
+        if self._free:
+            rect, text = self._free.pop()
+        else:
+            # Pool exhausted: reuse the longest-running packet
+            rect, text = self._active.pop(0)[:2]
+            if self._cursor:
+                self._cursor -= 1
+            self.recycled += 1
+        self.canvas.itemconfig(text, text=label, state="normal")
+        self.canvas.itemconfig(rect, state="normal")
+        self.canvas.tag_raise(rect)
+        self.canvas.tag_raise(text)
+        self._place(rect, text, x, y_start)
+        self._active.append([rect, text, x, y_start, y_end, time.monotonic()])
+
+    def tick(self, now=None):
+        """Advance every packet in flight; call once per frame"""
+        if not self._active:
+            return
+        if self._skip:
+            self._skip -= 1
+            self.skipped_frames += 1
+            return
+        start = time.perf_counter()
+        if now is None:
+            now = time.monotonic()
+        canvas = self.canvas
+        active = self._active
+        count = len(active)
+        # Resume where the previous tick ran out of time, wrapping around
+        resume = self._cursor if self._cursor < count else 0
+        landed = 0
+        stop = None
+        for k in range(count):
+            i = (resume + k) % count
+            rect, text, x, y_start, y_end, began = active[i]
+            progress = (now - began) / self.duration
+            if progress >= 1.0:
+                canvas.itemconfig(rect, state="hidden")
+                canvas.itemconfig(text, state="hidden")
+                self._free.append((rect, text))
+                active[i] = None
+                landed += 1
+            else:
+                self._place(rect, text, x, y_start + (y_end - y_start) * progress)
+            if time.perf_counter() - start > self.budget:
+                # Out of time: the rest keep their position and go first next frame
+                stop = (i + 1) % count
+                break
+        if landed:
+            if stop is not None:
+                stop -= sum(1 for packet in active[:stop] if packet is None)
+            active[:] = [packet for packet in active if packet is not None]
+        self._cursor = stop or 0
+        elapsed = time.perf_counter() - start
+        self.last_tick_ms = elapsed * 1000.0
+        if elapsed > self.budget:
+            self._skip = int(elapsed / self.budget)
+
+    def clear(self):
+        """Hide all packets in flight"""
+        for packet in self._active:
+            self.canvas.itemconfig(packet[0], state="hidden")
+            self.canvas.itemconfig(packet[1], state="hidden")
+            self._free.append((packet[0], packet[1]))
+        self._active = []
+        self._cursor = 0
+
+    @property
+    def in_flight(self):
+        return len(self._active)
+
+    def _place(self, rect, text, x, y):
+        # y is the bottom edge of the packet, like the device box top it starts at
+        self.canvas.coords(rect, x - 10, y - 20, x + 10, y)
+        self.canvas.coords(text, x, y - 10)
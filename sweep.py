@@ -0,0 +1,145 @@
+"""Parameter sweeps over arbitration modes, device counts and request rates.
+
+Every point of the grid (mode, device_count, request probability, cycles,
+seed, burst length) is an independent headless ArbiterEngine run, so the grid is spread
+over a process pool and the per-run fairness/throughput figures are merged
+into one table. A point's result depends only on its parameters (the engine
+RNG is seeded from the point), so a sweep is reproducible whatever the
+number of workers.
+
+Usage::
+
+    python sweep.py --devices 4 16 64 --probability 0.1 0.5 0.9 \\
+        --cycles 200000 --seeds 1 2 3 [--burst 1 4] [--workers N] [--json | --csv]
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from arbiter import ArbiterEngine, MODES, available_modes
+
+SweepPoint = namedtuple(
+    "SweepPoint", ["mode", "device_count", "probability", "cycles", "seed", "burst_length"],
+    defaults=(1,),
+)
+
+COLUMNS = (
+    "mode", "device_count", "probability", "cycles", "seed", "burst_length",
+    "utilisation", "jain_index", "wait_p50", "wait_p99", "max_starvation",
+    "grants_per_cycle", "cycles_per_s",
+)
+
+
+def sweep_grid(modes, device_counts, probabilities, cycles, seeds, burst_lengths=(1,)):
+    """All SweepPoints of the cartesian product, in a stable order"""
+    return [
+        SweepPoint(mode, n, p, cycles, seed, burst)
+        for mode, n, p, burst, seed in itertools.product(
+            modes, device_counts, probabilities, burst_lengths, seeds
+        )
+    ]
+
+
+def run_point(point):
+    """Run one grid point and return its result row (a dict keyed by COLUMNS)"""
+    engine = ArbiterEngine(point.device_count, point.mode, seed=point.seed, track_metrics=True,
+                           burst_length=point.burst_length)
+    start = time.perf_counter()
+    engine.run(point.cycles, point.probability)
+    elapsed = time.perf_counter() - start
+    m = engine.metrics.snapshot()
+    granted = sum(engine.grant_counts)
+    return {
+        "mode": point.mode,
+        "device_count": point.device_count,
+        "probability": point.probability,
+        "cycles": point.cycles,
+        "seed": point.seed,
+        "burst_length": point.burst_length,
+        "utilisation": m["utilisation"],
+        "jain_index": m["jain_index"],
+        "wait_p50": m["wait_p50"],
+        "wait_p99": m["wait_p99"],
+        "max_starvation": max(m["max_starvation"]),
+        "grants_per_cycle": granted / point.cycles if point.cycles else 0.0,
+        # Wall-clock speed is the only column that is not reproducible
+        "cycles_per_s": point.cycles / elapsed if elapsed > 0 else None,
+    }
+
+
+def run_sweep(points, workers=None):
+    """Result rows for ``points`` (same order), run on ``workers`` processes.
+
+    ``workers=1`` runs in-process, which is handy for debugging.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(points)))
+    if workers == 1:
+        return [run_point(p) for p in points]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Small chunks keep the load balanced when point costs differ a lot
+        chunksize = max(1, len(points) // (workers * 4))
+        return list(pool.map(run_point, points, chunksize=chunksize))
+
+
+def format_table(rows):
+    def cell(value):
+        if value is None:
+            return "-"
+        if isinstance(value, float):
+            return f"{value:.0f}" if abs(value) >= 1000 else f"{value:.3f}"
+        return str(value)
+
+    table = [list(COLUMNS)] + [[cell(row[c]) for c in COLUMNS] for row in rows]
+    widths = [max(len(r[i]) for r in table) for i in range(len(COLUMNS))]
+    lines = ["  ".join(v.ljust(w) for v, w in zip(r, widths)).rstrip() for r in table]
+    return "\n".join(lines) + "\n"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep arbitration parameters across CPU cores")
+    parser.add_argument("--modes", nargs="+", choices=available_modes(), default=list(MODES),
+                        help="modes or registered policies (default: the built-in modes)")
+    parser.add_argument("--devices", nargs="+", type=int, default=[4], help="device counts")
+    parser.add_argument("--probability", nargs="+", type=float, default=[0.5],
+                        help="per-device request probabilities per cycle")
+    parser.add_argument("--cycles", type=int, default=100000, help="cycles per run")
+    parser.add_argument("--seeds", nargs="+", type=int, default=[0])
+    parser.add_argument("--burst", nargs="+", type=int, default=[1],
+                        help="transaction lengths in cycles (bus held after each grant)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    out = parser.add_mutually_exclusive_group()
+    out.add_argument("--json", action="store_true", help="print rows as a JSON list")
+    out.add_argument("--csv", action="store_true", help="print rows as CSV")
+    args = parser.parse_args(argv)
+
+    for p in args.probability:
+        if not 0.0 <= p <= 1.0:
+            parser.error(f"request probability {p} is not between 0 and 1")
+    points = sweep_grid(args.modes, args.devices, args.probability, args.cycles, args.seeds,
+                        args.burst)
+    try:
+        rows = run_sweep(points, args.workers)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    if args.json:
+        json.dump(rows, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    elif args.csv:
+        writer = csv.DictWriter(sys.stdout, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    else:
+        sys.stdout.write(format_table(rows))
+
+
+if __name__ == "__main__":
+    main()
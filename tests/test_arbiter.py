@@ -0,0 +1,97 @@
+import random
+
+import pytest
+
+from arbiter import (
+    DAISY_CHAIN, FIXED_PRIORITY, MODES, ROUND_ROBIN, ArbiterEngine, mask_to_requests,
+)
+
+DEVICE_COUNTS = (1, 3, 8, 12, 13, 40)
+
+
+def _masks(devices, count, seed):
+    rng = random.Random(seed)
+    return [rng.getrandbits(devices) for _ in range(count)]
+
+
+def _counters(engine):
+    return engine.cycle, list(engine.grant_counts), engine.idle_cycles, engine.next_index
+
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("devices", DEVICE_COUNTS)
+def test_run_masks_matches_step(mode, devices):
+    masks = _masks(devices, 2000, devices)
+    stepped = ArbiterEngine(devices, mode, seed=1)
+    for mask in masks:
+        stepped.step(mask)
+    batched = ArbiterEngine(devices, mode, seed=1)
+    assert batched.run_masks(masks) == len(masks)
+    assert _counters(batched) == _counters(stepped)
+
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("burst", (3, 8))
+def test_run_masks_matches_step_with_bursts(mode, burst):
+    # A fixed burst length draws nothing from the rng, so step()'s data bytes
+    # don't change the outcome
+    masks = _masks(4, 3000, burst)
+    stepped = ArbiterEngine(4, mode, seed=3, track_metrics=True, burst_length=burst)
+    for mask in masks:
+        stepped.step(mask)
+    batched = ArbiterEngine(4, mode, seed=3, track_metrics=True, burst_length=burst)
+    assert batched.run_masks(masks) == len(masks)
+    assert _counters(batched) == _counters(stepped)
+    assert (batched.busy_cycles, batched.pending, batched.holder) == \
+        (stepped.busy_cycles, stepped.pending, stepped.holder)
+    assert batched.metrics.snapshot() == stepped.metrics.snapshot()
+
+
+def test_step_accepts_flags_and_masks():
+    engine = ArbiterEngine(4, FIXED_PRIORITY)
+    assert engine.step([False, True, True, False]).winner == 1
+    assert engine.step(0b1100).winner == 2
+    assert engine.step(0).winner is None
+    assert mask_to_requests(0b1010, 4) == [False, True, False, True]
+
+
+@pytest.mark.parametrize("mode, winners", [
+    (FIXED_PRIORITY, [0, 0, 0]),
+    (DAISY_CHAIN, [3, 3, 3]),
+    (ROUND_ROBIN, [0, 3, 0]),
+])
+def test_mode_semantics(mode, winners):
+    engine = ArbiterEngine(4, mode)
+    assert [engine.step(0b1001).winner for _ in winners] == winners
+
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("devices", DEVICE_COUNTS + (16, 17, 70))
+def test_arbitrate_batch_matches_step(mode, devices):
+    np = pytest.importorskip("numpy")
+    from batch_arbiter import arbitrate_batch
+
+    rng = np.random.default_rng(devices)
+    requests = rng.random((1500, devices)) < 0.3
+    engine = ArbiterEngine(devices, mode, seed=1)
+    expected = [engine.step(row.tolist()).winner for row in requests]
+
+    result = arbitrate_batch(requests, mode)
+    assert result.winners.tolist() == [-1 if w is None else w for w in expected]
+    assert result.grant_counts.tolist() == engine.grant_counts
+    assert result.next_index == (engine.next_index if mode == ROUND_ROBIN else 0)
+
+
+@pytest.mark.parametrize("devices", (5, 40))
+def test_run_batch_chains_round_robin_pointer(devices):
+    np = pytest.importorskip("numpy")
+
+    rng = np.random.default_rng(devices)
+    requests = rng.random((1000, devices)) < 0.5
+    stepped = ArbiterEngine(devices, ROUND_ROBIN)
+    for row in requests:
+        stepped.step(row.tolist())
+    batched = ArbiterEngine(devices, ROUND_ROBIN)
+    for start in range(0, len(requests), 333):
+        batched.run_batch(requests[start:start + 333])
+    assert _counters(batched) == _counters(stepped)
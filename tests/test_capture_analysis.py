@@ -0,0 +1,27 @@
+import pytest
+
+import wire
+from capture_analysis import CaptureAnalyzer
+
+
+def test_emit_to_capture_delay_per_device():
+    analyzer = CaptureAnalyzer()
+    # Emitted at 10.000000 s (device 0) and 10.000500 s (device 1), captured at 10.002 s
+    for device, timestamp in ((0, 10_000_000), (1, 10_000_500)):
+        analyzer.feed_event(wire.decode(wire.encode_binary("GRANT", device, None, device, timestamp)), 10.002)
+        analyzer.feed_event(wire.decode(wire.encode_binary("DATA", device, 7, device, timestamp)), 10.002)
+    devices = analyzer.summary()["devices"]
+    assert devices["Device 1"]["emit_to_capture_avg_s"] == pytest.approx(0.002)
+    assert devices["Device 2"]["emit_to_capture_max_s"] == pytest.approx(0.0015)
+    assert analyzer.cycles == 2 and analyzer.busy == 0
+
+
+def test_text_events_have_no_emission_time():
+    analyzer = CaptureAnalyzer()
+    analyzer.feed_event(wire.decode(wire.encode_text("GRANT", "Device 1")), 1.0)
+    analyzer.feed_event(wire.decode(wire.encode_text("DATA", "Device 1", 5)), 1.0)
+    analyzer.feed_event(wire.decode(wire.encode_text("DATA", "Device 1", 6)), 1.0)
+    summary = analyzer.summary()
+    assert summary["devices"]["Device 1"]["emit_to_capture_avg_s"] is None
+    # The second DATA beat is a held burst cycle
+    assert (summary["cycles"], summary["busy_cycles"]) == (2, 1)
@@ -0,0 +1,141 @@
+import csv
+import threading
+
+import pytest
+
+import export
+from arbiter import CycleResult
+from export import BLOCK, COLUMNS, DROP, SPILL, CycleExporter
+
+
+def _results(count, devices=4):
+    return [CycleResult(c, (c * 7) % (1 << devices), None if c % 5 == 4 else c % devices,
+                        None if c % 5 == 4 else c & 0xFF, None if c % 5 == 4 else c % devices)
+            for c in range(count)]
+
+
+def _read_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == list(COLUMNS)
+    return rows[1:]
+
+
+@pytest.fixture
+def csv_only(monkeypatch):
+    monkeypatch.setattr(export, "HAVE_PYARROW", False)
+
+
+class _SlowWriter:
+    """Holds the writer thread in its first chunk until released"""
+
+    def __init__(self, monkeypatch):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        write = CycleExporter._write_csv
+
+        def slow(exporter, chunk):
+            self.started.set()
+            self.release.wait(10)
+            write(exporter, chunk)
+
+        monkeypatch.setattr(CycleExporter, "_write_csv", slow)
+
+
+def test_chunks_flush_in_order_to_csv(tmp_path, csv_only):
+    exporter = CycleExporter(str(tmp_path / "run.parquet"), 4, chunk_rows=3)
+    assert exporter.path.endswith("run.csv") and exporter.format == "csv"
+    results = _results(10)
+    for r in results:
+        exporter.append(r, 1.5)
+    assert exporter.rows == 9  # three full chunks; the last row waits for close()
+    exporter.close()
+    assert exporter.stats()["rows"] == 10
+    rows = _read_csv(exporter.path)
+    assert [int(row[0]) for row in rows] == list(range(10))
+    assert rows[4] == ["4", "1.5", repr(4 * export.CYCLE_PERIOD), "12", "-1", "-1", "-1"]
+    assert rows[6][3:] == ["10", "2", "2", "6"]
+
+
+def test_wide_requests_are_hex_in_csv(tmp_path, csv_only):
+    exporter = CycleExporter(str(tmp_path / "wide.csv"), 100, chunk_rows=2)
+    exporter.append(CycleResult(0, 1 << 99 | 1, 0, 9, 0))
+    exporter.close()
+    assert _read_csv(exporter.path)[0][3] == hex(1 << 99 | 1)
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".arrow"])
+def test_columnar_writers(tmp_path, suffix):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    exporter = CycleExporter(str(tmp_path / f"run{suffix}"), 4, chunk_rows=4)
+    for r in _results(10):
+        exporter.append(r, 2.0)
+    exporter.close()
+    if suffix == ".parquet":
+        table = pa.parquet.read_table(exporter.path)
+    else:
+        table = pa.ipc.open_file(exporter.path).read_all()
+    assert table.column_names == list(COLUMNS)
+    assert table.column("cycle").to_pylist() == list(range(10))
+    assert table.column("winner").to_pylist()[:5] == [0, 1, 2, 3, -1]
+
+
+def test_spill_keeps_every_cycle_without_blocking(tmp_path, csv_only, monkeypatch):
+    slow = _SlowWriter(monkeypatch)
+    exporter = CycleExporter(str(tmp_path / "run.csv"), 4, chunk_rows=2, max_pending=1, overflow=SPILL)
+    results = _results(20)
+    exporter.append(results[0])
+    exporter.append(results[1])
+    assert slow.started.wait(5)
+    # The writer is stuck: one chunk waits in memory, the rest go to the spill file
+    for r in results[2:]:
+        exporter.append(r)
+    assert exporter.spilled_chunks == 8 and exporter.dropped_rows == 0
+    slow.release.set()
+    exporter.close()
+    assert exporter.stats()["spilled_rows"] == 16
+    assert [int(row[0]) for row in _read_csv(exporter.path)] == list(range(20))
+
+
+def test_drop_discards_and_counts_chunks(tmp_path, csv_only, monkeypatch):
+    slow = _SlowWriter(monkeypatch)
+    exporter = CycleExporter(str(tmp_path / "run.csv"), 4, chunk_rows=2, max_pending=1, overflow=DROP)
+    results = _results(10)
+    exporter.append(results[0])
+    exporter.append(results[1])
+    assert slow.started.wait(5)
+    for r in results[2:]:
+        exporter.append(r)
+    assert (exporter.dropped_chunks, exporter.dropped_rows) == (3, 6)
+    slow.release.set()
+    exporter.close()
+    assert exporter.stats()["rows"] == 4
+    assert [int(row[0]) for row in _read_csv(exporter.path)] == [0, 1, 2, 3]
+
+
+def test_block_waits_for_the_writer(tmp_path, csv_only, monkeypatch):
+    slow = _SlowWriter(monkeypatch)
+    exporter = CycleExporter(str(tmp_path / "run.csv"), 4, chunk_rows=2, max_pending=1, overflow=BLOCK)
+    results = _results(6)
+
+    def feed():
+        for r in results:
+            exporter.append(r)
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+    assert slow.started.wait(5)
+    feeder.join(0.2)
+    assert feeder.is_alive()  # the third chunk has no room
+    slow.release.set()
+    feeder.join(5)
+    exporter.close()
+    assert [int(row[0]) for row in _read_csv(exporter.path)] == list(range(6))
+
+
+def test_unknown_overflow_policy(tmp_path):
+    with pytest.raises(ValueError):
+        CycleExporter(str(tmp_path / "run.csv"), 4, overflow="wait")
@@ -0,0 +1,80 @@
+import random
+
+import pytest
+
+from log_buffer import LogBuffer
+
+
+def _line_count(messages):
+    return sum(m.count("\n") + (not m.endswith("\n")) for m in messages)
+
+
+def test_single_line_messages_wrap_around():
+    buf = LogBuffer(max_lines=3)
+    for i in range(5):
+        buf.append(f"m{i}\n")
+    assert buf.lines() == ["m2\n", "m3\n", "m4\n"]
+    assert buf.total == 5
+
+
+@pytest.mark.parametrize("msg, lines", [("a\n", 1), ("a", 1), ("a\nb", 2), ("a\nb\n", 2), ("", 1)])
+def test_lines_are_counted_with_or_without_trailing_newline(msg, lines):
+    buf = LogBuffer(max_lines=3)
+    buf.append(msg)
+    for _ in range(3 - lines):
+        buf.append("x\n")
+    assert buf.lines()[0] == msg
+    # One more line evicts the first message, whatever its ending
+    buf.append("y\n")
+    assert msg not in buf.lines()
+
+
+def test_trim_matches_reference():
+    rng = random.Random(5)
+    buf = LogBuffer(max_lines=20)
+    reference = []
+    for _ in range(3000):
+        lines = rng.choice((1, 1, 1, 2, 5, 19, 20))
+        msg = "\n".join(f"l{i}" for i in range(lines)) + rng.choice(("\n", ""))
+        buf.append(msg)
+        reference.append(msg)
+        while _line_count(reference) > 20:
+            reference.pop(0)
+        assert buf.lines() == reference
+
+
+def test_message_longer_than_history_keeps_its_tail(tmp_path):
+    spill = tmp_path / "full.log"
+    buf = LogBuffer(max_lines=3, spill_path=str(spill))
+    buf.append("old\n")
+    buf.append("1\n2\n3\n4\n5\n")
+    buf.append("a\nb\nc\nd")
+    assert buf.lines() == ["b\nc\nd"]
+    buf.close()
+    assert spill.read_text(encoding="utf-8") == "old\n1\n2\n3\n4\n5\na\nb\nc\nd"
+
+
+def test_take_pending_returns_new_messages_once():
+    buf = LogBuffer(max_lines=10)
+    assert buf.take_pending() == ""
+    buf.append("a\n")
+    buf.append("b\n")
+    assert buf.take_pending() == "a\nb\n"
+    assert buf.take_pending() == ""
+    buf.append("c\n")
+    assert buf.take_pending() == "c\n"
+
+
+def test_take_pending_notes_skipped_messages(tmp_path):
+    buf = LogBuffer(max_lines=3)
+    for i in range(7):
+        buf.append(f"m{i}\n")
+    assert buf.take_pending() == "[... 4 log messages not shown]\nm4\nm5\nm6\n"
+
+    buf.set_spill(str(tmp_path / "full.log"))
+    for i in range(5):
+        buf.append(f"n{i}\n")
+    text = buf.take_pending()
+    assert text.startswith(f"[... 2 log messages not shown; see {tmp_path / 'full.log'}]\n")
+    assert text.endswith("n2\nn3\nn4\n")
+    buf.close()
@@ -0,0 +1,125 @@
+import math
+import random
+
+import pytest
+
+from metrics import EXACT_WAITS, ArbitrationMetrics, WaitHistogram
+
+
+class BruteForceMetrics:
+    """Straightforward per-device bookkeeping of the same definitions"""
+
+    def __init__(self, n):
+        self.n = n
+        self.cycles = self.busy = 0
+        self.grants = [0] * n
+        self.since = [None] * n  # cycle of the outstanding request, latched until granted
+        self.waits = []
+        self.per_device = [[] for _ in range(n)]
+
+    def record(self, mask, winner):
+        for i in range(self.n):
+            if mask >> i & 1 and self.since[i] is None:
+                self.since[i] = self.cycles
+        if winner is not None:
+            wait = self.cycles - self.since[winner]
+            self.waits.append(wait)
+            self.per_device[winner].append(wait)
+            self.since[winner] = None
+            self.grants[winner] += 1
+            self.busy += 1
+        self.cycles += 1
+
+    def starvation(self):
+        return [max(waits + ([self.cycles - since] if since is not None else []), default=0)
+                for waits, since in zip(self.per_device, self.since)]
+
+    def percentile(self, p):
+        # Nearest rank
+        return sorted(self.waits)[max(1, math.ceil(p * len(self.waits))) - 1]
+
+
+@pytest.mark.parametrize("devices, probability", [(1, 0.5), (5, 0.1), (8, 0.6), (70, 0.02)])
+def test_matches_brute_force(devices, probability):
+    rng = random.Random(devices)
+    metrics, reference = ArbitrationMetrics(devices), BruteForceMetrics(devices)
+    for _ in range(3000):
+        mask = sum(1 << i for i in range(devices) if rng.random() < probability)
+        # Any requester, or none even when some are requesting
+        requesters = [i for i in range(devices) if mask >> i & 1]
+        winner = rng.choice(requesters) if requesters and rng.random() < 0.8 else None
+        metrics.record_mask(mask, winner)
+        reference.record(mask, winner)
+
+    snap = metrics.snapshot()
+    assert snap["cycles"] == reference.cycles
+    assert snap["grant_counts"] == reference.grants
+    assert snap["utilisation"] == pytest.approx(reference.busy / reference.cycles)
+    assert snap["max_starvation"] == reference.starvation()
+    assert snap["mean_wait"] == [pytest.approx(sum(w) / len(w)) if w else None
+                                 for w in reference.per_device]
+    assert snap["wait_p50"] == reference.percentile(0.5)
+    assert snap["wait_p99"] == reference.percentile(0.99)
+
+
+def test_request_is_latched_until_granted():
+    m = ArbitrationMetrics(2)
+    m.record_mask(0b10, None)  # device 1 raises its request at cycle 0
+    m.record_mask(0b00, None)  # and drops it: still outstanding
+    assert m.current_starvation() == [0, 2]
+    m.record_mask(0b10, 1)  # granted at cycle 2: waited since cycle 0
+    assert m.wait_totals == [0, 2]
+    # Holding the line after the grant is a new request from the next cycle
+    m.record_mask(0b10, None)
+    m.record_mask(0b10, 1)
+    assert m.wait_totals == [0, 3] and m.max_starvation == [0, 2]
+
+
+def test_hold_cycles_start_waits_at_their_own_cycle():
+    m = ArbitrationMetrics(2)
+    m.record_mask(0b01, 0)
+    m.record_hold(0b00)
+    m.record_hold(0b10)  # device 1 first requests at cycle 2
+    m.record_mask(0b10, 1)
+    assert m.wait_totals == [0, 1]
+    assert (m.cycles, m.busy_cycles) == (4, 4)
+
+
+def test_histogram_exact_below_limit():
+    h = WaitHistogram()
+    assert h.percentile(0.5) is None
+    for wait in range(1, 101):
+        h.add(wait)
+    assert h.percentile(0.5) == 50
+    assert h.percentile(0.99) == 99
+    assert h.percentile(1.0) == 100
+    h.add(EXACT_WAITS - 1)
+    assert h.percentile(1.0) == EXACT_WAITS - 1
+
+
+def test_histogram_buckets_long_waits():
+    h = WaitHistogram()
+    for wait in (1, 2, 3, 3000, 5000, 70000):
+        h.add(wait)
+    assert h.percentile(0.5) == 3
+    # 3000 and 5000 fall in [2048, 4096) and [4096, 8192): upper bucket edges
+    assert h.percentile(4 / 6) == 4095
+    assert h.percentile(5 / 6) == 8191
+    # The last bucket is capped at the longest wait seen
+    assert h.percentile(1.0) == 70000
+    assert h.max == 70000 and h.count == 6
+
+
+@pytest.mark.parametrize("grants, expected", [
+    ([], 1.0),
+    ([0, 0, 0, 0], 1.0),
+    ([0, 0, 0, 8], 0.25),
+    ([1, 1, 1, 1], 1.0),
+    ([1, 2, 3, 4], 100 / (4 * 30)),
+])
+def test_jain_index(grants, expected):
+    m = ArbitrationMetrics(4)
+    for device, count in enumerate(grants):
+        for _ in range(count):
+            m.record_mask(1 << device, device)
+    assert m.jain_index == pytest.approx(expected)
@@ -0,0 +1,121 @@
+import os
+import shutil
+import sys
+import threading
+
+import pytest
+
+from capture_analysis import analyze_file
+from pcap import read_packets
+from tshark_reader import FIELDS, InterfaceLister, TsharkFieldsReader, parse_line, tshark_command
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+PCAP = os.path.join(ROOT, "bench_data", "bus_events.pcap")
+
+# Stands in for ``tshark -r FILE -T fields``: prints the bundled capture in
+# tshark's field format and, like tshark, prints no packets with -q/-Q
+FAKE_TSHARK = f"""#!{sys.executable}
+import sys
+sys.path.insert(0, {ROOT!r})
+from pcap import read_packets
+args = sys.argv[1:]
+if "-D" in args:
+    print("1. lo (Loopback)")
+    print("2. eth0")
+    sys.exit(0)
+if "-q" in args or "-Q" in args:
+    sys.exit(0)
+path = args[args.index("-r") + 1]
+port = int(args[args.index("-Y") + 1].rsplit(" ", 1)[1])
+for pkt in read_packets(path, port):
+    sys.stdout.write("\\t".join([f"{{pkt.time:.9f}}", pkt.src, pkt.dst, str(pkt.length),
+                                pkt.payload.hex()]) + "\\n")
+"""
+
+
+@pytest.fixture
+def fake_tshark(tmp_path):
+    if sys.platform == "win32":
+        pytest.skip("the stand-in tshark is a POSIX script")
+    path = tmp_path / "tshark"
+    path.write_text(FAKE_TSHARK)
+    path.chmod(0o755)
+    return str(path)
+
+
+def test_command_prints_packets():
+    cmd = tshark_command("tshark", read_file="x.pcap")
+    # -q/-Q suppress the per-packet field lines the reader parses
+    assert "-Q" not in cmd and "-q" not in cmd
+    assert cmd.count("-e") == len(FIELDS)
+
+
+def test_parse_line():
+    line = "1700000000.000600000\t127.0.0.1\t127.0.0.2\t60\t42:55:53:5f\n"
+    pkt = parse_line(line)
+    assert pkt.time == pytest.approx(1700000000.0006)
+    assert (pkt.src, pkt.dst, pkt.length, pkt.payload) == ("127.0.0.1", "127.0.0.2", 60, b"BUS_")
+    assert parse_line("garbage\n") is None
+
+
+def test_reader_streams_bundled_capture(fake_tshark):
+    expected = list(read_packets(PCAP, 5555))
+    reader = TsharkFieldsReader(fake_tshark, read_file=PCAP)
+    packets = list(reader.packets())
+    assert reader.returncode == 0 and reader.malformed == 0
+    assert [p.payload for p in packets] == [p.payload for p in expected]
+    assert packets[0].time == pytest.approx(expected[0].time)
+
+
+def test_analyze_file_with_tshark(fake_tshark):
+    assert analyze_file(PCAP, tshark_path=fake_tshark).summary() == analyze_file(PCAP).summary()
+
+
+def _list_interfaces(lister, tshark, on_line):
+    done = threading.Event()
+    result = []
+
+    def on_done(lines, error):
+        result[:] = [lines, error]
+        done.set()
+
+    assert lister.start(tshark, on_line, on_done)
+    assert done.wait(10)
+    return result
+
+
+def test_interface_lister_caches_listing(fake_tshark):
+    lister = InterfaceLister()
+    seen = []
+    lines, error = _list_interfaces(lister, fake_tshark, seen.append)
+    assert error is None and lines == seen == ["1. lo (Loopback)", "2. eth0"]
+    assert lister.cached(fake_tshark) == lines and not lister.running
+
+
+def test_interface_lister_recovers_from_callback_error(fake_tshark):
+    lister = InterfaceLister()
+
+    def broken(line):
+        raise RuntimeError("window closed")
+
+    lines, error = _list_interfaces(lister, fake_tshark, broken)
+    assert error == "window closed" and lines == ["1. lo (Loopback)"]
+    assert not lister.running and lister.cached(fake_tshark) is None
+    # The next listing is not refused
+    lines, error = _list_interfaces(lister, fake_tshark, lambda line: None)
+    assert error is None and len(lines) == 2
+
+
+def test_interface_lister_reports_missing_tshark(tmp_path):
+    lister = InterfaceLister()
+    lines, error = _list_interfaces(lister, str(tmp_path / "no-tshark"), lambda line: None)
+    assert lines == [] and error and not lister.running
+
+
+@pytest.mark.skipif(shutil.which("tshark") is None, reason="tshark is not installed")
+def test_real_tshark_reads_bundled_capture():
+    reader = TsharkFieldsReader(shutil.which("tshark"), read_file=PCAP)
+    packets = list(reader.packets())
+    assert reader.returncode == 0, reader.error_text()
+    assert len(packets) == sum(1 for _ in read_packets(PCAP, 5555))
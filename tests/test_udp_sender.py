@@ -0,0 +1,29 @@
+import socket
+import time
+
+import wire
+from udp_sender import UDPEventSender
+
+
+def test_sender_stamps_emission_time_and_sequence():
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    receiver.settimeout(2.0)
+    sender = UDPEventSender(receiver.getsockname())
+    before = time.time_ns() // 1000
+    sender.submit(wire.encode_binary("GRANT", 0, None, 1))
+    sender.submit(wire.encode_binary("DATA", 0, 17, 1))
+    sender.start()
+    try:
+        assert sender.flush()
+        events = []
+        while len(events) < 2:
+            events += wire.decode_datagram(receiver.recv(65536))
+    finally:
+        sender.stop()
+        receiver.close()
+    after = time.time_ns() // 1000
+    assert [(e.event, e.device, e.data, e.cycle, e.seq) for e in events] == [
+        ("GRANT", 0, None, 1, 1), ("DATA", 0, 17, 1, 2)]
+    # Emission time is when the frame was submitted, on the wall clock
+    assert all(before - 1000 <= e.timestamp <= after + 1000 for e in events)
@@ -0,0 +1,67 @@
+import pytest
+
+import wire
+
+
+@pytest.mark.parametrize("event, name, device, data", [
+    ("GRANT", "Device 1", 0, None),
+    ("DATA", "Device 12", 11, 200),
+    ("IDLE", "NONE", None, None),
+])
+def test_text_round_trip(event, name, device, data):
+    decoded = wire.decode(wire.encode_text(event, name, data))
+    assert decoded == wire.BusEvent(event, device, data, None, None)
+
+    stamped = wire.decode(wire.stamp(wire.encode_text(event, name, data), 42, 123456789))
+    assert stamped == wire.BusEvent(event, device, data, None, None, 42, 123456789)
+
+
+@pytest.mark.parametrize("event, device, data", [
+    ("GRANT", 0, None),
+    ("DATA", 1023, 255),
+    ("IDLE", None, None),
+])
+def test_binary_round_trip(event, device, data):
+    payload = wire.encode_binary(event, device, data, cycle=7, timestamp=1700000000123456)
+    assert len(payload) == wire.FRAME_SIZE
+    assert wire.decode(payload) == wire.BusEvent(event, device, data, 7, 1700000000123456)
+
+    stamped = wire.stamp(payload, 2 ** 32 + 5, 987654321)
+    assert len(stamped) == wire.FRAME_SIZE
+    # The sequence number is 32 bits on the wire
+    assert wire.decode(stamped) == wire.BusEvent(event, device, data, 7, 1700000000123456,
+                                                 5, 987654321)
+
+
+@pytest.mark.parametrize("binary", [False, True])
+def test_datagram_round_trip(binary):
+    events = [("GRANT", 2, None), ("DATA", 2, 17), ("IDLE", None, None)]
+    if binary:
+        payloads = [wire.encode_binary(e, d, v, cycle=i, timestamp=i)
+                    for i, (e, d, v) in enumerate(events)]
+    else:
+        payloads = [wire.encode_text(e, "NONE" if d is None else f"Device {d + 1}", v)
+                    for e, d, v in events]
+    payloads = [wire.stamp(p, i + 1, 1000 + i) for i, p in enumerate(payloads)]
+    decoded = wire.decode_datagram(wire.join_payloads(payloads))
+    assert [(e.event, e.device, e.data, e.seq, e.sent_ns) for e in decoded] == [
+        (e, d, v, i + 1, 1000 + i) for i, (e, d, v) in enumerate(events)]
+
+
+@pytest.mark.parametrize("payload", [b"", b"hello", b"BA\x09\x01" + bytes(30)])
+def test_decode_rejects_garbage(payload):
+    with pytest.raises(ValueError):
+        wire.decode(payload)
+
+
+def test_stamp_fills_missing_emission_time():
+    payload = wire.encode_binary("DATA", 3, 9, cycle=5)
+    assert wire.decode(payload).timestamp is None
+    stamped = wire.decode(wire.stamp(payload, 1, 2, emitted_us=1700000000000001))
+    assert stamped == wire.BusEvent("DATA", 3, 9, 5, 1700000000000001, 1, 2)
+
+    # An explicit emission time is kept
+    payload = wire.encode_binary("DATA", 3, 9, cycle=5, timestamp=42)
+    assert wire.decode(wire.stamp(payload, 1, 2, emitted_us=99)).timestamp == 42
+    # Text payloads have nowhere to carry it
+    assert wire.stamp(b"BUS_EVENT IDLE DEVICE=NONE DATA=-", 1, 2, 99).endswith(b" SEQ=1 SENT=2")
@@ -0,0 +1,104 @@
+import pytest
+
+from arbiter import FIXED_PRIORITY, ROUND_ROBIN, ArbiterEngine
+from workloads import BernoulliWorkload, MarkovBurstWorkload, TraceWorkload, columns_to_masks
+
+CYCLES = 40000
+
+
+def _columns(masks, devices):
+    return [[m >> i & 1 for m in masks] for i in range(devices)]
+
+
+def _runs(column, value):
+    """Lengths of the runs of ``value``, leaving out the cut-off first and last"""
+    runs, length = [], 0
+    for bit in column:
+        if bit == value:
+            length += 1
+        elif length:
+            runs.append(length)
+            length = 0
+    return runs[1:]
+
+
+def test_columns_to_masks_transposes():
+    columns = [0b0101, 0b0011, 0, 0b1000] + [0] * 5 + [0b0001]
+    assert columns_to_masks(columns, 4) == [
+        0b1000000011, 0b0000000010, 0b0000000001, 0b0000001000]
+
+
+@pytest.mark.parametrize("devices", (3, 70))
+def test_bernoulli_rates(devices):
+    rates = [(0.1, 0.5, 0.9)[i % 3] for i in range(devices)]
+    workload = BernoulliWorkload(devices, rates, seed=devices)
+    masks = list(workload.block(CYCLES // 2)) + list(workload.block(CYCLES // 2))
+    for rate, column in zip(rates, _columns(masks, devices)):
+        assert sum(column) / CYCLES == pytest.approx(rate, abs=0.02)
+
+
+def test_bernoulli_zero_and_one():
+    masks = BernoulliWorkload(2, [0.0, 1.0], seed=1).block(1000)
+    assert set(masks) == {0b10}
+
+
+@pytest.mark.parametrize("devices", (4, 70))
+def test_markov_bursts(devices):
+    p_on, p_off = 0.1, 0.3
+    workload = MarkovBurstWorkload(devices, p_on, p_off, seed=devices)
+    # Several blocks, so state is carried across block boundaries
+    masks = [m for _ in range(8) for m in workload.block(CYCLES // 8)]
+    for column in _columns(masks, min(devices, 8)):
+        assert sum(column) / CYCLES == pytest.approx(p_on / (p_on + p_off), abs=0.03)
+        bursts, gaps = _runs(column, 1), _runs(column, 0)
+        assert sum(bursts) / len(bursts) == pytest.approx(1 / p_off, rel=0.1)
+        assert sum(gaps) / len(gaps) == pytest.approx(1 / p_on, rel=0.1)
+
+
+def test_seeded_workloads_repeat():
+    for make in (lambda: BernoulliWorkload(6, 0.3, seed=9), lambda: MarkovBurstWorkload(6, seed=9)):
+        assert make().block(500) == make().block(500)
+
+
+def _write_trace(path, masks):
+    lines = ["# recorded requests"]
+    for i, mask in enumerate(masks):
+        if not mask:
+            lines.append("-" if i % 2 else "")
+        elif i % 3:
+            lines.append(f"{mask:#x}")
+        else:
+            lines.append(", ".join(str(d + 1) for d in range(mask.bit_length()) if mask >> d & 1))
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+@pytest.mark.parametrize("mode, burst", [(ROUND_ROBIN, 1), (FIXED_PRIORITY, 3)])
+def test_trace_replay_reproduces_run(tmp_path, mode, burst):
+    masks = MarkovBurstWorkload(5, 0.2, 0.4, seed=3).block(5000)
+    original = ArbiterEngine(5, mode, seed=1, track_metrics=True, burst_length=burst)
+    for mask in masks:
+        original.step(mask)
+
+    trace = tmp_path / "run.trace"
+    _write_trace(trace, masks)
+    replayed = ArbiterEngine(5, mode, seed=1, track_metrics=True, burst_length=burst)
+    workload = TraceWorkload(5, str(trace))
+    replayed.set_workload(workload)
+    while replayed.step() is not None:
+        pass
+    workload.close()
+    assert replayed.workload_done
+    assert (replayed.cycle, replayed.grant_counts, replayed.idle_cycles, replayed.busy_cycles) == \
+        (original.cycle, original.grant_counts, original.idle_cycles, original.busy_cycles)
+    assert replayed.metrics.snapshot() == original.metrics.snapshot()
+
+
+def test_trace_loops_and_rejects_bad_lines(tmp_path):
+    trace = tmp_path / "loop.trace"
+    trace.write_text("1 3\n# comment only\n-\n0x2\n", encoding="utf-8")
+    assert TraceWorkload(3, str(trace), loop=True).block(7) == [0b101, 0, 0b10] * 2 + [0b101]
+
+    bad = tmp_path / "bad.trace"
+    bad.write_text("1\n4\n", encoding="utf-8")
+    with pytest.raises(ValueError, match=":2: device number above 3"):
+        TraceWorkload(3, str(bad)).block(10)
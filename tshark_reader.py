@@ -0,0 +1,212 @@
+"""Streaming packet reader built on tshark's field output.
+
+Instead of letting PyShark build a full dissection object per packet, tshark
+is asked for just the handful of fields the simulator shows
+(``-T fields``), one tab-separated line per packet, which is parsed as it
+arrives on stdout. The same reader works on a live interface or a saved
+pcap/pcapng file. ``InterfaceLister`` runs ``tshark -D`` off the UI thread
+and caches the interface list.
+"""
+import os
+import subprocess
+import threading
+import time
+from collections import deque, namedtuple
+
+FIELDS = ("frame.time_epoch", "ip.src", "ip.dst", "frame.len", "udp.payload")
+
+# time: capture timestamp (epoch seconds), payload: UDP payload bytes
+Packet = namedtuple("Packet", ["time", "src", "dst", "length", "payload"])
+
+
+def tshark_command(tshark_path, interface=None, read_file=None, udp_port=5555):
+    # No -q/-Q: they stop tshark printing the per-packet field lines read
+    # here (its stderr chatter is drained separately)
+    cmd = [tshark_path, "-l", "-n", "-T", "fields",
+           "-E", "separator=\t", "-E", "occurrence=f"]
+    if read_file is not None:
+        cmd += ["-r", read_file, "-Y", f"udp.port == {udp_port}"]
+    else:
+        # A capture (BPF) filter drops other traffic before tshark dissects it
+        cmd += ["-i", interface, "-f", f"udp port {udp_port}"]
+    for field in FIELDS:
+        cmd += ["-e", field]
+    return cmd
+
+
+def parse_line(line):
+    """Turn one tab-separated field line into a Packet (None if malformed)"""
+    parts = line.rstrip("\r\n").split("\t")
+    if len(parts) != len(FIELDS):
+        return None
+    when, src, dst, length, payload = parts
+    try:
+        return Packet(
+            float(when) if when else None,
+            src or "?",
+            dst or "?",
+            int(length) if length else None,
+            # Older tshark versions print bytes colon-separated
+            bytes.fromhex(payload.replace(":", "")),
+        )
+    except ValueError:
+        return None
+
+
+class TsharkFieldsReader:
+    """Runs tshark and yields Packets parsed from its stdout stream"""
+
+    def __init__(self, tshark_path, interface=None, read_file=None, udp_port=5555):
+        self.command = tshark_command(tshark_path, interface, read_file, udp_port)
+        self.proc = None
+        self.stderr_tail = deque(maxlen=20)
+        self.malformed = 0
+
+    def packets(self):
+        self.proc = subprocess.Popen(
+            self.command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            bufsize=1 << 16,
+            # Don't flash a console window on Windows
+            creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+        )
+        # Drain stderr so tshark can never block on a full pipe
+        stderr_thread = threading.Thread(target=self._read_stderr, daemon=True)
+        stderr_thread.start()
+        for line in self.proc.stdout:
+            pkt = parse_line(line)
+            if pkt is None:
+                self.malformed += 1
+                continue
+            yield pkt
+        self.proc.wait()
+        stderr_thread.join(1.0)
+
+    def _read_stderr(self):
+        for line in self.proc.stderr:
+            line = line.strip()
+            if line:
+                self.stderr_tail.append(line)
+
+    @property
+    def returncode(self):
+        return None if self.proc is None else self.proc.returncode
+
+    def error_text(self):
+        return "\n".join(self.stderr_tail)
+
+    def close(self):
+        """Stop tshark; a pending packets() loop then sees end of stream"""
+        if self.proc is not None and self.proc.poll() is None:
+            try:
+                self.proc.terminate()
+            except OSError:
+                pass
+
+
+# Seconds a ``tshark -D`` listing is reused before running tshark again
+INTERFACE_CACHE_TTL = 300.0
+
+
+def interface_name(line):
+    """Interface name from a ``tshark -D`` line such as ``1. eth0 (Ethernet)``"""
+    number, dot, rest = line.strip().partition(". ")
+    if not dot or not number.isdigit():
+        return None
+    # Descriptions follow the name in parentheses; Windows names have no spaces
+    name = rest.split(" (", 1)[0].strip()
+    return name or None
+
+
+class InterfaceLister:
+    """Runs ``tshark -D`` on a worker thread and caches the listing.
+
+    Lines are handed to ``on_line`` as tshark prints them and the full list
+    to ``on_done(lines, error)`` at the end; both are called on the worker
+    thread. A listing is reused for ``ttl`` seconds as long as the tshark
+    path and the executable's modification time are unchanged.
+    """
+
+    def __init__(self, ttl=INTERFACE_CACHE_TTL, timeout=30.0):
+        self.ttl = ttl
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._cache = None  # (key, time listed, lines)
+        self._running = False
+
+    @staticmethod
+    def _key(tshark_path):
+        try:
+            return tshark_path, os.path.getmtime(tshark_path)
+        except OSError:
+            return tshark_path, None
+
+    def cached(self, tshark_path):
+        """Cached lines for ``tshark_path``, or None when missing or stale"""
+        with self._lock:
+            cache = self._cache
+        if cache is None or cache[0] != self._key(tshark_path):
+            return None
+        if time.monotonic() - cache[1] > self.ttl:
+            return None
+        return list(cache[2])
+
+    def invalidate(self):
+        with self._lock:
+            self._cache = None
+
+    @property
+    def running(self):
+        return self._running
+
+    def start(self, tshark_path, on_line, on_done):
+        """List interfaces in the background; False if a listing is already running"""
+        with self._lock:
+            if self._running:
+                return False
+            self._running = True
+        threading.Thread(target=self._list, args=(tshark_path, on_line, on_done),
+                         daemon=True).start()
+        return True
+
+    def _list(self, tshark_path, on_line, on_done):
+        key = self._key(tshark_path)
+        lines, error = [], None
+        try:
+            proc = subprocess.Popen(
+                [tshark_path, "-D"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+            )
+            # Some capture drivers hang enumerating adapters; don't wait forever
+            timer = threading.Timer(self.timeout, proc.kill)
+            timer.start()
+            try:
+                for line in proc.stdout:
+                    line = line.rstrip("\r\n")
+                    if line.strip():
+                        lines.append(line)
+                        on_line(line)
+                stderr = proc.stderr.read()
+                proc.wait()
+            finally:
+                timer.cancel()
+                if proc.poll() is None:
+                    proc.kill()  # on_line raised
+                    proc.wait()
+            if proc.returncode != 0:
+                error = stderr.strip() or f"tshark -D exited with status {proc.returncode}"
+        except Exception as exc:
+            # Includes errors raised by on_line, e.g. from a closed window
+            error = str(exc) or type(exc).__name__
+        finally:
+            # Whatever happened, a later start() must be able to run again
+            with self._lock:
+                if error is None:
+                    self._cache = (key, time.monotonic(), lines)
+                self._running = False
+            on_done(lines, error)
@@ -0,0 +1,165 @@
+"""Non-blocking UDP emission of BUS_EVENT payloads.
+
+Callers hand encoded payloads to ``UDPEventSender.submit``, which never
+blocks: it enqueues into a bounded queue or counts the event as dropped.
+A background thread drains the queue and packs whatever is waiting into as
+few datagrams as fit the configured MTU, so a burst of events costs a
+handful of sendto calls instead of one per event.
+
+Every event is stamped (``wire.stamp``) with a sequence number and the
+monotonic time of its datagram's sendto; binary frames encoded without an
+emission time get the wall-clock time they were submitted. With a ``latency`` tracker set, the
+time events wait in the queue and the duration of each sendto are recorded.
+"""
+import queue
+import socket
+import threading
+import time
+
+import wire
+
+DEFAULT_MTU = 1472  # 1500-byte Ethernet MTU minus IPv4 and UDP headers
+DEFAULT_MAX_QUEUE = 10000
+# Upper bound on events taken from the queue per wakeup
+MAX_BATCH = 1024
+# Upper bound on the " SEQ=... SENT=..." suffix stamped onto text payloads
+TEXT_STAMP_SIZE = 48
+
+
+class UDPEventSender:
+    def __init__(self, address, sock=None, mtu=DEFAULT_MTU, max_queue=DEFAULT_MAX_QUEUE, coalesce=True):
+        self.address = address
+        self.sock = sock if sock is not None else socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.mtu = mtu
+        # False sends one datagram per event (still batched per wakeup)
+        self.coalesce = coalesce
+        self._queue = queue.Queue(max_queue)
+        self._thread = None
+        self._running = False
+        self.sent_events = 0
+        self.sent_datagrams = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_error = None
+        self.seq = 0  # sequence number of the last stamped event
+        self.latency = None  # latency.LatencyTracker, optional
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        self._running = False
+        try:
+            self._queue.put_nowait(None)  # wake the sender
+        except queue.Full:
+            pass
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def flush(self, timeout=1.0):
+        """Wait until the queue is empty; False if it did not drain in time"""
+        deadline = time.monotonic() + timeout
+        while self._queue.qsize():
+            if time.monotonic() >= deadline or self._thread is None:
+                return False
+            time.sleep(0.001)
+        return True
+
+    def submit(self, payload):
+        """Queue one encoded payload; returns False if it had to be dropped"""
+        try:
+            self._queue.put_nowait((payload, time.monotonic_ns()))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    @property
+    def queued(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        return {
+            "sent_events": self.sent_events,
+            "sent_datagrams": self.sent_datagrams,
+            "dropped": self.dropped,
+            "queued": self.queued,
+            "errors": self.errors,
+        }
+
+    def _run(self):
+        q = self._queue
+        while self._running:
+            item = q.get()
+            if item is None:
+                continue
+            batch = [item]
+            while len(batch) < MAX_BATCH:
+                try:
+                    item = q.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None:
+                    batch.append(item)
+            latency = self.latency
+            if latency is not None:
+                now = time.monotonic_ns()
+                waited = latency["queue"]
+                for _, submitted in batch:
+                    waited.add((now - submitted) / 1000.0)
+            self._send(batch)
+
+    def _send(self, batch):
+        """Send (payload, submit monotonic_ns) pairs"""
+        latency = self.latency
+        # Submit times become emission timestamps; the clock offset is read
+        # once per batch
+        offset_ns = time.time_ns() - time.monotonic_ns()
+        stamp = wire.stamp
+        for items in self._pack(batch):
+            seq = self.seq
+            self.seq += len(items)
+            sent_ns = time.monotonic_ns()
+            datagram = wire.join_payloads([
+                stamp(p, seq + i + 1, sent_ns, (submitted + offset_ns) // 1000)
+                for i, (p, submitted) in enumerate(items)])
+            try:
+                self.sock.sendto(datagram, self.address)
+            except OSError as e:
+                self.errors += 1
+                self.dropped += len(items)
+                self.last_error = e
+                continue
+            if latency is not None:
+                latency["send"].add((time.monotonic_ns() - sent_ns) / 1000.0)
+            self.sent_datagrams += 1
+            self.sent_events += len(items)
+
+    def _pack(self, batch):
+        """Yield lists of batch items whose payloads fit one datagram of at most the MTU"""
+        if not self.coalesce:
+            for item in batch:
+                yield [item]
+            return
+        current = []
+        size = 0
+        binary = False
+        for item in batch:
+            payload = item[0]
+            is_bin = wire.is_binary(payload)
+            extra = len(payload) if is_bin else len(payload) + len(wire.TEXT_SEPARATOR) + TEXT_STAMP_SIZE
+            # Formats are never mixed within one datagram
+            if current and (is_bin != binary or size + extra > self.mtu):
+                yield current
+                current = []
+                size = 0
+            current.append(item)
+            size += extra
+            binary = is_bin
+        if current:
+            yield current
@@ -0,0 +1,49 @@
+"""Coalescing queue of UI updates posted by worker threads.
+
+Worker threads post callbacks here instead of calling ``root.after(0, ...)``
+for every event; the Tk main thread drains the queue once per frame.
+Ordered events (log lines, animations) are kept in a bounded FIFO that drops
+the oldest entries when full. State refreshes such as colours and stats are
+posted under a key and only the latest one per key is run.
+"""
+import threading
+from collections import deque
+
+DEFAULT_MAX_EVENTS = 500
+
+
+class UIUpdateQueue:
+    def __init__(self, max_events=DEFAULT_MAX_EVENTS):
+        self._lock = threading.Lock()
+        self._events = deque(maxlen=max_events)
+        self._latest = {}
+        self.max_events = max_events
+        self.dropped = 0
+        self.coalesced = 0
+
+    def post(self, callback, *args):
+        """Queue an ordered event; the oldest one is dropped when full"""
+        with self._lock:
+            if len(self._events) == self.max_events:
+                self.dropped += 1
+            self._events.append((callback, args))
+
+    def post_latest(self, key, callback, *args):
+        """Queue a state refresh, replacing any pending one with the same key"""
+        with self._lock:
+            if key in self._latest:
+                self.coalesced += 1
+            self._latest[key] = (callback, args)
+
+    def drain(self):
+        """Take everything pending: ordered events first, then latest states"""
+        with self._lock:
+            items = list(self._events)
+            self._events.clear()
+            items.extend(self._latest.values())
+            self._latest.clear()
+        return items
+
+    def __len__(self):
+        with self._lock:
+            return len(self._events) + len(self._latest)
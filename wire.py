@@ -0,0 +1,162 @@
+"""BUS_EVENT payload formats sent over UDP.
+
+Two formats are supported:
+
+* Text:   ``BUS_EVENT GRANT DEVICE=Device 2 DATA=-`` (the original format)
+* Binary: a fixed 36-byte frame, decoded in Wireshark by ``busarb.lua``
+
+Several events may share one datagram: binary frames are simply
+concatenated and text payloads are separated by newlines.
+
+The UDP sender stamps each event with a sequence number and the
+``time.monotonic_ns()`` of the sendto carrying it (``stamp``), for latency
+measurements: text payloads get `` SEQ=<n> SENT=<ns>`` appended, binary
+frames carry them in their last 12 bytes. Binary frames encoded without a
+timestamp also get their emission time there, so the simulation thread
+never reads the clock per event.
+
+Binary layout (network byte order)::
+
+    offset size field
+         0    2 magic "BA"
+         2    1 version (2; version 1 frames end after the timestamp)
+         3    1 event type (1=GRANT, 2=DATA, 3=IDLE)
+         4    2 device number, 1-based as in the "Device N" labels (0 = none)
+         6    2 data byte (0xFFFF = none)
+         8    8 cycle number
+        16    8 timestamp, microseconds since the Unix epoch (emission, 0 = none)
+        24    4 sequence number (0 = not stamped)
+        28    8 send time, monotonic nanoseconds of the sender (0 = not stamped)
+"""
+import re
+import struct
+from collections import namedtuple
+
+TEXT = "Text"
+BINARY = "Binary"
+FORMATS = (TEXT, BINARY)
+
+MAGIC = b"BA"
+VERSION = 2
+EVENT_CODES = {"GRANT": 1, "DATA": 2, "IDLE": 3}
+EVENT_NAMES = {code: name for name, code in EVENT_CODES.items()}
+NO_DEVICE = 0
+NO_DATA = 0xFFFF
+
+FRAME_V1 = struct.Struct("!2sBBHHQQ")
+STAMP = struct.Struct("!IQ")  # sequence number, send time
+_TIMED_STAMP = struct.Struct("!QIQ")  # timestamp, sequence number, send time
+NO_TIMESTAMP = 0
+_NO_TIMESTAMP_BYTES = bytes(8)
+FRAME = struct.Struct("!2sBBHHQQIQ")
+FRAME_SIZE = FRAME.size
+FRAME_SIZES = {1: FRAME_V1.size, 2: FRAME_SIZE}
+# Encoding packs a prebuilt magic/version/event header and leaves the stamp
+# zeroed, which is cheaper than packing all of FRAME's fields
+_ENCODE = struct.Struct("!4sHHQQ12x")
+_HEADERS = {name: MAGIC + bytes((VERSION, code)) for name, code in EVENT_CODES.items()}
+TEXT_SEPARATOR = b"\n"
+
+_TEXT_RE = re.compile(rb"BUS_EVENT (\w+) DEVICE=(.*?) DATA=(\S+)(?: SEQ=(\d+) SENT=(\d+))?")
+
+# device is a 0-based index (None when no device); cycle/timestamp are None
+# for text payloads, which don't carry them; seq/sent_ns are None unless stamped
+BusEvent = namedtuple("BusEvent", ["event", "device", "data", "cycle", "timestamp", "seq", "sent_ns"],
+                      defaults=(None, None))
+
+
+def encode_text(event_type, name, data=None):
+    payload = f"BUS_EVENT {event_type} DEVICE={name} DATA={data if data is not None else '-'}"
+    return payload.encode("utf-8")
+
+
+def encode_binary(event_type, device_index, data=None, cycle=0, timestamp=NO_TIMESTAMP):
+    """Unstamped binary frame.
+
+    ``timestamp`` is the emission time in microseconds since the epoch.
+    When left out, ``stamp`` fills it in from the caller's ``emitted_us``
+    (the UDP sender passes the time the frame was submitted).
+    """
+    return _ENCODE.pack(
+        _HEADERS[event_type],
+        NO_DEVICE if device_index is None else device_index + 1,
+        NO_DATA if data is None else data,
+        cycle or 0,
+        timestamp,
+    )
+
+
+def stamp(payload, seq, sent_ns, emitted_us=None):
+    """Payload carrying sequence number ``seq`` and send time ``sent_ns``.
+
+    A binary frame without a timestamp gets ``emitted_us``, when given.
+    """
+    if is_binary(payload):
+        if emitted_us is not None and payload[16:24] == _NO_TIMESTAMP_BYTES:
+            return payload[:16] + _TIMED_STAMP.pack(emitted_us, seq & 0xFFFFFFFF, sent_ns)
+        return payload[:FRAME_V1.size] + STAMP.pack(seq & 0xFFFFFFFF, sent_ns)
+    return b"%s SEQ=%d SENT=%d" % (payload, seq, sent_ns)
+
+
+def decode(payload):
+    """Parse a text or binary payload into a BusEvent.
+
+    Raises ValueError for payloads that are neither.
+    """
+    if is_binary(payload) and len(payload) >= FRAME_V1.size:
+        _, version, code, device, data, cycle, timestamp = FRAME_V1.unpack_from(payload)
+        if FRAME_SIZES.get(version) != len(payload) or code not in EVENT_NAMES:
+            raise ValueError(f"Unsupported BUS_EVENT frame (version {version}, event {code})")
+        seq = sent_ns = None
+        if version >= 2:
+            seq, sent_ns = STAMP.unpack_from(payload, FRAME_V1.size)
+        return BusEvent(
+            EVENT_NAMES[code],
+            None if device == NO_DEVICE else device - 1,
+            None if data == NO_DATA else data,
+            cycle,
+            timestamp or None,
+            seq or None,
+            sent_ns or None,
+        )
+    m = _TEXT_RE.match(payload)
+    if m is None:
+        raise ValueError("Not a BUS_EVENT payload")
+    event, name, data, seq, sent_ns = m.groups()
+    device = None
+    if name.startswith(b"Device "):
+        device = int(name[7:]) - 1
+    return BusEvent(
+        event.decode("ascii"),
+        device,
+        None if data == b"-" else int(data),
+        None,
+        None,
+        None if seq is None else int(seq),
+        None if sent_ns is None else int(sent_ns),
+    )
+
+
+def is_binary(payload):
+    return payload[:2] == MAGIC
+
+
+def join_payloads(payloads):
+    """Pack payloads of one format into a single datagram"""
+    if payloads and is_binary(payloads[0]):
+        return b"".join(payloads)
+    return TEXT_SEPARATOR.join(payloads)
+
+
+def decode_datagram(datagram):
+    """Decode every BUS_EVENT packed into one datagram"""
+    if is_binary(datagram):
+        events = []
+        i = 0
+        while i < len(datagram):
+            # Frame size depends on the version byte of each frame
+            size = FRAME_SIZES.get(datagram[i + 2] if i + 2 < len(datagram) else None, FRAME_SIZE)
+            events.append(decode(datagram[i:i + size]))
+            i += size
+        return events
+    return [decode(line) for line in datagram.split(TEXT_SEPARATOR) if line]
@@ -0,0 +1,250 @@
+"""Request (traffic) generators for the arbiter.
+
+A workload produces request bitmasks (bit i set when device i requests) in
+blocks of cycles:
+
+* ``BernoulliWorkload``: every device requests independently at its own rate
+* ``MarkovBurstWorkload``: on/off bursts; idle devices start a burst with
+  ``p_on`` and bursting devices stop with ``p_off`` each cycle
+* ``TraceWorkload``: replays requests from a text file
+
+Up to ``TRANSPOSE_MAX_DEVICES`` devices, a block is generated per device
+along the time axis (one big integer with a bit per cycle) and transposed
+into per-cycle bitmasks in C, so no Python code runs per device per cycle.
+Wider buses draw whole per-cycle bitmasks, which costs the same however many
+devices share a rate.
+
+Trace files have one cycle per line: the 1-based numbers of the requesting
+devices separated by spaces or commas, ``-`` or an empty line for a cycle
+without requests, or a hex bitmask such as ``0x5``. ``#`` starts a comment.
+"""
+import math
+import random
+import sys
+from abc import ABC, abstractmethod
+from array import array
+
+from arbiter import random_mask
+
+# Cycles generated per block when a workload is pulled as a stream
+BLOCK_CYCLES = 4096
+
+TRANSPOSE_MAX_DEVICES = 64
+
+# bytes.translate tables turning b"0"/b"1" into 0 / bit k of a byte
+_SPREAD = [bytes.maketrans(b"01", bytes([0, 1 << k])) for k in range(8)]
+_ARRAY_CODES = {array(code).itemsize: code for code in "QIHB"}
+
+
+def _rates(rates, device_count):
+    """Per-device probability list from a scalar or a sequence"""
+    if isinstance(rates, (int, float)):
+        rates = [rates] * device_count
+    rates = [float(p) for p in rates]
+    if len(rates) != device_count:
+        raise ValueError("one rate per device is required")
+    for i, p in enumerate(rates):
+        if not 0.0 <= p <= 1.0:
+            raise ValueError(f"rate {p} of device {i + 1} is not between 0 and 1")
+    return rates
+
+
+def _rate_groups(rates):
+    """[(probability, device mask)] for the devices with a non-zero rate"""
+    groups = {}
+    for i, p in enumerate(rates):
+        if p > 0.0:
+            groups[p] = groups.get(p, 0) | 1 << i
+    return sorted(groups.items())
+
+
+def _draw(rng, bits, groups, full):
+    """Bitmask with each device of every group set with the group's probability"""
+    mask = 0
+    for p, group in groups:
+        drawn = random_mask(rng, bits, p)
+        mask |= drawn if group == full else drawn & group
+    return mask
+
+
+def columns_to_masks(columns, cycles):
+    """Per-cycle request bitmasks from per-device bitmasks over time.
+
+    ``columns[i]`` has bit t set when device i requests in cycle t (at most
+    TRANSPOSE_MAX_DEVICES columns). Each column is spread to one byte per
+    cycle with bytes.translate, the bytes of eight devices are summed as one
+    big integer and interleaved into a buffer read back as an array.
+    """
+    width = 1
+    while width * 8 < len(columns):
+        width *= 2
+    buf = bytearray(cycles * width)
+    for j in range(width):
+        acc = 0
+        for k, column in enumerate(columns[8 * j:8 * j + 8]):
+            if column:
+                spread = bin(column)[:1:-1].ljust(cycles, "0").encode("ascii").translate(_SPREAD[k])
+                acc += int.from_bytes(spread, "little")
+        if acc:
+            buf[j::width] = acc.to_bytes(cycles, "little")
+    masks = array(_ARRAY_CODES[width], bytes(buf))
+    if sys.byteorder == "big":
+        masks.byteswap()
+    return masks.tolist()
+
+
+class Workload(ABC):
+    """Base class: request bitmasks for ``device_count`` devices"""
+
+    def __init__(self, device_count, seed=None):
+        self.device_count = device_count
+        self.rng = random.Random(seed)
+
+    @abstractmethod
+    def block(self, cycles):
+        """List of up to ``cycles`` request bitmasks; shorter once a finite workload ends"""
+
+    def masks(self, block_cycles=BLOCK_CYCLES):
+        """Iterator over request bitmasks, generated a block at a time"""
+        while True:
+            block = self.block(block_cycles)
+            yield from block
+            if len(block) < block_cycles:
+                return
+
+
+class BernoulliWorkload(Workload):
+    """Independent requests; ``rates`` is one probability or one per device"""
+
+    def __init__(self, device_count, rates=0.5, seed=None):
+        super().__init__(device_count, seed)
+        self.rates = _rates(rates, device_count)
+        self.groups = _rate_groups(self.rates)
+
+    def block(self, cycles):
+        rng, bits = self.rng, self.device_count
+        if bits <= TRANSPOSE_MAX_DEVICES:
+            return columns_to_masks([random_mask(rng, cycles, p) for p in self.rates], cycles)
+        groups = self.groups
+        full = (1 << bits) - 1
+        return [_draw(rng, bits, groups, full) for _ in range(cycles)]
+
+
+class MarkovBurstWorkload(Workload):
+    """Two-state on/off bursts; a device requests on every cycle of a burst.
+
+    Each cycle an idle device starts a burst with probability ``p_on`` and a
+    bursting one stops with ``p_off`` (both may be per-device sequences), so
+    bursts last ``1 / p_off`` cycles on average and a device requests on
+    ``p_on / (p_on + p_off)`` of the cycles in the long run.
+    """
+
+    def __init__(self, device_count, p_on=0.1, p_off=0.3, seed=None):
+        super().__init__(device_count, seed)
+        self.p_on = _rates(p_on, device_count)
+        self.p_off = _rates(p_off, device_count)
+        self.state = 0
+
+    def block(self, cycles):
+        if self.device_count <= TRANSPOSE_MAX_DEVICES:
+            return self._block_by_runs(cycles)
+        rng, bits = self.rng, self.device_count
+        full = (1 << bits) - 1
+        on_groups, off_groups = _rate_groups(self.p_on), _rate_groups(self.p_off)
+        state = self.state
+        out = []
+        for _ in range(cycles):
+            start = _draw(rng, bits, on_groups, full)
+            stop = _draw(rng, bits, off_groups, full)
+            state = (state & ~stop) | (start & ~state)
+            out.append(state)
+        self.state = state
+        return out
+
+    def _block_by_runs(self, cycles):
+        # Time spent in a state is geometric, so draw run lengths per device
+        # (one draw per burst or gap) instead of a coin flip per cycle
+        columns = []
+        state = 0
+        for i, (p_on, p_off) in enumerate(zip(self.p_on, self.p_off)):
+            on = self.state >> i & 1
+            runs = []  # "0"/"1" per cycle, earliest cycle first
+            pos = 0
+            stay = self._stay(p_off if on else p_on, cycles)
+            while pos + stay < cycles:
+                runs.append("01"[on] * stay)
+                pos += stay
+                on ^= 1
+                # The cycle of a switch is spent in the new state
+                stay = 1 + self._stay(p_off if on else p_on, cycles)
+            runs.append("01"[on] * (cycles - pos))
+            state |= on << i
+            columns.append(int("".join(runs)[::-1], 2))
+        self.state = state
+        return columns_to_masks(columns, cycles)
+
+    def _stay(self, p, limit):
+        """Cycles before a switch with per-cycle switch probability ``p``"""
+        if p >= 1.0:
+            return 0
+        if p <= 0.0:
+            return limit
+        return min(limit, int(math.log(1.0 - self.rng.random()) / math.log1p(-p)))
+
+
+class TraceWorkload(Workload):
+    """Replays a request trace file, optionally looping at the end"""
+
+    def __init__(self, device_count, path, loop=False):
+        super().__init__(device_count)
+        self.path = path
+        self.loop = loop
+        self.line_no = 0
+        self._cycles_this_pass = 0
+        self._file = open(path, "r", encoding="utf-8")
+
+    def block(self, cycles):
+        out = []
+        while len(out) < cycles:
+            line = self._file.readline()
+            if not line:
+                # A trace without a single cycle would loop forever
+                if not self.loop or not self._cycles_this_pass:
+                    break
+                self._file.seek(0)
+                self.line_no = 0
+                self._cycles_this_pass = 0
+                continue
+            self.line_no += 1
+            mask = self.parse_line(line)
+            if mask is not None:
+                out.append(mask)
+                self._cycles_this_pass += 1
+        return out
+
+    def parse_line(self, line):
+        """Request bitmask of one trace line, or None for comment-only lines"""
+        text, hash_, _ = line.partition("#")
+        text = text.strip()
+        if not text:
+            return None if hash_ else 0
+        if text == "-":
+            return 0
+        try:
+            if text.lower().startswith("0x"):
+                mask = int(text, 16)
+            else:
+                mask = 0
+                for field in text.replace(",", " ").split():
+                    device = int(field)
+                    if device < 1:
+                        raise ValueError
+                    mask |= 1 << (device - 1)
+        except ValueError:
+            raise ValueError(f"{self.path}:{self.line_no}: bad trace line {line.strip()!r}") from None
+        if mask >> self.device_count:
+            raise ValueError(f"{self.path}:{self.line_no}: device number above {self.device_count}")
+        return mask
+
+    def close(self):
+        self._file.close()